@@ -0,0 +1,87 @@
+# Angle profiles of the SS response table, shared by ParseSS, CleanSS, RepairSS, RebuildSS and BatchSS
+# The four angle responses are 9-byte entries starting at 552 (XGD2 and XGD3 without an SS table) or 72 (XGD3),
+# each holding the first angle at +0..1 and the second angle at +3..4, little-endian
+
+XGD2_ANGLES = 552
+XGD3_ANGLES = 72
+
+# Byte values relative to the start of the angle table for the fixed angles 1, 91, 181 and 271
+FIRST_ANGLE = (0, 1, 9, 10, 18, 19, 27, 28)
+SECOND_ANGLE = (3, 4, 12, 13, 21, 22, 30, 31)
+KREON_ANGLES = {0: 0x01, 1: 0x00, 3: 0x00, 4: 0x00, 9: 0x5B, 10: 0x00, 12: 0x00, 13: 0x00, 18: 0xB5, 19: 0x00, 21: 0x00, 22: 0x00, 27: 0x0F, 28: 0x01, 30: 0x00, 31: 0x00}
+FIXED_ANGLES = {0: 0x01, 1: 0x00, 3: 0x01, 4: 0x00, 9: 0x5B, 10: 0x00, 12: 0x5B, 13: 0x00, 18: 0xB5, 19: 0x00, 21: 0xB5, 22: 0x00, 27: 0x0F, 28: 0x01, 30: 0x0F, 31: 0x01}
+XGD3_KREON_ANGLES = {i: KREON_ANGLES[i] for i in FIRST_ANGLE}
+# Redump hashes bad XGD3 SS with 0x00 as the high byte of angle 271, CleanSS writes the Kreon value 0x01 there
+XGD3_REDUMP_ANGLES = {**XGD3_KREON_ANGLES, 28: 0x00}
+
+
+def window(values):
+    # values maps SS offsets to the byte expected there, stored as a mask/value pair over the smallest window holding them
+    offset = min(values)
+    length = max(values) - offset + 1
+    mask = bytearray(length)
+    value = bytearray(length)
+    for pos, byte in values.items():
+        mask[pos - offset] = 0xFF
+        value[pos - offset] = byte
+    return offset, length, int.from_bytes(mask, 'big'), int.from_bytes(value, 'big')
+
+
+def profile(base, values):
+    return window({base + i: b for i, b in values.items()})
+
+
+def matches(data, profile):
+    offset, length, mask, value = profile
+    return int.from_bytes(data[offset:offset + length], 'big') & mask == value
+
+
+def apply(data, profile):
+    # One slice write replaces the masked bytes and keeps the bytes between them
+    offset, length, mask, value = profile
+    data[offset:offset + length] = ((int.from_bytes(data[offset:offset + length], 'big') & ~mask) | value).to_bytes(length, 'big')
+
+
+XGD2_CLEAN_KREON = profile(XGD2_ANGLES, KREON_ANGLES)
+XGD2_CLEAN_0800 = profile(XGD2_ANGLES, FIXED_ANGLES)
+XGD3_CLEAN_KREON = profile(XGD2_ANGLES, XGD3_KREON_ANGLES)
+XGD3_REDUMP_KREON = profile(XGD2_ANGLES, XGD3_REDUMP_ANGLES)
+XGD3_CLEAN = profile(XGD3_ANGLES, FIXED_ANGLES)
+XGD2_ABGX = window({i: 0xFF for i in range(0x200, 0x300)})
+XGD3_ABGX = window({i: 0xFF for i in range(0x20, 0xF4)})
+FIRST_ZERO = {base: profile(base, dict.fromkeys(FIRST_ANGLE, 0)) for base in (XGD2_ANGLES, XGD3_ANGLES)}
+SECOND_ZERO = {base: profile(base, dict.fromkeys(SECOND_ANGLE, 0)) for base in (XGD2_ANGLES, XGD3_ANGLES)}
+
+# Per ParseSS xgd (4 is XGD3 with an SS table): angle table, cleaned profiles in order, raw Kreon style, raw 0800 style
+STYLES = {
+    2: (XGD2_ANGLES, ((XGD2_CLEAN_KREON, "xgd2_clean_kreon"), (XGD2_CLEAN_0800, "xgd2_clean_0800")), "xgd2_raw_kreon", "xgd2_raw_0800"),
+    3: (XGD2_ANGLES, ((XGD3_REDUMP_KREON, "xgd3_clean_kreon"),), "xgd3_raw_kreon", "xgd3_raw_kreon"),
+    4: (XGD3_ANGLES, ((XGD3_CLEAN, "xgd3_clean"),), "xgd3_raw_kreon_v1", "xgd3_raw_0800"),
+}
+
+
+def is_kreon(data, base=XGD2_ANGLES):
+    # Kreon drives do not return the second angles
+    return matches(data, SECOND_ZERO[base])
+
+
+def classify(data, xgd):
+    # Returns the angle style of an SS, or None for XGD1 which has no angle table
+    if xgd not in STYLES:
+        return None
+    base, cleaned, raw_kreon, raw_0800 = STYLES[xgd]
+    for clean_profile, style in cleaned:
+        if matches(data, clean_profile):
+            return style
+    if is_kreon(data, base) and not matches(data, FIRST_ZERO[base]):
+        return raw_kreon
+    return raw_0800
+
+
+def is_abgx(data, xgd):
+    # abgx360 fills the response table with 0xFF for its internal hash
+    if xgd == 2:
+        return matches(data, XGD2_ABGX)
+    if xgd == 4:
+        return matches(data, XGD3_ABGX)
+    return False
@@ -0,0 +1,40 @@
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Completed reads are held until the files before them are handled, up to this many per read in flight
+READ_AHEAD = 4
+
+
+def read_file(file_path, size):
+    with open(file_path, 'rb') as f:
+        return f.read(size)
+
+
+async def finish(pending, handle):
+    file_path, future = pending.popleft()
+    try:
+        data = await future
+    except Exception as e:
+        handle(file_path, None, e)
+    else:
+        handle(file_path, data, None)
+
+
+async def read_ahead(file_paths, size, inflight, handle):
+    loop = asyncio.get_running_loop()
+    pending = deque()
+    # Each read blocks a thread for a full round trip on a network share, so the pool size is the number of reads in flight
+    with ThreadPoolExecutor(max_workers=inflight) as executor:
+        for file_path in file_paths:
+            pending.append((file_path, loop.run_in_executor(executor, read_file, file_path, size)))
+            while len(pending) >= inflight * READ_AHEAD:
+                await finish(pending, handle)
+        while pending:
+            await finish(pending, handle)
+
+
+def read_files(file_paths, size, inflight, handle):
+    # Calls handle(file_path, data, error) for every file in the order given, while up to inflight reads run
+    asyncio.run(read_ahead(file_paths, size, inflight, handle))
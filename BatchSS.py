@@ -0,0 +1,320 @@
+import sys
+import os
+import zlib
+import csv
+import ParseSS
+import AngleProfiles
+import Layouts
+try:
+    import numpy as np
+except ImportError:
+    print("The 'numpy' module is needed to parse SS files in batch.")
+    print("Please install 'numpy' using pip:")
+    print("python -m pip install numpy")
+    raise
+
+
+SECTOR_SIZE = 2048
+FILETIME_EPOCH = 0x19DB1DED53E8000
+# FILETIME of 9999-12-31 23:59:59.9999999, anything later is rejected like ParseSS.filetime
+FILETIME_MAX = 0x24C85A5ED1C03FFF
+
+STYLE_NAMES = [
+    "",
+    "xgd2_clean_kreon",
+    "xgd2_clean_0800",
+    "xgd2_raw_kreon",
+    "xgd2_raw_0800",
+    "xgd3_clean_kreon",
+    "xgd3_raw_kreon",
+    "xgd3_clean",
+    "xgd3_raw_kreon_v1",
+    "xgd3_raw_0800",
+]
+
+# Angle bytes relative to the start of the angle table (552 for XGD2, 72 for XGD3), from AngleProfiles
+FIRST_ANGLE = np.array(AngleProfiles.FIRST_ANGLE)
+SECOND_ANGLE = np.array(AngleProfiles.SECOND_ANGLE)
+ANGLE_BYTES = np.array(sorted(AngleProfiles.KREON_ANGLES))
+KREON_ANGLES = np.array([AngleProfiles.KREON_ANGLES[i] for i in ANGLE_BYTES], dtype=np.uint8)
+FIXED_ANGLES = np.array([AngleProfiles.FIXED_ANGLES[i] for i in ANGLE_BYTES], dtype=np.uint8)
+XGD3_REDUMP_ANGLES = np.array([AngleProfiles.XGD3_REDUMP_ANGLES[i] for i in FIRST_ANGLE], dtype=np.uint8)
+
+def reserved_masks():
+    # One row per xgd value (0..4), XGD3 with and without the SS table share a layout
+    masks = np.zeros((5, SECTOR_SIZE), dtype=bool)
+    for xgd, ranges in Layouts.SS_EMPTY_RANGES.items():
+        for start, end in ranges:
+            masks[xgd, start:end] = True
+    return masks
+
+
+RESERVED_MASKS = reserved_masks()
+
+
+def load_matrix(file_paths):
+    # Files are read straight into their row, short files are flagged rather than padded
+    matrix = np.zeros((len(file_paths), SECTOR_SIZE), dtype=np.uint8)
+    loaded = np.zeros(len(file_paths), dtype=bool)
+    errors = {}
+    for i, file_path in enumerate(file_paths):
+        try:
+            with open(file_path, 'rb') as f:
+                loaded[i] = f.readinto(memoryview(matrix[i])) == SECTOR_SIZE
+            if not loaded[i]:
+                errors[i] = "Not a valid SS: <2048 bytes"
+        except Exception as e:
+            errors[i] = f"{e}"
+    return matrix, loaded, errors
+
+
+def be_uint(columns):
+    value = np.zeros(columns.shape[:-1], dtype=np.int64)
+    for i in range(columns.shape[-1]):
+        value = (value << 8) | columns[..., i]
+    return value
+
+
+def le_uint64(columns):
+    return np.ascontiguousarray(columns).view('<u8')[:, 0]
+
+
+def filetimes(columns):
+    ft = le_uint64(columns)
+    valid = (ft >= FILETIME_EPOCH) & (ft <= FILETIME_MAX)
+    us = np.where(valid, ft - FILETIME_EPOCH, 0) // 10
+    return np.where(valid, us.astype('datetime64[us]'), np.datetime64('NaT', 'us')), valid
+
+
+def classify(matrix):
+    layer0_end = be_uint(matrix[:, 13:16])
+    x4ba = matrix[:, 0x4BA]
+    xgd = np.select([layer0_end == 0x2033AF, layer0_end == 0x20339F, layer0_end == 0x238E0F], [1, 2, 3], 0)
+    unexpected_layerbreak = xgd == 0
+    malformed = unexpected_layerbreak & (x4ba == 0x02)
+    unexpected_4ba = np.where(x4ba == 0x01, xgd > 1, np.where(x4ba == 0x02, xgd == 1, True))
+    xgd = np.where(unexpected_layerbreak & (x4ba == 0x01), 1, xgd)
+    xgd = np.where(malformed, 2, xgd)
+
+    table = matrix[:, 32:104].any(axis=1)
+    nonzero_table = table & ((xgd == 1) | (xgd == 2))
+    empty_table = ~table & (xgd == 3)
+    xgd = np.where(table & (xgd == 3), 4, xgd)
+    return {
+        "xgd": xgd.astype(np.uint8),
+        "unexpected_layerbreak": unexpected_layerbreak,
+        "unexpected_0x4ba": unexpected_4ba,
+        "malformed_xgd2": malformed,
+        "nonzero_xgd3_table": nonzero_table,
+        "empty_xgd3_table": empty_table,
+    }
+
+
+def angle_profile(matrix, xgd):
+    xgd2_angles = matrix[:, 552:584]
+    xgd3_angles = matrix[:, 72:104]
+
+    xgd2_clean_kreon = (xgd2_angles[:, ANGLE_BYTES] == KREON_ANGLES).all(axis=1)
+    xgd2_clean_0800 = (xgd2_angles[:, ANGLE_BYTES] == FIXED_ANGLES).all(axis=1)
+    xgd2_kreon = ~xgd2_angles[:, SECOND_ANGLE].any(axis=1) & xgd2_angles[:, FIRST_ANGLE].any(axis=1)
+    xgd3_clean_kreon = (xgd2_angles[:, FIRST_ANGLE] == XGD3_REDUMP_ANGLES).all(axis=1)
+    xgd3_clean = (xgd3_angles[:, ANGLE_BYTES] == FIXED_ANGLES).all(axis=1)
+    xgd3_kreon = ~xgd3_angles[:, SECOND_ANGLE].any(axis=1) & xgd3_angles[:, FIRST_ANGLE].any(axis=1)
+
+    # Same precedence as AngleProfiles.classify
+    style = np.select([
+        (xgd == 2) & xgd2_clean_kreon,
+        (xgd == 2) & xgd2_clean_0800,
+        (xgd == 2) & xgd2_kreon,
+        xgd == 2,
+        (xgd == 3) & xgd3_clean_kreon,
+        xgd == 3,
+        (xgd == 4) & xgd3_clean,
+        (xgd == 4) & xgd3_kreon,
+        xgd == 4,
+    ], range(1, 10), 0)
+    return style.astype(np.uint8)
+
+
+def hashes(matrix, xgd):
+    # Cleaned sectors are built for the whole batch with fancy indexing, only the CRC is per row
+    cleaned = matrix.copy()
+    rows = np.flatnonzero(xgd == 1)
+    cleaned[rows, 0x200:0x2CF] = 0
+    cleaned[rows, 0x5DF:0x5E7] = 0
+    cleaned[rows, 0x5FA:0x65F] = 0
+    rows = np.flatnonzero(xgd == 2)
+    cleaned[rows[:, None], 552 + ANGLE_BYTES] = KREON_ANGLES
+    rows = np.flatnonzero(xgd == 3)
+    cleaned[rows[:, None], 552 + FIRST_ANGLE] = XGD3_REDUMP_ANGLES
+    rows = np.flatnonzero(xgd == 4)
+    cleaned[rows[:, None], 72 + ANGLE_BYTES] = FIXED_ANGLES
+
+    ss_crc = np.fromiter((zlib.crc32(row) for row in matrix), dtype=np.uint32, count=len(matrix))
+    clean_crc = np.fromiter((zlib.crc32(row) for row in cleaned), dtype=np.uint32, count=len(cleaned))
+    internal_crc = np.where(xgd == 1, clean_crc, 0).astype(np.uint32)
+    redump_crc = np.where(xgd > 1, clean_crc, 0).astype(np.uint32)
+    return ss_crc, internal_crc, redump_crc
+
+
+def lba_ranges(matrix, xgd):
+    table = matrix[:, 0x661:0x661 + 23 * 9].reshape(-1, 23, 9)
+    psn_start = be_uint(table[:, :, 3:6])
+    psn_end = be_uint(table[:, :, 6:9])
+
+    entry = np.arange(1, 24)
+    xgd1 = (xgd == 1)[:, None]
+    layer0 = np.where(xgd1, entry < 9, entry == 1)
+    layer1 = np.where(xgd1, (entry >= 9) & (entry < 17), entry == 4)
+    layer1_offset = (be_uint(matrix[:, 12:16]) * 2 - 196608 + 1)[:, None]
+    lba_start = np.where(layer0, psn_start - 196608, layer1_offset - (~psn_start & 0xFFFFFF))
+    lba_end = np.where(layer0, psn_end - 196608, layer1_offset - (~psn_end & 0xFFFFFF))
+    return psn_start, psn_end, lba_start, lba_end, (layer0 | layer1) & (xgd > 0)[:, None]
+
+
+def parse_matrix(matrix, loaded=None):
+    if loaded is None:
+        loaded = np.ones(len(matrix), dtype=bool)
+    result = classify(matrix)
+    xgd = np.where(loaded, result["xgd"], 0).astype(np.uint8)
+    result["xgd"] = xgd
+    result["loaded"] = loaded
+    result["style"] = angle_profile(matrix, xgd)
+    result["ss_crc"], result["internal_crc"], result["redump_crc"] = hashes(matrix, xgd)
+
+    cpr_mai = np.where(xgd == 4, be_uint(matrix[:, 0x0F0:0x0F4]), be_uint(matrix[:, 0x2D0:0x2D4]))
+    result["cpr_mai"] = cpr_mai.astype(np.uint32)
+    result["media_id"] = np.where((xgd > 1)[:, None], matrix[:, 0x460:0x470], 0)
+
+    result["creation_time"], creation_valid = filetimes(matrix[:, 0x41F:0x427])
+    result["creation_time"][xgd != 1] = np.datetime64('NaT')
+    result["authoring_time"], authoring_valid = filetimes(matrix[:, 0x49F:0x4A7])
+    result["mastering_time"], mastering_valid = filetimes(matrix[:, 0x5DF:0x5E7])
+    result["invalid_timestamps"] = (xgd > 0) & (~authoring_valid | ~mastering_valid | ((xgd == 1) & ~creation_valid))
+    cert_time = le_uint64(np.pad(matrix[:, 0x4A7:0x4AB], ((0, 0), (0, 4)))).astype(np.int64)
+    result["certificate_time"] = np.where((xgd == 1) & (cert_time != 0), cert_time.astype('datetime64[s]'), np.datetime64('NaT', 's'))
+
+    (result["psn_start"], result["psn_end"], result["lba_start"],
+     result["lba_end"], result["lba_valid"]) = lba_ranges(matrix, xgd)
+    result["duplicate_range_mismatch"] = (matrix[:, 0x661:0x730] != matrix[:, 0x730:0x7FF]).any(axis=1)
+
+    result["reserved_zeroed"] = ~((matrix != 0) & RESERVED_MASKS[xgd]).any(axis=1)
+    return result
+
+
+def parse_files(file_paths):
+    matrix, loaded, errors = load_matrix(file_paths)
+    result = parse_matrix(matrix, loaded)
+    result["path"] = np.array(file_paths, dtype=object)
+    result["error"] = np.array([errors.get(i, "") for i in range(len(file_paths))], dtype=object)
+    return result
+
+
+def format_time(value):
+    if np.isnat(value):
+        return ""
+    return np.datetime_as_string(value, unit='us').replace('T', ' ').replace('.', '')
+
+
+def rows(result):
+    for i in range(len(result["xgd"])):
+        xgd = int(result["xgd"][i])
+        media_id = bytes(result["media_id"][i]).hex().upper() if xgd > 1 else ""
+        lba_ranges = [f"{result['lba_start'][i, j]}-{result['lba_end'][i, j]}" for j in np.flatnonzero(result["lba_valid"][i])]
+        yield {
+            "path": result["path"][i],
+            "system": ParseSS.SYSTEM_NAMES.get(xgd, ""),
+            "style": STYLE_NAMES[result["style"][i]],
+            "ss_crc": f"{result['ss_crc'][i]:08X}" if xgd else "",
+            "internal_crc": f"{result['internal_crc'][i]:08X}" if xgd == 1 else "",
+            "redump_crc": f"{result['redump_crc'][i]:08X}" if xgd > 1 else "",
+            "cpr_mai": f"{result['cpr_mai'][i]:08X}" if xgd else "",
+            "media_id": media_id[:-8] + '-' + media_id[-8:] if media_id else "",
+            "creation_time": format_time(result["creation_time"][i]),
+            "authoring_time": format_time(result["authoring_time"][i]),
+            "mastering_time": format_time(result["mastering_time"][i]),
+            "lba_ranges": " ".join(lba_ranges),
+            "reserved_zeroed": bool(result["reserved_zeroed"][i]) if xgd else "",
+            "error": result["error"][i] or ("" if xgd else "Could not detect XGD version"),
+        }
+
+
+def print_summary(result, verbose):
+    xgd = result["xgd"]
+    print(f"Files: {len(xgd)}")
+    for name in dict.fromkeys(ParseSS.SYSTEM_NAMES.values()):
+        values = [value for value, system in ParseSS.SYSTEM_NAMES.items() if system == name]
+        count = np.count_nonzero(np.isin(xgd, values))
+        if count:
+            print(f"{name}: {count}")
+    for value, name in enumerate(STYLE_NAMES):
+        count = np.count_nonzero(result["style"] == value) if value else 0
+        if count:
+            print(f"    {name}: {count}")
+    checks = [
+        ("Unrecognised or unreadable", xgd == 0),
+        ("Malformed XGD2", result["malformed_xgd2"]),
+        ("Unexpected value at 0x4BA", result["unexpected_0x4ba"] & (xgd > 0)),
+        ("Invalid timestamps", result["invalid_timestamps"]),
+        ("Duplicated SS range mismatch", result["duplicate_range_mismatch"] & (xgd > 0)),
+        ("Unexpected data in reserved bytes", ~result["reserved_zeroed"] & (xgd > 0)),
+    ]
+    for label, flags in checks:
+        count = np.count_nonzero(flags)
+        if count:
+            print(f"[WARNING] {label}: {count}")
+            if verbose:
+                for i in np.flatnonzero(flags):
+                    print(f"    {result['path'][i]}")
+
+
+if __name__ == "__main__":
+    try:
+        if len(sys.argv) < 2 or len(sys.argv) > 7:
+            print("Usage: python BatchSS.py <directory> [-v|--verbose] [-r|--recursive] [-s|--ss-only] [-o|--output FILE.csv]")
+            print()
+            print("Options:")
+            print("input: directory of SS files to parse")
+            print("-v, --verbose\t Lists the files behind each warning")
+            print("-r, --recursive\t Parses all files in dir recursively")
+            print("-s, --ss-only\t Only parses .bin files in dir that start with SS")
+            print("-o, --output FILE Writes one CSV row per file")
+            sys.exit(0)
+
+        input_path = None
+        verbose = False
+        recursive = False
+        ss_only = False
+        output_path = None
+        args = iter(sys.argv[1:])
+        for arg in args:
+            if arg in ("-v", "--verbose"):
+                verbose = True
+            elif arg in ("-r", "--recursive"):
+                recursive = True
+            elif arg in ("-s", "--ss-only"):
+                ss_only = True
+            elif arg in ("-o", "--output"):
+                output_path = next(args, None)
+                if not output_path:
+                    print("[ERROR] --output requires a file path")
+                    sys.exit(0)
+            else:
+                input_path = arg
+
+        if not input_path or not os.path.isdir(input_path):
+            print(f"[ERROR] Invalid directory: {input_path}")
+            sys.exit(0)
+
+        result = parse_files(list(ParseSS.find_files(input_path, recursive, ss_only)))
+        print_summary(result, verbose)
+        if output_path:
+            with open(output_path, 'w', newline='') as f:
+                writer = None
+                for row in rows(result):
+                    if writer is None:
+                        writer = csv.DictWriter(f, fieldnames=list(row))
+                        writer.writeheader()
+                    writer.writerow(row)
+    except Exception as e:
+        print(f"[ERROR] {e}")
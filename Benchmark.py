@@ -0,0 +1,277 @@
+import sys
+import os
+import json
+import time
+import platform
+import datetime
+import tempfile
+import subprocess
+from contextlib import redirect_stdout
+import SyntheticCorpus
+import CCRT
+import ParseSS
+import ParseDMI
+import ParseXBE
+import ParseXEX
+import CleanSS
+import RepairSS
+import RebuildSS
+
+
+RESULTS_VERSION = 1
+SS_KINDS = [name for name, _, _ in SyntheticCorpus.variants() if name.startswith("ss_")]
+# RepairSS only accepts XGD2 and good XGD3 SS
+REPAIR_KINDS = [name for name in SS_KINDS if name.startswith("ss_xgd2") or name in ("ss_xgd3_raw_0800", "ss_xgd3_clean")]
+RAW_KINDS = ["rawss_xgd1", "rawss_xgd2", "rawss_xgd3"]
+DMI_KINDS = ["dmi_xgd1", "dmi_xgd23"]
+
+
+def read_file(file_path, size):
+    with open(file_path, 'rb') as f:
+        return f.read(size)
+
+
+def xgd_of(data, offset):
+    layerbreak = data[offset:offset + 3]
+    for xgd, value in SyntheticCorpus.LAYERBREAKS.items():
+        if layerbreak == value.to_bytes(3, 'big'):
+            return xgd
+    return None
+
+
+# Each benchmark runs its stages in order for one input, the output of a stage is the input of the next
+def parse_ss_stages(file_path):
+    return (
+        ("read", lambda _: read_file(file_path, 2048)),
+        ("parse", ParseSS.parse_ss_bytes),
+        ("print", lambda record: ParseSS.print_record(record, False)),
+    )
+
+
+def parse_dmi_stages(file_path):
+    return (
+        ("read", lambda _: read_file(file_path, 2048)),
+        ("parse", ParseDMI.parse_dmi_bytes),
+        ("print", lambda record: ParseDMI.print_record(record, False)),
+    )
+
+
+def parse_xbe_stages(file_path):
+    def read(_):
+        with open(file_path, 'rb') as f:
+            file_size = os.fstat(f.fileno()).st_size
+            return ParseXBE.read_headers(f, file_size), file_size
+    return (
+        ("read", read),
+        ("parse", lambda loaded: ParseXBE.parse_xbe_bytes(loaded[0], loaded[1], file_path)),
+        ("print", ParseXBE.print_record),
+    )
+
+
+def parse_xex_stages(file_path):
+    def parse(_):
+        with open(file_path, 'rb') as f:
+            return ParseXEX.read_record(f, os.fstat(f.fileno()).st_size)
+    return (
+        ("read_parse", parse),
+        ("print", ParseXEX.print_record),
+    )
+
+
+def clean_ss_stages(data):
+    return (
+        ("copy", lambda _: bytearray(data)),
+        ("clean", lambda ss: CleanSS.clean_ss(ss, False, False)),
+    )
+
+
+def repair_ss_stages(data):
+    return (
+        ("repair", lambda _: RepairSS.repair_ss(data, xgd_of(data, 13))),
+    )
+
+
+def rebuild_ss_stages(data):
+    return (
+        ("rebuild", lambda _: RebuildSS.rebuild_ss(data, xgd_of(data, 0x19))),
+    )
+
+
+# Name, corpus kinds, whether inputs are loaded into memory before timing, stage builder
+BENCHMARKS = (
+    ("ParseSS.parse_file", SS_KINDS, False, parse_ss_stages),
+    ("ParseDMI.parse_file", DMI_KINDS, False, parse_dmi_stages),
+    ("ParseXBE.parse_file", ["xbe"], False, parse_xbe_stages),
+    ("ParseXEX.parse_file", ["xex"], False, parse_xex_stages),
+    ("CleanSS.clean_ss", SS_KINDS, True, clean_ss_stages),
+    ("RepairSS.repair_ss", REPAIR_KINDS, True, repair_ss_stages),
+    ("RebuildSS.rebuild_ss", RAW_KINDS, True, rebuild_ss_stages),
+)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(nanoseconds):
+    return {
+        "mean_us": sum(nanoseconds) / len(nanoseconds) / 1000,
+        "p50_us": percentile(nanoseconds, 0.50) / 1000,
+        "p95_us": percentile(nanoseconds, 0.95) / 1000,
+        "max_us": max(nanoseconds) / 1000,
+    }
+
+
+def run_benchmark(inputs, make_stages, repeat):
+    # Returns the fastest pass over all inputs and the per-file latency of every stage across all passes
+    stage_times = {}
+    file_times = []
+    best = None
+    errors = 0
+    for _ in range(repeat):
+        # Every pass starts cold, the corpus has no re-dumps for the CCRT cache to hit
+        CCRT.decrypt_ccrt1_table.cache_clear()
+        CCRT.decrypt_ccrt2_table.cache_clear()
+        errors = 0
+        elapsed = 0
+        for item in inputs:
+            total = 0
+            value = None
+            for stage, run in make_stages(item):
+                start = time.perf_counter_ns()
+                try:
+                    value = run(value)
+                except Exception:
+                    errors += 1
+                    break
+                finally:
+                    spent = time.perf_counter_ns() - start
+                    stage_times.setdefault(stage, []).append(spent)
+                    total += spent
+            file_times.append(total)
+            elapsed += total
+        best = elapsed if best is None else min(best, elapsed)
+    return {
+        "files": len(inputs),
+        "errors": errors,
+        "seconds": best / 1e9,
+        "files_per_sec": len(inputs) / (best / 1e9) if best else None,
+        "latency": summarize(file_times),
+        "stages": {stage: summarize(times) for stage, times in stage_times.items()},
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_corpus(directory):
+    corpus = {}
+    for name, _, _ in SyntheticCorpus.variants():
+        folder = os.path.join(directory, name)
+        if os.path.isdir(folder):
+            corpus[name] = sorted(os.path.join(folder, entry) for entry in os.listdir(folder))
+    return corpus
+
+
+def run_benchmarks(corpus, repeat):
+    results = {}
+    with open(os.devnull, 'w') as null, redirect_stdout(null):
+        for name, kinds, in_memory, make_stages in BENCHMARKS:
+            inputs = [file_path for kind in kinds for file_path in corpus.get(kind, [])]
+            if not inputs:
+                continue
+            if in_memory:
+                inputs = [read_file(file_path, 2064) for file_path in inputs]
+            results[name] = run_benchmark(inputs, make_stages, repeat)
+    return results
+
+
+def print_results(results, baseline=None):
+    print(f"{'Benchmark':<24}{'Files':>7}{'Errors':>8}{'Files/s':>11}{'p50 us':>10}{'p95 us':>10}{'Max us':>10}{'Change':>9}")
+    for name, result in results["benchmarks"].items():
+        change = ""
+        if baseline is not None and name in baseline["benchmarks"]:
+            old = baseline["benchmarks"][name]["files_per_sec"]
+            if old:
+                change = f"{(result['files_per_sec'] / old - 1) * 100:+.1f}%"
+        latency = result["latency"]
+        print(f"{name:<24}{result['files']:>7}{result['errors']:>8}{result['files_per_sec']:>11.0f}"
+              f"{latency['p50_us']:>10.1f}{latency['p95_us']:>10.1f}{latency['max_us']:>10.1f}{change:>9}")
+        for stage, times in result["stages"].items():
+            print(f"    {stage:<20}{'':>26}{times['p50_us']:>10.1f}{times['p95_us']:>10.1f}{times['max_us']:>10.1f}")
+
+
+if __name__ == "__main__":
+    try:
+        if len(sys.argv) > 13 or any(arg in ("-h", "--help") for arg in sys.argv[1:]):
+            print("Usage: python Benchmark.py [-n|--count N] [--seed N] [--repeat N] [--corpus DIR] [-o|--output FILE.json] [--compare FILE.json]")
+            print()
+            print("Options:")
+            print("-n, --count N\t Number of synthetic files of each kind (default: 200)")
+            print("--seed N\t Random seed for the synthetic files (default: 0)")
+            print("--repeat N\t Runs each benchmark N times and keeps the fastest (default: 3)")
+            print("--corpus DIR\t Reuses the files in DIR, or generates them there if it is empty")
+            print("-o, --output\t Writes the results as JSON")
+            print("--compare\t Shows the change in files/s against results written by --output")
+            sys.exit(0)
+
+        count = 200
+        seed = 0
+        repeat = 3
+        corpus_dir = None
+        output_path = None
+        baseline = None
+        args = iter(sys.argv[1:])
+        for arg in args:
+            if arg in ("-n", "--count"):
+                count = int(next(args, "0"))
+            elif arg == "--seed":
+                seed = int(next(args, "0"))
+            elif arg == "--repeat":
+                repeat = int(next(args, "0"))
+            elif arg == "--corpus":
+                corpus_dir = next(args, None)
+            elif arg in ("-o", "--output"):
+                output_path = next(args, None)
+            elif arg == "--compare":
+                with open(next(args, ""), 'r', encoding='utf-8') as f:
+                    baseline = json.load(f)
+            else:
+                print(f"[ERROR] Unknown option: {arg}")
+                sys.exit(0)
+        if count < 1 or repeat < 1:
+            print("[ERROR] --count and --repeat require a positive number")
+            sys.exit(0)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            if corpus_dir is None:
+                corpus = SyntheticCorpus.generate(temp_dir, count, seed)
+            else:
+                corpus = load_corpus(corpus_dir)
+                if not corpus:
+                    corpus = SyntheticCorpus.generate(corpus_dir, count, seed)
+            results = {
+                "version": RESULTS_VERSION,
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "date": datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC'),
+                "count": count,
+                "seed": seed,
+                "repeat": repeat,
+                "benchmarks": run_benchmarks(corpus, repeat),
+            }
+
+        print_results(results, baseline)
+        if output_path:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+                f.write("\n")
+    except Exception as e:
+        print(f"[ERROR] {e}")
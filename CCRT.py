@@ -0,0 +1,62 @@
+import hashlib
+from functools import lru_cache
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+except ImportError:
+    print("The 'cryptography' module is needed to decrypt the Challenge Response Table.")
+    print("Please install 'cryptography' using pip:")
+    print("python -m pip install cryptography")
+    raise
+try:
+    from cryptography.hazmat.decrepit.ciphers.algorithms import ARC4
+except ImportError:
+    # cryptography < 43 only has ARC4 with the other algorithms
+    ARC4 = getattr(algorithms, "ARC4", None)
+
+
+AES_KEY = bytes([0xD1, 0xE3, 0xB3, 0x3A, 0x6C, 0x1E, 0xF7, 0x70, 0x5F, 0x6D, 0xE9, 0x3B, 0xB6, 0xC0, 0xDC, 0x71])
+# Re-dumps of the same disc share identical tables
+CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def decrypt_ccrt1_table(key_input, table):
+    key = hashlib.sha1(key_input).digest()[:7]
+    if ARC4 is not None:
+        return Cipher(ARC4(key), mode=None).decryptor().update(table)
+
+    S = list(range(256))
+    j = 0
+    for i in range(256):
+        j = (j + S[i] + key[i % len(key)]) % 256
+        S[i], S[j] = S[j], S[i]
+    out = bytearray(len(table))
+    x = 0
+    y = 0
+    for pos in range(len(table)):
+        x = (x + 1) % 256
+        y = (y + S[x]) % 256
+        S[x], S[y] = S[y], S[x]
+        out[pos] = table[pos] ^ S[(S[x] + S[y]) % 256]
+    return bytes(out)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def decrypt_ccrt2_table(table):
+    # 15 AES-CBC blocks with a zero IV, the last 12 bytes are stored in the clear
+    return Cipher(algorithms.AES(AES_KEY), modes.CBC(bytes(16))).decryptor().update(table[:240]) + table[240:252]
+
+
+def encrypt_ccrt2_table(table):
+    # Inverse of decrypt_ccrt2_table, RC4 needs no counterpart as it is its own inverse
+    return Cipher(algorithms.AES(AES_KEY), modes.CBC(bytes(16))).encryptor().update(table[:240]) + table[240:252]
+
+
+def decrypt_ccrt1(data):
+    # XGD1: 253 bytes at 770, RC4 keyed on the SHA-1 of bytes 1183..1226
+    return decrypt_ccrt1_table(bytes(data[1183:1183 + 44]), bytes(data[770:770 + 253]))
+
+
+def decrypt_ccrt2(data):
+    # XGD2/3: 252 bytes at 0x304
+    return decrypt_ccrt2_table(bytes(data[0x304:0x304 + 252]))
@@ -1,5 +1,13 @@
 import os
 import sys
+import shutil
+import tempfile
+import AngleProfiles
+import RecordWriter
+import SectorPack
+
+XGD_NAMES = {1: "XGD1", 2: "XGD2", 3: "XGD3", None: "Invalid"}
+BATCH_STATUSES = ("cleaned", "unchanged", "invalid", "error")
 
 def get_xgd_type(ss):
     layerbreak = (ss[13] << 16) | (ss[14] << 8) | ss[15]
@@ -19,50 +27,13 @@ def clean_ss(ss, ssv2, fix):
             ss[0x200:0x2D0] = b'\x00' * (0x2D0 - 0x200)
         return True
     elif xgd_type == 2:
-        ss[552] = 0x01
-        ss[553] = 0x00
-        ss[555] = 0x01 if ssv2 else 0x00
-        ss[556] = 0x00
-        ss[561] = 0x5B
-        ss[562] = 0x00
-        ss[564] = 0x5B if ssv2 else 0x00
-        ss[565] = 0x00
-        ss[570] = 0xB5
-        ss[571] = 0x00
-        ss[573] = 0xB5 if ssv2 else 0x00
-        ss[574] = 0x00
-        ss[579] = 0x0F
-        ss[580] = 0x01
-        ss[582] = 0x0F if ssv2 else 0x00
-        ss[583] = 0x01 if ssv2 else 0x00
+        AngleProfiles.apply(ss, AngleProfiles.XGD2_CLEAN_0800 if ssv2 else AngleProfiles.XGD2_CLEAN_KREON)
         return True
     elif xgd_type == 3:
         if any(x != 0 for x in ss[32:32+72]):
-            ss[72] = 0x01
-            ss[73] = 0x00
-            ss[75] = 0x01
-            ss[76] = 0x00
-            ss[81] = 0x5B
-            ss[82] = 0x00
-            ss[84] = 0x5B
-            ss[85] = 0x00
-            ss[90] = 0xB5
-            ss[91] = 0x00
-            ss[93] = 0xB5
-            ss[94] = 0x00
-            ss[99] = 0x0F
-            ss[100] = 0x01
-            ss[102] = 0x0F
-            ss[103] = 0x01
+            AngleProfiles.apply(ss, AngleProfiles.XGD3_CLEAN)
         else:
-            ss[552] = 0x01
-            ss[553] = 0x00
-            ss[561] = 0x5B
-            ss[562] = 0x00
-            ss[570] = 0xB5
-            ss[571] = 0x00
-            ss[579] = 0x0F
-            ss[580] = 0x01
+            AngleProfiles.apply(ss, AngleProfiles.XGD3_CLEAN_KREON)
         return True
     return False
 
@@ -74,37 +45,160 @@ def process_file(file_path, ssv2, fix):
                 if clean_ss(data, ssv2, fix):
                     f.seek(0)
                     f.write(data)
+                    return True
                 else:
                     print(f"Invalid SS: {file_path}")
         else:
             print(f"Invalid SS: {file_path}")
     except Exception as e:
         print(f"Error processing {file_path}: {e}")
+    return False
 
-def process_directory(directory, recursive, ssv2, fix):
+def find_files(directory, recursive):
     for root, _, files in os.walk(directory):
         for name in files:
-            process_file(os.path.join(root, name), ssv2, fix)
+            yield os.path.join(root, name)
         if not recursive:
             break
 
+def process_directory(directory, recursive, ssv2, fix):
+    for file_path in find_files(directory, recursive):
+        process_file(file_path, ssv2, fix)
+
+def write_atomic(file_path, data):
+    # A crash leaves either the old or the new file, never a partly written one
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(prefix=".clean_", dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates the file readable by its owner only
+        if os.path.exists(file_path):
+            shutil.copymode(file_path, temp_path)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(temp_path, 0o666 & ~umask)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+def batch_file(file_path, ssv2, fix):
+    # Worker entry point for --batch, returns (XGD type, status, message)
+    try:
+        with open(file_path, 'rb') as f:
+            original = f.read(2049)
+        if len(original) != 2048:
+            return None, "invalid", f"Invalid SS: {file_path}"
+        data = bytearray(original)
+        xgd_type = get_xgd_type(data)
+        if not clean_ss(data, ssv2, fix):
+            return xgd_type, "invalid", f"Invalid SS: {file_path}"
+        if data == original:
+            return xgd_type, "unchanged", None
+        write_atomic(file_path, data)
+        return xgd_type, "cleaned", None
+    except Exception as e:
+        return None, "error", f"Error processing {file_path}: {e}"
+
+def batch_files(file_paths, ssv2, fix, jobs):
+    from concurrent.futures import ProcessPoolExecutor
+    counts = {}
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for xgd_type, status, message in executor.map(batch_file, file_paths, [ssv2] * len(file_paths), [fix] * len(file_paths), chunksize=64):
+            if message is not None:
+                print(message)
+            counts.setdefault(xgd_type, dict.fromkeys(BATCH_STATUSES, 0))[status] += 1
+    print_summary(counts)
+
+def print_summary(counts):
+    print(f"{'Type':<9}" + "".join(f"{status.capitalize():>11}" for status in BATCH_STATUSES))
+    totals = dict.fromkeys(BATCH_STATUSES, 0)
+    for xgd_type in (1, 2, 3, None):
+        if xgd_type in counts:
+            print(f"{XGD_NAMES[xgd_type]:<9}" + "".join(f"{counts[xgd_type][status]:>11}" for status in BATCH_STATUSES))
+            for status in BATCH_STATUSES:
+                totals[status] += counts[xgd_type][status]
+    print(f"{'Total':<9}" + "".join(f"{totals[status]:>11}" for status in BATCH_STATUSES))
+
+def clean_pack(pack_path, ssv2, fix):
+    # Cleans a SectorPack in place, only changed sectors are written back and their CRC32 updated in the index
+    counts = {}
+    with SectorPack.SectorPack(pack_path, writable=True) as pack:
+        for i, (entry, sector) in enumerate(pack):
+            data = bytearray(sector)
+            xgd_type = get_xgd_type(data)
+            if not clean_ss(data, ssv2, fix):
+                print(f"Invalid SS: {entry['path']}")
+                status = "invalid"
+            elif data == sector:
+                status = "unchanged"
+            else:
+                pack.replace(i, data)
+                status = "cleaned"
+            counts.setdefault(xgd_type, dict.fromkeys(BATCH_STATUSES, 0))[status] += 1
+    print_summary(counts)
+
+def report_files(file_paths, ssv2, fix, output_format):
+    with RecordWriter.RecordWriter(output_format, RecordWriter.REPORT_FIELDS) as writer:
+        for file_path in file_paths:
+            writer.write(file_path, RecordWriter.change_report(file_path, process_file, ssv2, fix))
+
 def main():
     if len(sys.argv) < 2:
-        print("Usage: python CleanSS.py <file|directory> [-r|--recursive] [-s|--ssv2] [-f|--fix]")
+        print("Usage: python CleanSS.py <file|directory> [-r|--recursive] [-s|--ssv2] [-f|--fix] [--format text|jsonl|csv] [-b|--batch] [-j|--jobs N]")
         print("")
         print("--ssv2 cleans and upgrades the SS to SSv2 format")
         print("--fix cleans Original Xbox SS that are rarely incorrectly written to by some drives")
+        print("--format writes a change report per file as JSON Lines or CSV")
+        print("--batch only rewrites files that change, through a temporary file, using N worker processes (--jobs, default: all CPUs) and prints a summary by XGD type")
+        print("A sector pack made by SectorPack.py is cleaned in place in one pass and prints the same summary")
         return
 
     path = sys.argv[1]
     recursive = any(arg in ('-r', '--recursive') for arg in sys.argv[2:])
     ssv2 = any(arg in ('-s', '--ssv2') for arg in sys.argv[2:])
     fix = any(arg in ('-f', '--fix') for arg in sys.argv[2:])
+    output_format = "text"
+    if '--format' in sys.argv[2:]:
+        i = sys.argv.index('--format', 2)
+        output_format = sys.argv[i + 1].lower() if i + 1 < len(sys.argv) else ""
+        if output_format not in RecordWriter.FORMATS:
+            print("--format must be text, jsonl or csv")
+            return
+    batch = any(arg in ('-b', '--batch') for arg in sys.argv[2:])
+    jobs = os.cpu_count() or 1
+    for option in ('-j', '--jobs'):
+        if option in sys.argv[2:]:
+            i = sys.argv.index(option, 2)
+            jobs = int(sys.argv[i + 1]) if i + 1 < len(sys.argv) and sys.argv[i + 1].isdigit() else 0
+            if jobs < 1:
+                print("--jobs requires a positive number of workers")
+                return
+    if batch and output_format != "text":
+        print("--batch cannot be combined with --format")
+        return
 
-    if os.path.isdir(path):
-        process_directory(path, recursive, ssv2, fix)
+    if os.path.isfile(path) and SectorPack.is_pack(path):
+        if output_format != "text":
+            print("--format cannot be used with a sector pack")
+            return
+        clean_pack(path, ssv2, fix)
+    elif batch and os.path.exists(path):
+        batch_files(list(find_files(path, recursive)) if os.path.isdir(path) else [path], ssv2, fix, jobs)
+    elif os.path.isdir(path):
+        if output_format != "text":
+            report_files(find_files(path, recursive), ssv2, fix, output_format)
+        else:
+            process_directory(path, recursive, ssv2, fix)
     elif os.path.isfile(path):
-        process_file(path, ssv2, fix)
+        if output_format != "text":
+            report_files([path], ssv2, fix, output_format)
+        else:
+            process_file(path, ssv2, fix)
     else:
         print(f"Invalid path: {path}")
 
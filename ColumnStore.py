@@ -0,0 +1,232 @@
+import sys
+import os
+import json
+import array
+import datetime
+try:
+    import numpy as np
+except ImportError:
+    print("The 'numpy' module is needed to write and query column stores.")
+    print("Please install 'numpy' using pip:")
+    print("python -m pip install numpy")
+    raise
+
+
+FILETIME_EPOCH = 0x19DB1DED53E8000
+MANIFEST = "columns.json"
+STRINGS = "strings.json"
+
+# Column type: array typecode while writing, NumPy dtype on disk, value stored for null
+# Strings are stored as int32 codes into the store's string dictionary
+TYPES = {
+    "bool": ("b", "int8", -1),
+    "int8": ("b", "int8", -1),
+    "int16": ("h", "int16", -1),
+    "int64": ("q", "int64", -1),
+    "uint64": ("Q", "uint64", 0xFFFFFFFFFFFFFFFF),
+    "str": ("i", "int32", -1),
+}
+
+# Stored fields per record type, every store also has a path column
+SCHEMAS = {
+    "SS": (
+        ("xgd", "int8"), ("has_ss_table", "bool"), ("style", "str"), ("ss_crc", "int64"), ("internal_crc", "int64"),
+        ("redump_crc", "int64"), ("fixed_angles_crc", "int64"), ("abgx_crc", "int64"), ("lba_start", "int64"), ("lba_layerbreak", "int64"),
+        ("lba_final", "int64"), ("cpr_mai", "int64"), ("media_id", "str"), ("creation_filetime", "uint64"),
+        ("authoring_filetime", "uint64"), ("mastering_filetime", "uint64"), ("certificate_time", "str"),
+        ("reserved_zeroed", "bool"), ("redump_status", "str"), ("error", "str"),
+    ),
+    "DMI": (
+        ("xgd", "int8"), ("dmi_crc", "int64"), ("has_trailer", "bool"), ("xmid", "str"), ("xemid", "str"),
+        ("media_id", "str"), ("key_id", "int16"), ("dmi_filetime", "uint64"), ("pfi_crc", "str"),
+        ("xbox_signature_valid", "bool"), ("reserved_zeroed", "bool"), ("redump_status", "str"), ("error", "str"),
+    ),
+    "XEX": (
+        ("timestamp", "str"), ("title_id", "str"), ("title_id_name", "str"), ("version", "str"), ("base_version", "str"),
+        ("disc_number", "int16"), ("disc_count", "int16"), ("media_id", "str"), ("region", "str"),
+        ("region_name", "str"), ("allowed_media", "int64"), ("error", "str"),
+    ),
+}
+
+
+def filetime(year):
+    # FILETIME of the first moment of a year, for comparisons with the *_filetime columns
+    return FILETIME_EPOCH + (datetime.date(year, 1, 1) - datetime.date(1970, 1, 1)).days * 864000000000
+
+
+def read_json(file_path):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_json(file_path, value):
+    temp_path = file_path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(value, f, ensure_ascii=False)
+    os.replace(temp_path, file_path)
+
+
+class ColumnWriter:
+    # Same write(file_path, record) interface as RecordWriter, the columns are saved when it is closed
+    # Records are added to an existing store of the same type, and a file written again replaces its earlier row
+    def __init__(self, store_path, kind):
+        self.store_path = store_path
+        self.kind = kind
+        self.schema = (("path", "str"),) + SCHEMAS[kind]
+        self.columns = {name: array.array(TYPES[column_type][0]) for name, column_type in self.schema}
+        self.strings = {name: {} for name, column_type in self.schema if column_type == "str"}
+        if os.path.exists(os.path.join(store_path, MANIFEST)):
+            self.load()
+
+    def load(self):
+        store = ColumnStore(self.store_path)
+        if store.kind != self.kind:
+            raise ValueError(f"{self.store_path} holds {store.kind} records, not {self.kind}")
+        for name, column_type in self.schema:
+            if name in store.columns:
+                self.columns[name].frombytes(store.columns[name].tobytes())
+            else:
+                self.columns[name].extend([TYPES[column_type][2]] * len(store))
+            if column_type == "str":
+                self.strings[name] = {value: code for code, value in enumerate(store.strings.get(name, []))}
+
+    def write(self, file_path, record):
+        row = dict(record, path=file_path)
+        for name, column_type in self.schema:
+            value = row.get(name)
+            if column_type == "str":
+                if value is None:
+                    value = -1
+                else:
+                    codes = self.strings[name]
+                    value = codes.setdefault(str(value), len(codes))
+            elif value is None:
+                value = TYPES[column_type][2]
+            self.columns[name].append(value)
+
+    def close(self):
+        os.makedirs(self.store_path, exist_ok=True)
+        paths = np.frombuffer(self.columns["path"], dtype=np.int32)
+        # Keeps the last row written for each path, in the order the rows were first written
+        _, last = np.unique(paths[::-1], return_index=True)
+        keep = np.sort(len(paths) - 1 - last)
+        for name, column_type in self.schema:
+            column = np.frombuffer(self.columns[name], dtype=TYPES[column_type][1])[keep]
+            np.save(os.path.join(self.store_path, name + ".npy"), column)
+        write_json(os.path.join(self.store_path, STRINGS), {name: list(codes) for name, codes in self.strings.items()})
+        # The manifest is written last, so a store is only opened once all of its columns are complete
+        write_json(os.path.join(self.store_path, MANIFEST), {"kind": self.kind, "count": len(keep), "columns": dict(self.schema)})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ColumnStore:
+    # Columns are memory-mapped, so a scan only reads the columns it touches
+    def __init__(self, store_path):
+        manifest = read_json(os.path.join(store_path, MANIFEST))
+        self.kind = manifest["kind"]
+        self.count = manifest["count"]
+        self.types = manifest["columns"]
+        self.columns = {name: np.load(os.path.join(store_path, name + ".npy"), mmap_mode="r") for name in self.types}
+        self.strings = read_json(os.path.join(store_path, STRINGS))
+        self.codes = {}
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def code(self, name, value):
+        # Code of a string in a column's dictionary, -2 if no row has it
+        if name not in self.codes:
+            self.codes[name] = {string: code for code, string in enumerate(self.strings[name])}
+        return self.codes[name].get(value, -2)
+
+    def equals(self, name, value):
+        if self.types[name] == "str":
+            return self.columns[name] == self.code(name, value)
+        return self.columns[name] == value
+
+    def in_year(self, name, year):
+        column = self.columns[name]
+        return (column >= filetime(year)) & (column < filetime(year + 1))
+
+    def values(self, name, rows=None):
+        # Decoded values of a column, None for null
+        column = self.columns[name] if rows is None else self.columns[name][rows]
+        column_type = self.types[name]
+        if column_type == "str":
+            strings = self.strings[name]
+            return [strings[code] if code >= 0 else None for code in column.tolist()]
+        null = TYPES[column_type][2]
+        if column_type == "bool":
+            return [bool(value) if value != null else None for value in column.tolist()]
+        return [value if value != null else None for value in column.tolist()]
+
+
+def parse_value(store, name, value):
+    column_type = store.types[name]
+    if column_type == "str":
+        return value
+    if column_type == "bool":
+        return {"true": 1, "false": 0}[value.lower()]
+    return int(value, 0)
+
+
+def parse_condition(store, condition, option):
+    name, _, value = condition.partition("=")
+    if name not in store.types or not value:
+        print(f"[ERROR] {option} requires FIELD=VALUE with one of: {', '.join(store.types)}")
+        sys.exit(0)
+    return name, value
+
+
+if __name__ == "__main__":
+    try:
+        if len(sys.argv) < 2:
+            print("Usage: python ColumnStore.py <store> [--where FIELD=VALUE]... [--year FIELD=YEAR]... [-c|--count]")
+            print()
+            print("Options:")
+            print("store: directory written by ParseSS, ParseDMI or ParseXEX --store")
+            print("--where\t\t Keeps rows where FIELD equals VALUE, numbers can be given in hex as 0x...")
+            print("--year\t\t Keeps rows where the *_filetime FIELD falls in YEAR")
+            print("-c, --count\t Only prints the number of matching rows")
+            sys.exit(0)
+
+        store = None
+        conditions = []
+        count_only = False
+        args = iter(sys.argv[1:])
+        for arg in args:
+            if arg in ("--where", "--year"):
+                conditions.append((arg, next(args, "")))
+            elif arg in ("-c", "--count"):
+                count_only = True
+            else:
+                store = arg
+
+        if not store or not os.path.isfile(os.path.join(store, MANIFEST)):
+            print("[ERROR] No valid column store provided")
+            sys.exit(0)
+
+        store = ColumnStore(store)
+        rows = np.ones(len(store), dtype=bool)
+        for option, condition in conditions:
+            name, value = parse_condition(store, condition, option)
+            if option == "--where":
+                rows &= store.equals(name, parse_value(store, name, value))
+            else:
+                rows &= store.in_year(name, int(value))
+
+        rows = np.flatnonzero(rows)
+        if not count_only:
+            for file_path in store.values("path", rows):
+                print(file_path)
+        print(f"Matched: {len(rows)} of {len(store)} {store.kind} records")
+    except Exception as e:
+        print(f"[ERROR] {e}")
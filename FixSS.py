@@ -0,0 +1,180 @@
+import sys
+import os
+import io
+from contextlib import redirect_stdout
+import CleanSS
+import RepairSS
+import RebuildSS
+import ParseSS
+import RecordWriter
+
+
+STAGES = ("rebuild", "repair", "clean")
+# Columns written by --format jsonl|csv, the parsed fields of the final SS follow the fix-up result
+FIELDS = ("path", "status", "applied", "fix_messages") + ParseSS.FIELDS[1:]
+
+
+def repairable(ss):
+    # RepairSS only handles XGD2 and good XGD3 SS, the others pass through unrepaired
+    xgd = CleanSS.get_xgd_type(ss)
+    return xgd == 2 or (xgd == 3 and ss[32:104] != b'\x00' * 72)
+
+
+def fix_ss(data, stages, ssv2=False, fix=False):
+    # Runs the selected stages on one buffer in memory, returns the final SS (or None if a stage failed) and the stages applied
+    applied = []
+    if len(data) == 2064:
+        if "rebuild" not in stages:
+            print("[ERROR] A raw SS sector can only be fixed with the rebuild stage")
+            return None, applied
+        xgd = RebuildSS.check_raw_ss(data)
+        if xgd is None:
+            return None, applied
+        ss = RebuildSS.rebuild_ss(data, xgd)
+        if ss is None:
+            return None, applied
+        ss = bytearray(ss)
+        applied.append("rebuild")
+        # rebuild_ss already repairs the response table of XGD2/3 from the CCRT, which stays decrypted in CCRT's cache
+    elif len(data) == 2048:
+        ss = bytearray(data)
+        if "repair" in stages and repairable(ss):
+            xgd = RepairSS.check_ss(ss)
+            if xgd is None:
+                return None, applied
+            ss = RepairSS.repair_ss(ss, xgd)
+            if ss is None:
+                return None, applied
+            applied.append("repair")
+    else:
+        print("[ERROR] Not a valid SS: expected a 2048-byte SS or a 2064-byte raw sector")
+        return None, applied
+
+    if "clean" in stages:
+        if not CleanSS.clean_ss(ss, ssv2, fix):
+            print("[ERROR] Not a valid SS: Bad layerbreak")
+            return None, applied
+        applied.append("clean")
+    return bytes(ss), applied
+
+
+def fix_file(file_path, stages, ssv2, fix, output_path=None):
+    # One read and at most one write per file, returns the status and the parsed record of the final SS
+    with open(file_path, 'rb') as f:
+        data = f.read(2065)
+    ss, applied = fix_ss(data, stages, ssv2, fix)
+    if ss is None:
+        return "failed", applied, None
+    if output_path is None:
+        output_path = file_path
+    if ss == data and output_path == file_path:
+        status = "unchanged"
+    else:
+        CleanSS.write_atomic(output_path, ss)
+        status = "changed"
+    return status, applied, ParseSS.parse_ss_bytes(ss)
+
+
+def show_file(file_path, stages, ssv2, fix, verbose, output_path=None):
+    status, applied, record = fix_file(file_path, stages, ssv2, fix, output_path)
+    if record is None:
+        return
+    print(f"[INFO] {status.capitalize()} after: {', '.join(applied) if applied else 'no stages'}")
+    ParseSS.print_record(record, verbose)
+
+
+def write_file(writer, file_path, stages, ssv2, fix, output_path=None):
+    output = io.StringIO()
+    try:
+        with redirect_stdout(output):
+            status, applied, record = fix_file(file_path, stages, ssv2, fix, output_path)
+    except Exception as e:
+        output.write(f"[ERROR] {e}\n")
+        status, applied, record = "failed", [], None
+    row = dict(record or {}, status=status, applied=applied, fix_messages=output.getvalue().splitlines())
+    writer.write(file_path, row)
+
+
+if __name__ == "__main__":
+    try:
+        if len(sys.argv) < 2 or len(sys.argv) > 13:
+            print("Usage: python FixSS.py <filename|directory> [-r|--recursive] [-s|--ss-only] [--stages rebuild,repair,clean] [--ssv2] [--fix] [-o|--output FILE] [-v|--verbose] [--format text|jsonl|csv]")
+            print()
+            print("Options:")
+            print("input: raw SS sector or SS file to fix, or directory of them")
+            print("-r, --recursive\t Fixes all files in dir recursively")
+            print("-s, --ss-only\t Only fixes .bin files in dir that start with SS")
+            print("--stages\t Comma separated stages to apply (default: rebuild,repair,clean)")
+            print("--ssv2\t\t Cleans to SSv2 fixed angles, as CleanSS --ssv2")
+            print("--fix\t\t Clears bad challenge data in XGD1 SS, as CleanSS --fix")
+            print("-o, --output\t Writes the fixed SS to FILE instead of over the input file")
+            print("-v, --verbose\t Prints extra information about the fixed SS")
+            print("--format\t Writes one record per file as JSON Lines or CSV instead of text")
+            sys.exit(0)
+
+        input_path = None
+        recursive = False
+        ss_only = False
+        stages = STAGES
+        ssv2 = False
+        fix = False
+        output_path = None
+        verbose = False
+        output_format = "text"
+        args = iter(sys.argv[1:])
+        for arg in args:
+            if arg in ("-r", "--recursive"):
+                recursive = True
+            elif arg in ("-s", "--ss-only"):
+                ss_only = True
+            elif arg == "--stages":
+                stages = tuple(stage.strip().lower() for stage in next(args, "").split(",") if stage.strip())
+                if not stages or any(stage not in STAGES for stage in stages):
+                    print("[ERROR] --stages must be a comma separated list of rebuild, repair and clean")
+                    sys.exit(0)
+            elif arg == "--ssv2":
+                ssv2 = True
+            elif arg == "--fix":
+                fix = True
+            elif arg in ("-o", "--output"):
+                output_path = next(args, None)
+                if not output_path:
+                    print("[ERROR] --output requires a file path")
+                    sys.exit(0)
+            elif arg in ("-v", "--verbose"):
+                verbose = True
+            elif arg == "--format":
+                output_format = next(args, "").lower()
+                if output_format not in RecordWriter.FORMATS:
+                    print("[ERROR] --format must be text, jsonl or csv")
+                    sys.exit(0)
+            else:
+                input_path = arg
+
+        if not input_path:
+            print("[ERROR] No valid filename provided")
+            sys.exit(0)
+
+        if os.path.isdir(input_path):
+            if output_path is not None:
+                print("[ERROR] --output can only be used with a single file")
+                sys.exit(0)
+            file_paths = RebuildSS.find_files(input_path, recursive, ss_only)
+        elif os.path.isfile(input_path):
+            file_paths = [input_path]
+        else:
+            print(f"[ERROR] Invalid path: {input_path}")
+            sys.exit(0)
+
+        if output_format != "text":
+            with RecordWriter.RecordWriter(output_format, FIELDS) as writer:
+                for file_path in file_paths:
+                    write_file(writer, file_path, stages, ssv2, fix, output_path)
+        elif os.path.isdir(input_path):
+            for file_path in file_paths:
+                print(file_path)
+                show_file(file_path, stages, ssv2, fix, verbose)
+        else:
+            show_file(input_path, stages, ssv2, fix, verbose, output_path)
+    except Exception as e:
+        print(f"[ERROR] {e}")
@@ -0,0 +1,163 @@
+import struct
+
+
+# Field layouts of the SS and DMI, each field is name: (offset, struct format) or (offset, struct format, decode)
+# and is read in place with struct.Struct.unpack_from, so a field access never slices the sector
+
+
+def media_id(raw):
+    media_id_str = raw.hex().upper()
+    return media_id_str[:-8] + '-' + media_id_str[-8:]
+
+
+def text(raw):
+    return raw.split(b'\x00')[0].decode(errors='ignore')
+
+
+SS_COMMON = {
+    "layerbreak": (0x00C, ">I"),
+    "unknown1": (0x100, ">I"),
+    "unknown2": (0x104, ">I"),
+    "ccrt_version": (0x300, "B"),
+    "ccrt_count": (0x301, "B"),
+    "authoring_filetime": (0x49F, "<Q"),
+    "unknown_guid": (0x4BB, "16s"),
+    "ss_sha1_a": (0x4CB, "20s"),
+    "mastering_filetime": (0x5DF, "<Q"),
+    "mastering_time_t": (0x5E7, "<I"),
+    "mastering_flag": (0x5FA, "B"),
+    "mastering_guid": (0x5FB, "16s"),
+    "ss_sha1_b": (0x60B, "20s"),
+    "ss_signature_b": (0x61F, "64s"),
+    "ss_version": (0x65F, "B"),
+    "ranges": (0x661, "207s"),
+    "ranges_copy": (0x730, "207s"),
+}
+
+SS_XGD1 = dict(
+    SS_COMMON,
+    cpr_mai=(0x2D0, "4s"),
+    creation_filetime=(0x41F, "<Q"),
+    certificate_guid=(0x427, "16s"),
+    authoring_guid=(0x43B, "16s"),
+    certificate_time_t=(0x4A7, "<I"),
+)
+
+SS_XGD2 = dict(
+    SS_COMMON,
+    sha1_unknown=(0x108, "19s"),
+    cpr_mai=(0x2D0, "4s"),
+    media_id=(0x460, "16s", media_id),
+    media_id_flag=(0x49E, "B"),
+)
+
+# XGD3 with an SS table moves the CPR_MAI key in front of it
+SS_XGD3 = dict(SS_XGD2, cpr_mai=(0x0F0, "4s"))
+
+DMI_TRAILER = {
+    "pfi_hash": (0x7DC, "8s"),
+    "xbox_signature": (0x7E4, "12s"),
+    "final_checksum": (0x7F0, "16s"),
+}
+
+DMI_XGD1 = dict(
+    DMI_TRAILER,
+    xmid=(0x008, "8s", text),
+    dmi_filetime=(0x010, "<Q"),
+)
+
+DMI_XGD2 = dict(
+    DMI_TRAILER,
+    dmi_filetime=(0x010, "<Q"),
+    key_id=(0x018, "B"),
+    media_id=(0x020, "16s", media_id),
+    xemid=(0x040, "16s", text),
+)
+
+# Reserved bytes that are zero in every valid SS, per ParseSS xgd
+SS_EMPTY_RANGES = {
+    1: [(0x011, 0x2D0), (0x2D4, 0x300), (0x3FF, 0x41F), (0x437, 0x43B), (0x44B, 0x49F), (0x4AB, 0x4BA), (0x7FF, 0x800)],
+    2: [(0x011, 0x100), (0x11C, 0x200), (0x2CF, 0x2D0), (0x2D4, 0x300), (0x302, 0x304), (0x400, 0x460), (0x470, 0x49E), (0x4A7, 0x4BA), (0x5EB, 0x5FA), (0x7FF, 0x800)],
+    3: [(0x011, 0x01B), (0x01C, 0x020), (0x0F5, 0x0FF), (0x302, 0x304), (0x400, 0x460), (0x470, 0x49E), (0x4A7, 0x4BA), (0x5EB, 0x5FA), (0x7FF, 0x800)],
+}
+SS_EMPTY_RANGES[4] = SS_EMPTY_RANGES[3]
+
+# A raw SS sector has a 12-byte header, and its last SS byte is replaced by the scrambled range indices
+RAW_SS_OFFSET = 0x00C
+RAW_EMPTY_RANGES = {xgd: [(start + RAW_SS_OFFSET, end + RAW_SS_OFFSET) for start, end in SS_EMPTY_RANGES[xgd][:-1]] for xgd in (2, 3)}
+
+DMI_EMPTY_RANGES = {
+    1: [(0x001, 0x008), (0x019, 0x634)],
+    2: [(0x001, 0x010), (0x019, 0x020), (0x030, 0x040), (0x050, 0x634)],
+}
+
+
+class Layout:
+    # A layout compiled to one struct.Struct per field for single reads, and one per byte order for reading every field at once
+    def __init__(self, fields):
+        self.fields = {name: (field[0], struct.Struct(field[1]), field[2] if len(field) > 2 else None) for name, field in fields.items()}
+        self.decoders = [(name, field[2]) for name, field in fields.items() if len(field) > 2]
+        groups = {}
+        for name, field in sorted(fields.items(), key=lambda item: item[1][0]):
+            order = ">" if field[1][0] == ">" else "<"
+            groups.setdefault(order, []).append((name, field[0], field[1].lstrip("<>")))
+        self.unpackers = []
+        for order, group in groups.items():
+            fmt = order
+            position = 0
+            for name, offset, code in group:
+                if offset > position:
+                    fmt += f"{offset - position}x"
+                fmt += code
+                position = offset + struct.calcsize(order + code)
+            self.unpackers.append((tuple(name for name, _, _ in group), struct.Struct(fmt)))
+
+    def unpack(self, data):
+        values = {}
+        for names, unpacker in self.unpackers:
+            values.update(zip(names, unpacker.unpack_from(data)))
+        for name, decode in self.decoders:
+            values[name] = decode(values[name])
+        return values
+
+
+def zero_check(ranges):
+    # The zero bytes to compare each range with are built once instead of on every check
+    return tuple((start, end, bytes(end - start)) for start, end in ranges)
+
+
+def is_zeroed(data, check):
+    return all(data[start:end] == zeros for start, end, zeros in check)
+
+
+# Per ParseSS xgd, 3 is XGD3 without an SS table which keeps the XGD2 layout
+SS_LAYOUTS = {1: Layout(SS_XGD1), 2: Layout(SS_XGD2), 3: Layout(SS_XGD2), 4: Layout(SS_XGD3)}
+DMI_LAYOUTS = {1: Layout(DMI_XGD1), 2: Layout(DMI_XGD2)}
+SS_ZEROED = {xgd: zero_check(ranges) for xgd, ranges in SS_EMPTY_RANGES.items()}
+RAW_ZEROED = {xgd: zero_check(ranges) for xgd, ranges in RAW_EMPTY_RANGES.items()}
+DMI_ZEROED = {xgd: zero_check(ranges) for xgd, ranges in DMI_EMPTY_RANGES.items()}
+
+
+class View:
+    # Decodes a field of the layout on its first access and keeps it as an attribute, so later accesses are plain lookups
+    layout = Layout({})
+
+    def __init__(self, data, layout):
+        self.data = memoryview(data)
+        self.layout = layout
+
+    def load(self):
+        # Decodes every field at once, cheaper than field by field when a full parse reads them all
+        self.__dict__.update(self.layout.unpack(self.data))
+        return self
+
+    def __getattr__(self, name):
+        try:
+            offset, unpacker, decode = self.layout.fields[name]
+        except KeyError:
+            raise AttributeError(f"{type(self).__name__} has no field {name}") from None
+        value = unpacker.unpack_from(self.data, offset)[0]
+        if decode is not None:
+            value = decode(value)
+        setattr(self, name, value)
+        return value
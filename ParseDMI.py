@@ -1,164 +1,416 @@
 import os
 import sys
 import datetime
+import zlib
+import functools
+import Layouts
+import RedumpIndex
+import RecordWriter
+import SectorPack
 
 
-def print_filetime(data):
-    filetime = int.from_bytes(data[0x010:0x018], "little")
-    time = divmod(filetime - 0x19DB1DED53E8000, 10000000)
-    time = datetime.datetime.fromtimestamp(time[0], datetime.UTC).replace(microsecond=time[1] // 10)
-    if time.strftime(f"%H:%M:%S%f") == "00:00:00000000":
-        print(f"DMI Date: {time.strftime(f"%Y-%m-%d")}")
-    else:
-        print(f"DMI Datetime: {time.strftime(f"%Y-%m-%d %H:%M:%S%f")}")
-
-
-def print_trailer(data, verbose):
-    pfi = data[0x7DC:0x7E4]
-    
-    pfi_map = {
-        bytes.fromhex('F56BBBAF9A986A27'): '8FC52135',  # XGD1
-        bytes.fromhex('E771E4509B321F36'): 'E9B8ECFE',  # Wave 0 (Experience Disc 1.0)
-        bytes.fromhex('724EA8F848083A81'): '739CEAB3',  # Wave 1
-        bytes.fromhex('7F287181B884AC0E'): 'A4CFB59C',  # Wave 2
-        bytes.fromhex('B92884797F24F5B8'): '2A4CCBD3',  # Wave 3
-        bytes.fromhex('313DE4782F5E9C87'): '05C6C409',  # Wave 4-7
-        bytes.fromhex('5075273CA9308344'): '0441D6A5',  # Wave 8-9
-        bytes.fromhex('6E719E5B66481ECA'): 'E18BC70B',  # Wave 10-12
-        bytes.fromhex('008EDE9B6F8144F6'): '40DCB18F',  # Wave 13
-        bytes.fromhex('180DD029D791F116'): '23A198FC',  # Wave 14-15
-        bytes.fromhex('18EB8B92E60935F5'): 'AB25DB47',  # Wave 16
-        bytes.fromhex('6F926559C10CD2DC'): '169EF597',  # Wave 17-18
-        bytes.fromhex('07E9C4770C916366'): '032CCF37',  # Wave 19
-        bytes.fromhex('0C0BA0C912F3C56D'): 'F48D24B8',  # Wave 20
-        bytes.fromhex('6DD35C40F7D0DAE1'): 'D92C9096',  # XGD3 #1 (Halo Reach Beta)
-        bytes.fromhex('FA4BE3C4BDD34C19'): 'E1647069',  # XGD3 #2 (Halo Reach Preview, Kinect Rush)
-        bytes.fromhex('26FB858A0FC5ED02'): '26AF4C58',  # XGD3 (Common)
-        bytes.fromhex('CFE8ADB9B0D59CD1'): '26675ADB',  # XGD2 Hybrid (Xbox 360 Trial Disc)
+MESSAGE_PREFIX = {
+    "error": "[ERROR] ",
+    "warning": "[WARNING] ",
+    "info": "[INFO] ",
+    "note": "",
+}
+
+PFI_MAP = {
+    bytes.fromhex('F56BBBAF9A986A27'): '8FC52135',  # XGD1
+    bytes.fromhex('E771E4509B321F36'): 'E9B8ECFE',  # Wave 0 (Experience Disc 1.0)
+    bytes.fromhex('724EA8F848083A81'): '739CEAB3',  # Wave 1
+    bytes.fromhex('7F287181B884AC0E'): 'A4CFB59C',  # Wave 2
+    bytes.fromhex('B92884797F24F5B8'): '2A4CCBD3',  # Wave 3
+    bytes.fromhex('313DE4782F5E9C87'): '05C6C409',  # Wave 4-7
+    bytes.fromhex('5075273CA9308344'): '0441D6A5',  # Wave 8-9
+    bytes.fromhex('6E719E5B66481ECA'): 'E18BC70B',  # Wave 10-12
+    bytes.fromhex('008EDE9B6F8144F6'): '40DCB18F',  # Wave 13
+    bytes.fromhex('180DD029D791F116'): '23A198FC',  # Wave 14-15
+    bytes.fromhex('18EB8B92E60935F5'): 'AB25DB47',  # Wave 16
+    bytes.fromhex('6F926559C10CD2DC'): '169EF597',  # Wave 17-18
+    bytes.fromhex('07E9C4770C916366'): '032CCF37',  # Wave 19
+    bytes.fromhex('0C0BA0C912F3C56D'): 'F48D24B8',  # Wave 20
+    bytes.fromhex('6DD35C40F7D0DAE1'): 'D92C9096',  # XGD3 #1 (Halo Reach Beta)
+    bytes.fromhex('FA4BE3C4BDD34C19'): 'E1647069',  # XGD3 #2 (Halo Reach Preview, Kinect Rush)
+    bytes.fromhex('26FB858A0FC5ED02'): '26AF4C58',  # XGD3 (Common)
+    bytes.fromhex('CFE8ADB9B0D59CD1'): '26675ADB',  # XGD2 Hybrid (Xbox 360 Trial Disc)
+}
+
+# Sources of parse_dmi_bytes, a change to any of them invalidates --cache results
+SOURCE_FILES = (__file__, Layouts.__file__)
+
+# Columns written by --format jsonl|csv, fields that do not apply to a disc type are null
+FIELDS = (
+    "path", "xgd", "system", "dmi_crc", "has_trailer", "xmid", "xemid", "media_id", "key_id",
+    "dmi_filetime", "dmi_time", "pfi_crc", "xbox_signature_valid", "final_checksum", "reserved_zeroed",
+    "redump_status", "redump_names", "messages", "error",
+)
+
+
+def new_record():
+    return {
+        "xgd": None,
+        "system": None,
+        "dmi_crc": None,
+        "messages": [],
+        "error": None,
     }
-    if pfi in pfi_map:
-        print(f"PFI CRC: {pfi_map[pfi]}")
+
+
+def add_message(record, section, level, code, message):
+    record["messages"].append({"section": section, "level": level, "code": code, "message": message})
+    if level == "error" and record["error"] is None:
+        record["error"] = message
+
+
+def parse_filetime(fields, record):
+    filetime = fields.dmi_filetime
+    record["dmi_filetime"] = filetime
+    record["dmi_time"] = None
+    time = divmod(filetime - 0x19DB1DED53E8000, 10000000)
+    try:
+        time = datetime.datetime.fromtimestamp(time[0], datetime.UTC).replace(microsecond=time[1] // 10)
+    except (ValueError, OverflowError, OSError):
+        add_message(record, "filetime", "warning", "INVALID_DMI_TIME", f"Invalid DMI FILETIME: {int.from_bytes(filetime.to_bytes(8, 'little'), 'big'):016X}")
+        return
+    record["dmi_time"] = time.strftime("%Y-%m-%d %H:%M:%S%f")
+
+
+def parse_trailer(fields, record):
+    record["has_trailer"] = True
+    record["pfi_crc"] = PFI_MAP.get(fields.pfi_hash)
+    record["xbox_signature_valid"] = fields.xbox_signature == bytes.fromhex('0002000058424F5800000000')
+    record["final_checksum"] = f"{int.from_bytes(fields.final_checksum, 'big'):016X}"
+
+
+def parse_dmi_bytes(data):
+    record = new_record()
+    if len(data) < 2048:
+        add_message(record, "system", "error", "SHORT_DMI", "Not a valid XGD2 DMI")
+        return record
+    data = bytes(data[:2048])
+    record["dmi_crc"] = zlib.crc32(data)
+    record["has_trailer"] = False
+
+    if data[0] == 0x01:
+        record["xgd"] = 1
+        record["system"] = "Xbox (XGD1)"
+        fields = Layouts.View(data, Layouts.DMI_LAYOUTS[1])
+
+        record["xmid"] = fields.xmid
+
+        parse_filetime(fields, record)
+
+        if data[0x634:0x800] != b'\x00' * 460:
+            parse_trailer(fields, record)
+
+    elif data[0] == 0x02:
+        record["xgd"] = 2
+        record["system"] = "Xbox 360 (XGD2/3)"
+        fields = Layouts.View(data, Layouts.DMI_LAYOUTS[2])
+
+        parse_filetime(fields, record)
+
+        record["key_id"] = fields.key_id
+
+        record["media_id"] = fields.media_id
+
+        record["xemid"] = fields.xemid
+
+        parse_trailer(fields, record)
+
     else:
-        print("PFI CRC: Unknown")
-    
-    xbox = data[0x7E4:0x7F0]
-    if xbox == bytes.fromhex('0002000058424F5800000000'):
-        if verbose:
+        add_message(record, "system", "error", "UNKNOWN_DMI", f"Not a valid Xbox DMI: First byte is 0x{data[0]:02X}")
+        return record
+
+    all_zero = Layouts.is_zeroed(data, Layouts.DMI_ZEROED[record["xgd"]])
+    record["reserved_zeroed"] = all_zero
+    if not all_zero:
+        add_message(record, "reserved", "warning", "RESERVED_BYTES", "Unexpected data in reserved bytes")
+
+    return record
+
+
+class DMIView(Layouts.View):
+    # Decodes only the fields that are read, e.g. DMIView(data).media_id for a bulk job, instead of parse_dmi_bytes
+    def __init__(self, data):
+        if len(data) < 2048:
+            raise ValueError("Not a valid XGD2 DMI")
+        data = memoryview(data)[:2048]
+        if data[0] not in Layouts.DMI_LAYOUTS:
+            raise ValueError(f"Not a valid Xbox DMI: First byte is 0x{data[0]:02X}")
+        self.xgd = data[0]
+        super().__init__(data, Layouts.DMI_LAYOUTS[self.xgd])
+
+    @functools.cached_property
+    def dmi_crc(self):
+        return zlib.crc32(self.data)
+
+
+def print_messages(record, section):
+    for message in record["messages"]:
+        if message["section"] == section:
+            print(f"{MESSAGE_PREFIX[message['level']]}{message['message']}")
+
+
+def print_record(record, verbose):
+    print_messages(record, "system")
+    if record["error"] is not None:
+        return
+
+    print(f"System: {record['system']}")
+    if record["xgd"] == 1:
+        print(f"XMID: {record['xmid']}")
+
+    print_messages(record, "filetime")
+    if record["dmi_time"] is not None:
+        if record["dmi_time"].endswith(" 00:00:00000000"):
+            print(f"DMI Date: {record['dmi_time'][:10]}")
+        else:
+            print(f"DMI Datetime: {record['dmi_time']}")
+
+    if record["xgd"] == 2:
+        if record["key_id"] == 1:
+            print("XOR Key: Beta")
+        elif record["key_id"] == 2:
+            print("XOR Key: Retail")
+        else:
+            print(f"XOR Key: {record['key_id']}")
+        print(f"Media ID: {record['media_id']}")
+        print(f"XeMID: {record['xemid']}")
+
+    if record["has_trailer"]:
+        print(f"PFI CRC: {record['pfi_crc'] or 'Unknown'}")
+        if not record["xbox_signature_valid"]:
+            print("Xbox Signature: Invalid")
+        elif verbose:
             print("Xbox Signature: Valid")
-    else:
-        print("Xbox Signature: Invalid")
-    
-    if verbose:
-        print(f"Final Checksum: {int.from_bytes(data[0x7F0:0x800], 'big'):016X}")
+        if verbose:
+            print(f"Final Checksum: {record['final_checksum']}")
+
+    if record["reserved_zeroed"] and verbose:
+        print("All reserved bytes zeroed")
+    print_messages(record, "reserved")
 
 
-def parse_file(file_path, verbose):
+def show_record(record, verbose, index=None):
+    print_record(record, verbose)
+    if index is not None and record["error"] is None:
+        RedumpIndex.annotate(record, index, "dmi")
+        RedumpIndex.print_annotation(record)
+
+
+def write_record(writer, file_path, record, index=None):
+    if index is not None and record["error"] is None:
+        RedumpIndex.annotate(record, index, "dmi")
+    writer.write(file_path, record)
+
+
+def parse_file(file_path, verbose, index=None):
     with open(file_path, 'rb') as f:
         data = f.read(2048)
-        if len(data) < 2048:
-            print("[ERROR] Not a valid XGD2 DMI")
-            return
-        
-        if data[0] == 0x01:
-            print("System: Xbox (XGD1)")
-            
-            xmid = data[0x08:0x10].split(b'\x00')[0].decode(errors='ignore')
-            print(f"XMID: {xmid}")
-            
-            print_filetime(data)
-            
-            if data[0x634:0x800] != b'\x00' * 460:
-                print_trailer(data, verbose)
-            
-            empty_ranges = [(0x001, 0x008), (0x019, 0x634)]
-            all_zero = all(data[start:end] == b'\x00' * (end - start) for start, end in empty_ranges)
-            if all_zero and verbose:
-                print("All reserved bytes zeroed")
-            elif not all_zero:
-                print("[WARNING] Unexpected data in reserved bytes")
-        
-        elif data[0] == 0x02:
-            print("System: Xbox 360 (XGD2/3)")
-            
-            print_filetime(data)
-            
-            key_id = data[0x018]
-            if key_id == 1:
-                print("XOR Key: Beta")
-            elif key_id == 2:
-                print("XOR Key: Retail")
-            else:
-                print(f"XOR Key: {key_id}")
-            
-            media_id = data[0x20:0x30]
-            media_id_str = ''.join(f"{b:02X}" for b in media_id)
-            print(f"Media ID: {media_id_str[:-8] + '-' + media_id_str[-8:]}")
-            
-            xemid = data[0x40:0x50].split(b'\x00')[0].decode(errors='ignore')
-            print(f"XeMID: {xemid}")
-            
-            print_trailer(data, verbose)
-            
-            empty_ranges = [(0x001, 0x010), (0x19, 0x20), (0x30, 0x40), (0x50, 0x634)]
-            all_zero = all(data[start:end] == b'\x00' * (end - start) for start, end in empty_ranges)
-            if all_zero and verbose:
-                print("All reserved bytes zeroed")
-            elif not all_zero:
-                print("[WARNING] Unexpected data in reserved bytes")
-        
-        else:
-            print(f"[ERROR] Not a valid Xbox DMI: First byte is 0x{data[0]:02X}")
+    record = parse_dmi_bytes(data)
+    show_record(record, verbose, index)
+    return record
+
+
+def exception_record(e):
+    record = new_record()
+    add_message(record, "system", "error", "EXCEPTION", f"{e}")
+    return record
+
+
+def parse_path(file_path):
+    try:
+        with open(file_path, 'rb') as f:
+            data = f.read(2048)
+        return parse_dmi_bytes(data)
+    except Exception as e:
+        return exception_record(e)
+
+
+def find_files(input_path, recursive, dmi_only):
+    if recursive:
+        for root, _, files in os.walk(input_path):
+            for file in files:
+                if not dmi_only or (file.startswith("DMI") and file.endswith(".bin")):
+                    yield os.path.join(root, file)
+    else:
+        for entry in os.listdir(input_path):
+            file_path = os.path.join(input_path, entry)
+            if os.path.isfile(file_path) and (not dmi_only or (os.path.basename(file_path).startswith("DMI") and file_path.endswith(".bin"))):
+                yield file_path
+
+
+def parse_files_cached(file_paths, verbose, cache_path, index=None, writer=None):
+    import ResultCache
+    cache = ResultCache.ResultCache(cache_path, "DMI", parse_dmi_bytes, SOURCE_FILES)
+    try:
+        for file_path, record in zip(file_paths, cache.get_many(file_paths, None, exception_record)):
+            if writer is not None:
+                write_record(writer, file_path, record, index)
+                continue
+            print(file_path)
+            show_record(record, verbose, index)
+    finally:
+        cache.close()
+
+
+def parse_files_async(file_paths, verbose, inflight, index=None, writer=None):
+    import AsyncReader
+    def handle(file_path, data, error):
+        try:
+            record = exception_record(error) if error is not None else parse_dmi_bytes(data)
+        except Exception as e:
+            record = exception_record(e)
+        if writer is not None:
+            write_record(writer, file_path, record, index)
             return
+        print(file_path)
+        show_record(record, verbose, index)
+    AsyncReader.read_files(file_paths, 2048, inflight, handle)
+
+
+def parse_pack(pack_path, verbose, index=None, writer=None):
+    # One sequential pass over a memory-mapped SectorPack, each sector is reported under its packed name
+    with SectorPack.SectorPack(pack_path) as pack:
+        for entry, data in pack:
+            try:
+                record = parse_dmi_bytes(data)
+            except Exception as e:
+                record = exception_record(e)
+            if writer is not None:
+                write_record(writer, entry["path"], record, index)
+                continue
+            print(entry["path"])
+            show_record(record, verbose, index)
+
+
+def open_writer(output_format, store_path):
+    if store_path is not None:
+        import ColumnStore
+        return ColumnStore.ColumnWriter(store_path, "DMI")
+    return RecordWriter.RecordWriter(output_format, FIELDS)
 
 
 if __name__ == "__main__":
     try:
-        if len(sys.argv) < 2 or len(sys.argv) > 5:
-            print("Usage: python ParseDMI.py <filename|directory> [-v|--verbose] [-r|--recursive] [-d|--dmi-only]")
+        if len(sys.argv) < 2 or len(sys.argv) > 15:
+            print("Usage: python ParseDMI.py <filename|directory> [-v|--verbose] [-r|--recursive] [-d|--dmi-only] [-c|--cache FILE] [--redump INDEX] [--format text|jsonl|csv] [--store DIR] [--inflight N]")
             print()
             print("Options:")
-            print("input: file path to parse, or directory of files to parse")
+            print("input: file path to parse, directory of files to parse, or sector pack made by SectorPack.py")
             print("-v, --verbose\t Prints extra information about DMI")
             print("-r, --recursive\t Parses all files in dir recursively")
             print("-d, --dmi-only\t Only parses .bin files in dir that start with DMI")
+            print("-c, --cache FILE Reuses results for files unchanged since the last run")
+            print("--redump INDEX\t Looks up each DMI hash in an index built by RedumpIndex.py")
+            print("--format\t Writes one record per file as JSON Lines or CSV instead of text")
+            print("--store DIR\t Adds one row per file to a column store queried with ColumnStore.py, instead of text")
+            print("--inflight N\t Keeps N file reads in flight while parsing a dir, for network shares")
             sys.exit(0)
         
         input_path = None
         verbose = False
         recursive = False
         dmi_only = False
-        for arg in sys.argv[1:]:
+        cache_path = None
+        index = None
+        output_format = "text"
+        store_path = None
+        inflight = 0
+        args = iter(sys.argv[1:])
+        for arg in args:
             if arg in ("-v", "--verbose"):
                 verbose = True
             elif arg in ("-r", "--recursive"):
                 recursive = True
             elif arg in ("-d", "--dmi-only"):
                 dmi_only = True
+            elif arg in ("-c", "--cache"):
+                cache_path = next(args, None)
+                if not cache_path:
+                    print("[ERROR] --cache requires a cache file path")
+                    sys.exit(0)
+            elif arg == "--redump":
+                index_path = next(args, None)
+                if not index_path:
+                    print("[ERROR] --redump requires an index file path")
+                    sys.exit(0)
+                index = RedumpIndex.RedumpIndex(index_path)
+            elif arg == "--format":
+                output_format = next(args, "").lower()
+                if output_format not in RecordWriter.FORMATS:
+                    print("[ERROR] --format must be text, jsonl or csv")
+                    sys.exit(0)
+            elif arg == "--store":
+                store_path = next(args, None)
+                if not store_path:
+                    print("[ERROR] --store requires a directory path")
+                    sys.exit(0)
+            elif arg == "--inflight":
+                inflight = int(next(args, "0"))
+                if inflight < 1:
+                    print("[ERROR] --inflight requires a positive number of reads")
+                    sys.exit(0)
             else:
                 input_path = arg
         
         if not input_path:
             print("[ERROR] No valid filename provided")
             sys.exit(0)
+        if inflight and cache_path is not None:
+            print("[ERROR] --inflight cannot be combined with --cache")
+            sys.exit(0)
+        
+        if store_path is not None and output_format != "text":
+            print("[ERROR] --store cannot be combined with --format")
+            sys.exit(0)
         
-        if os.path.isdir(input_path):
-            if recursive:
-                for root, _, files in os.walk(input_path):
-                    for file in files:
-                        if not dmi_only or (file.startswith("DMI") and file.endswith(".bin")):
-                            file_path = os.path.join(root, file)
-                            print(file_path)
-                            parse_file(file_path, verbose)
+        if os.path.isfile(input_path) and SectorPack.is_pack(input_path):
+            if cache_path is not None or inflight:
+                print("[ERROR] A sector pack is parsed in one pass and cannot be combined with --cache or --inflight")
+                sys.exit(0)
+            if output_format != "text" or store_path is not None:
+                with open_writer(output_format, store_path) as writer:
+                    parse_pack(input_path, verbose, index, writer)
+            else:
+                parse_pack(input_path, verbose, index)
+        elif output_format != "text" or store_path is not None:
+            if os.path.isdir(input_path):
+                file_paths = list(find_files(input_path, recursive, dmi_only))
+            elif os.path.isfile(input_path):
+                file_paths = [input_path]
+            else:
+                print(f"[ERROR] Invalid path: {input_path}")
+                sys.exit(0)
+            with open_writer(output_format, store_path) as writer:
+                if cache_path is not None:
+                    parse_files_cached(file_paths, verbose, cache_path, index, writer)
+                elif inflight:
+                    parse_files_async(file_paths, verbose, inflight, index, writer)
+                else:
+                    for file_path in file_paths:
+                        write_record(writer, file_path, parse_path(file_path), index)
+        elif os.path.isdir(input_path):
+            if cache_path is not None:
+                parse_files_cached(list(find_files(input_path, recursive, dmi_only)), verbose, cache_path, index)
+            elif inflight:
+                parse_files_async(find_files(input_path, recursive, dmi_only), verbose, inflight, index)
             else:
-                for entry in os.listdir(input_path):
-                    file_path = os.path.join(input_path, entry)
-                    if os.path.isfile(file_path) and (not dmi_only or (os.path.basename(file_path).startswith("DMI") and file_path.endswith(".bin"))):
-                        print(file_path)
-                        parse_file(file_path, verbose)
+                for file_path in find_files(input_path, recursive, dmi_only):
+                    print(file_path)
+                    parse_file(file_path, verbose, index)
         elif os.path.isfile(input_path):
-            parse_file(input_path, verbose)
+            if cache_path is not None:
+                import ResultCache
+                cache = ResultCache.ResultCache(cache_path, "DMI", parse_dmi_bytes, SOURCE_FILES)
+                show_record(cache.get(input_path), verbose, index)
+                cache.close()
+            else:
+                parse_file(input_path, verbose, index)
         else:
             print(f"[ERROR] Invalid path: {input_path}")
     except Exception as e:
         print(f"[ERROR] {e}")
-
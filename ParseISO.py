@@ -0,0 +1,180 @@
+import sys
+import os
+import mmap
+import ParseSS
+import ParseDMI
+import ParseXBE
+import ParseXEX
+
+
+SECTOR_SIZE = 2048
+XDVDFS_MAGIC = b"MICROSOFT*XBOX*MEDIA"
+# Game partition offsets: extracted XISO, then Redump XGD1, XGD2 and XGD3 images
+PARTITION_OFFSETS = (0, 0x18300000, 0xFD90000, 0x2080000)
+# Sidecar files written next to the ISO by Redumper, DiscImageCreator and others
+SS_SUFFIXES = (".ss", ".security", "_SS.bin")
+DMI_SUFFIXES = (".dmi", ".manufacturer", "_DMI.bin")
+
+
+class MappedFile:
+    # Read-only file object over a window of the mapped ISO, nothing is copied until read()
+    def __init__(self, iso, offset, size):
+        self.iso = iso
+        self.offset = offset
+        self.size = size
+        self.pos = 0
+
+    def seek(self, pos, whence=0):
+        if whence == 1:
+            pos += self.pos
+        elif whence == 2:
+            pos += self.size
+        self.pos = max(0, pos)
+        return self.pos
+
+    def tell(self):
+        return self.pos
+
+    def read(self, size=-1):
+        end = self.size if size < 0 else min(self.size, self.pos + size)
+        data = self.iso[self.offset + self.pos:self.offset + max(end, self.pos)]
+        self.pos = max(end, self.pos)
+        return data
+
+
+def find_partition(iso):
+    for offset in PARTITION_OFFSETS:
+        volume = offset + 32 * SECTOR_SIZE
+        if volume + SECTOR_SIZE <= len(iso) and iso[volume:volume + 20] == XDVDFS_MAGIC:
+            return offset
+    return None
+
+
+def find_entry(iso, partition, name):
+    # Walks the root directory tree only, each node is read where it lies in the map
+    volume = partition + 32 * SECTOR_SIZE
+    root_sector = int.from_bytes(iso[volume + 0x14:volume + 0x18], 'little')
+    root_size = int.from_bytes(iso[volume + 0x18:volume + 0x1C], 'little')
+    directory = partition + root_sector * SECTOR_SIZE
+    name = name.upper()
+
+    pending = [0]
+    seen = set()
+    while pending:
+        offset = pending.pop()
+        if offset in seen or offset * 4 + 14 > root_size:
+            continue
+        seen.add(offset)
+        entry = directory + offset * 4
+        left = int.from_bytes(iso[entry:entry + 2], 'little')
+        right = int.from_bytes(iso[entry + 2:entry + 4], 'little')
+        if left == 0xFFFF:
+            continue
+        name_length = iso[entry + 13]
+        entry_name = iso[entry + 14:entry + 14 + name_length].decode(errors='ignore')
+        if entry_name.upper() == name:
+            start = int.from_bytes(iso[entry + 4:entry + 8], 'little')
+            size = int.from_bytes(iso[entry + 8:entry + 12], 'little')
+            return entry_name, partition + start * SECTOR_SIZE, size
+        if right:
+            pending.append(right)
+        if left:
+            pending.append(left)
+    return None
+
+
+def find_sidecar(file_path, suffixes):
+    base = os.path.splitext(file_path)[0]
+    for suffix in suffixes:
+        if os.path.isfile(base + suffix):
+            return base + suffix
+    return None
+
+
+def parse_iso(file_path, verbose):
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            print("[ERROR] Not a valid Xbox ISO: Empty file")
+            return False
+        iso = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        partition = find_partition(iso)
+        if partition is None:
+            print("[ERROR] Not a valid Xbox ISO: No XDVDFS partition found")
+            return False
+
+        for name, parse in (("default.xex", ParseXEX.parse_xex), ("default.xbe", ParseXBE.parse_xbe)):
+            entry = find_entry(iso, partition, name)
+            if entry is not None:
+                entry_name, offset, size = entry
+                print(f"{entry_name}:")
+                parse(MappedFile(iso, offset, min(size, len(iso) - offset)), size, f"{file_path}/{entry_name}")
+                break
+        else:
+            print("[ERROR] No default.xex or default.xbe in XDVDFS root directory")
+    finally:
+        iso.close()
+
+    ss_path = find_sidecar(file_path, SS_SUFFIXES)
+    if ss_path is not None:
+        print(f"{os.path.basename(ss_path)}:")
+        ParseSS.parse_file(ss_path, verbose)
+    dmi_path = find_sidecar(file_path, DMI_SUFFIXES)
+    if dmi_path is not None:
+        print(f"{os.path.basename(dmi_path)}:")
+        ParseDMI.parse_file(dmi_path, verbose)
+    return True
+
+
+def find_files(input_path, recursive):
+    if recursive:
+        for root, _, files in os.walk(input_path):
+            for file in files:
+                if file.lower().endswith(".iso"):
+                    yield os.path.join(root, file)
+    else:
+        for entry in os.listdir(input_path):
+            file_path = os.path.join(input_path, entry)
+            if os.path.isfile(file_path) and entry.lower().endswith(".iso"):
+                yield file_path
+
+
+if __name__ == "__main__":
+    try:
+        if len(sys.argv) < 2 or len(sys.argv) > 4:
+            print("Usage: python ParseISO.py <filename.iso|directory> [-v|--verbose] [-r|--recursive]")
+            print()
+            print("Options:")
+            print("input: ISO file path to parse, or directory of ISO files to parse")
+            print("-v, --verbose\t Prints extra information about SS and DMI")
+            print("-r, --recursive\t Parses all ISO files in dir recursively")
+            sys.exit(0)
+
+        input_path = None
+        verbose = False
+        recursive = False
+        for arg in sys.argv[1:]:
+            if arg in ("-v", "--verbose"):
+                verbose = True
+            elif arg in ("-r", "--recursive"):
+                recursive = True
+            else:
+                input_path = arg
+
+        if not input_path:
+            print("[ERROR] No valid filename provided")
+            sys.exit(0)
+
+        if os.path.isdir(input_path):
+            for file_path in find_files(input_path, recursive):
+                print(file_path)
+                try:
+                    parse_iso(file_path, verbose)
+                except Exception as e:
+                    print(f"[ERROR] {e}")
+        elif os.path.isfile(input_path):
+            parse_iso(input_path, verbose)
+        else:
+            print(f"[ERROR] Invalid path: {input_path}")
+    except Exception as e:
+        print(f"[ERROR] {e}")
@@ -1,124 +1,154 @@
 import sys
 import os
 import datetime
-import hashlib
 import zlib
-try:
-    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-except ImportError:
-    print("The 'cryptography' module is needed to decrypt the Challenge Response Table.")
-    print("Please install 'cryptography' using pip:")
-    print("python -m pip install cryptography")
-    raise
+import functools
+import CCRT
+import AngleProfiles
+import Layouts
+import RedumpIndex
+import RecordWriter
+import SectorPack
 
 
-def parse_ccrt(data, xgd, cpr_mai, verbose):
+MESSAGE_PREFIX = {
+    "error": "[ERROR] ",
+    "warning": "[WARNING] ",
+    "info": "[INFO] ",
+    "note": "",
+}
+
+SYSTEM_NAMES = {
+    1: "Xbox (XGD1)",
+    2: "Xbox 360 (XGD2)",
+    3: "Xbox 360 (XGD3)",
+    4: "Xbox 360 (XGD3)",
+}
+
+STYLE_MESSAGES = {
+    "xgd2_clean_kreon": ("note", "XGD2_CLEAN_KREON", "XGD2: Cleaned Kreon-style SS (Redump hash)"),
+    "xgd2_clean_0800": ("note", "XGD2_CLEAN_0800", "XGD2: Cleaned 0800-style SS (Fixed angles)"),
+    "xgd2_raw_kreon": ("note", "XGD2_RAW_KREON", "XGD2: Raw Kreon-style SS (Raw SSv1)"),
+    "xgd2_raw_0800": ("note", "XGD2_RAW_0800", "XGD2: Raw 0800-style SS (Raw SSv2)"),
+    "xgd3_clean_kreon": ("warning", "XGD3_CLEAN_KREON", "XGD3: Cleaned Kreon-style invalid SS (Bad Redump hash)"),
+    "xgd3_raw_kreon": ("warning", "XGD3_RAW_KREON", "XGD3: Raw Kreon-style invalid SS"),
+    "xgd3_clean": ("note", "XGD3_CLEAN", "XGD3: Cleaned SSv2 (Redump hash)"),
+    "xgd3_raw_kreon_v1": ("note", "XGD3_RAW_KREON", "XGD3: Raw Kreon-style SS (SSv1)"),
+    "xgd3_raw_0800": ("note", "XGD3_RAW_0800", "XGD3: Raw 0800-style SS (SSv2)"),
+}
+
+# Sources of parse_ss_bytes, a change to any of them invalidates --cache results
+SOURCE_FILES = (__file__, CCRT.__file__, AngleProfiles.__file__, Layouts.__file__)
+
+# Columns written by --format jsonl|csv, fields that do not apply to a disc type are null
+FIELDS = (
+    "path", "xgd", "has_ss_table", "system", "style", "ss_crc", "internal_crc", "redump_crc", "fixed_angles_crc", "abgx_crc",
+    "lba_start", "lba_layerbreak", "lba_final", "unknown1", "unknown2", "sha1_unknown", "cpr_mai",
+    "ccrt_count", "challenges", "response_count", "responses", "media_id",
+    "creation_filetime", "creation_time", "certificate_guid", "authoring_guid", "authoring_filetime", "authoring_time",
+    "certificate_time", "unknown_guid", "ss_sha1_a", "ss_signature_a",
+    "mastering_filetime", "mastering_time", "mastering_guid", "ss_sha1_b", "ss_signature_b",
+    "lba_ranges", "psn_ranges", "reserved_zeroed", "redump_status", "redump_names", "messages", "error",
+)
+
+
+def new_record():
+    return {
+        "xgd": None,
+        "has_ss_table": None,
+        "system": None,
+        "style": None,
+        "ss_crc": None,
+        "internal_crc": None,
+        "redump_crc": None,
+        "fixed_angles_crc": None,
+        "abgx_crc": None,
+        "messages": [],
+        "error": None,
+    }
+
+
+def add_message(record, section, level, code, message):
+    record["messages"].append({"section": section, "level": level, "code": code, "message": message})
+    if level == "error" and record["error"] is None:
+        record["error"] = message
+
+
+def parse_ccrt(data, xgd, cpr_mai, record):
     if xgd == 1:
         enc_response_count = 0
         for i, offset in enumerate(range(0x302, 0x3FF, 11), start=1):
             hex_str = ''.join(f'{b:02X}' for b in data[offset:offset + 11])
             if hex_str != "0000000000000000000000":
                 enc_response_count = enc_response_count + 1
-        print(f"enCrypted Challenge Responses: {enc_response_count}")
+        record["ccrt_count"] = enc_response_count
     else:
         return
-    
-    hash_input = data[1183:1183+44]
-    sha1_hash = hashlib.sha1(hash_input).digest()
-    key = sha1_hash[:7]
-    
-    S = list(range(256))
-    j = 0
-    out = []
-
-    for i in range(256):
-        j = (j + S[i] + key[i % len(key)]) % 256
-        S[i], S[j] = S[j], S[i]
-
-    x = 0
-    y = 0
-    for pos in range(770, 770+253):
-        x = (x + 1) % 256
-        y = (y + S[x]) % 256
-        S[x], S[y] = S[y], S[x]
-        out.append(data[pos] ^ S[(S[x] + S[y]) % 256])
-    
+
+    out = CCRT.decrypt_ccrt1(data)
+
+    challenges = []
     valid_challenge_found = False
     for i in range(0, len(out), 11):
-        #print(f"{int.from_bytes(bytearray(out[i:i+11]), 'big'):022X}")
         if out[i] == 0x01:
             if not valid_challenge_found:
-                if verbose:
-                    print("Valid Decrypted Challenge Responses:")
                 challenge_value = out[i+2:i+2+4]
                 valid_challenge_found = True
             else:
                 if bytes(challenge_value) != cpr_mai:
-                    print("[WARNING] Invalid Challenge Value")
-            if verbose:
-                print(f"Challenge ID: {out[i+1]:02X}, Value: {int.from_bytes(bytearray(out[i+2:i+2+4]), 'big'):04X}, Response Modifier: {out[i+6]:02X}, Response: {int.from_bytes(bytearray(out[i+7:i+7+4]), 'big'):04X}")
+                    add_message(record, "ccrt", "warning", "INVALID_CHALLENGE_VALUE", "Invalid Challenge Value")
+            challenges.append({
+                "CID": out[i+1],  # Challenge ID
+                "Value": int.from_bytes(bytearray(out[i+2:i+2+4]), 'big'),
+                "Mod": out[i+6],  # Response Modifier
+                "Response": int.from_bytes(bytearray(out[i+7:i+7+4]), 'big'),
+            })
         elif out[i] != 0x02 and out[i] != 0x03 and (out[i] & 0xF0) != 0xF0:
-            print("[WARNING] Unexpected Challenge ID")
+            add_message(record, "ccrt", "warning", "UNEXPECTED_CHALLENGE_ID", "Unexpected Challenge ID")
     if not valid_challenge_found:
-        print("[WARNING] No valid challenge entries")
-    
+        add_message(record, "ccrt", "warning", "NO_VALID_CHALLENGE", "No valid challenge entries")
+    record["challenges"] = challenges
+
     for i in range(0, 23*9, 9):
         id_match = 0
         for j in range(0, len(out), 11):
             if data[0x661+i+1] == out[j+1]:
                 id_match = id_match + 1
         if id_match == 0:
-            print("[WARNING] No matching response ID")
+            add_message(record, "ccrt", "warning", "NO_MATCHING_RESPONSE_ID", "No matching response ID")
         elif id_match > 1:
-            print("[WARNING] More than one matching response ID")
+            add_message(record, "ccrt", "warning", "MULTIPLE_MATCHING_RESPONSE_ID", "More than one matching response ID")
         if i >= 16*9 and data[0x661+i] != 0x00 and (data[0x661+i] & 0xF0) != 0xF0:
-            print("[WARNING] Unexpected Challenge ID")
-        #print(f"{int.from_bytes(data[0x661+i:0x661+i+3], 'big'):06X} {int.from_bytes(data[0x661+i+3:0x661+i+6], 'big'):06X} {int.from_bytes(data[0x661+i+6:0x661+i+9], 'big'):06X}")
+            add_message(record, "ccrt", "warning", "UNEXPECTED_CHALLENGE_ID", "Unexpected Challenge ID")
 
 
-def parse_ccrt2(data, xgd, cpr_mai, verbose):
+def parse_ccrt2(data, xgd, cpr_mai, record):
     if xgd == 1:
         return
     elif xgd == 4:
         offset = 0x20
     else:
         offset = 0x200
-    
+
     if data[555] == 0x00 and data[556] == 0x00 and data[564] == 0x00 and data[565] == 0x00 and data[573] == 0x00 and data[574] == 0x00 and data[582] == 0x00 and data[583] == 0x00:
         is_kreon_ss = True
     elif xgd == 3:
         is_kreon_ss = True
     else:
         is_kreon_ss = False
-    
-    key = bytes([0xD1, 0xE3, 0xB3, 0x3A, 0x6C, 0x1E, 0xF7, 0x70, 0x5F, 0x6D, 0xE9, 0x3B, 0xB6, 0xC0, 0xDC, 0x71])
-    iv = bytearray(16)
-    dcrt = bytearray(252)
-    cipher = Cipher(algorithms.AES(key), modes.ECB()).decryptor()
-    for i in range(16):
-        ct = bytes(data[0x304+i*16:0x304+(i+1)*16])
-        if i == 15:
-            dcrt[i*16:252] = ct[:12]
-        else:
-            pt = bytearray(cipher.update(ct))
-            for j in range(16):
-                pt[j] ^= iv[j]
-            iv[:] = ct
-            dcrt[i*16:(i+1)*16] = pt
-    
+
+    dcrt = CCRT.decrypt_ccrt2(data)
+
     enc_response_count = 0
     for i in range(0x304, 0x400, 12):
         hex_str = ''.join(f'{b:02X}' for b in data[i:i+12])
         if hex_str != "000000000000000000000000":
             enc_response_count = enc_response_count + 1
-    
+    record["ccrt_count"] = enc_response_count
+
     if enc_response_count != 21:
-        print("[WARNING] Unexpected encrypted challenge count: {enc_response_count}")
-    
-    if verbose:
-        print(f"Decrypted Challenges: {enc_response_count}")
-        print(f"{'CT':<4}{'CID':<4}{'Tol':<4}{'Type':<6}{'Challenge':<11}{'Response':<10}{'Angle':<8}")
-    
+        add_message(record, "ccrt_count", "warning", "UNEXPECTED_CHALLENGE_COUNT", "Unexpected encrypted challenge count: {enc_response_count}")
+
     dcrtentry = []
     CT01_conflict = False
     CT01_count = 0
@@ -134,37 +164,23 @@ def parse_ccrt2(data, xgd, cpr_mai, verbose):
             "angle": (dcrt[i*12+10] << 8) | dcrt[i*12+11],
         }
         dcrtentry.append(entry)
-        
+
         if entry["CT"] == 0x01:
             CT01_count += 1
             if CT01_count == 1:
                 CT01_firstCD[:] = entry["CD"]
             elif CT01_firstCD != entry["CD"]:
-                print("[WARNING] CT01 conflict")
-        
-        if entry["CT"] != 24 and entry["CT"] != 25:
-            angle = ''
-        else:
-            angle = f"{entry['angle']}°"
-        
-        if verbose:
-            print(f"{entry['CT']:02X}  {entry['CID']:02X}  {entry['Tolerance']:02X}   {entry['Type']:02X}   "
-              f"{entry['CD'][0]:02X}{entry['CD'][1]:02X}{entry['CD'][2]:02X}{entry['CD'][3]:02X}   "
-              f"{entry['Response'][0]:02X}{entry['Response'][1]:02X}{entry['Response'][2]:02X}{entry['Response'][3]:02X}   "
-              f"{angle:<7}")
+                add_message(record, "ccrt", "warning", "CT01_CONFLICT", "CT01 conflict")
     if not CT01_conflict and CT01_firstCD != cpr_mai:
-        print(f"[WARNING] CPR_MAI mismatch, CCRT contains: {int.from_bytes(CT01_firstCD, 'big'):04X}")
-    
+        add_message(record, "ccrt", "warning", "CPR_MAI_MISMATCH", f"CPR_MAI mismatch, CCRT contains: {int.from_bytes(CT01_firstCD, 'big'):04X}")
+
     response_count = 0
     for i in range(23):
         hex_str = ''.join(f'{b:02X}' for b in data[0x730+i*9:0x730+i*9+9])
         if hex_str != "000000000000000000":
             response_count = response_count + 1
-    
-    if verbose:
-        print(f"Challenge Responses: {response_count}")
-        print(f"{'RT':<4}{'CID':<4}{'Mod':<5}{'Data':<15}{'Challenge':<11}{'Response':<11}")
-    
+    record["response_count"] = response_count
+
     rtentry = []
     for i in range(response_count):
         if (data[0x730+i*9] & 0xF0) == 0xF0:
@@ -180,60 +196,61 @@ def parse_ccrt2(data, xgd, cpr_mai, verbose):
             "angle2": (data[offset+i*9+8] << 8) | data[offset+i*9+7],
         }
         rtentry.append(entry)
-        
-        if verbose:
-            print(f"{entry['RT']:02X}  {entry['CID']:02X}  {entry['Mod']:02X}   "
-              f"{entry['Data'][0]:02X}{entry['Data'][1]:02X}{entry['Data'][2]:02X}{entry['Data'][3]:02X}{entry['Data'][4]:02X}{entry['Data'][5]:02X}   "
-              f"{entry['CD'][0]:02X}{entry['CD'][1]:02X}{entry['CD'][2]:02X}{entry['CD'][3]:02X}   "
-              f"{entry['Response'][0]:02X}{entry['Response'][1]:02X}{entry['Response'][2]:02X}{entry['Response'][3]:02X}{entry['Response'][4]:02X}   ")
-    
+
     for crt in dcrtentry:
         if crt['CT'] != 0x01 and crt['CT'] != 0xE0 and crt['CT'] != 0x14 and crt['CT'] != 0x15 and crt['CT'] != 0x24 and crt['CT'] != 0x25 and (crt['CT'] & 0xF0) != 0xF0:
-            print(f"[WARNING] Unexpected CT {crt['CT']:02X}")
+            add_message(record, "responses", "warning", "UNEXPECTED_CT", f"Unexpected CT {crt['CT']:02X}")
     for entry in rtentry:
         for crt in dcrtentry:
             if crt['CID'] == entry['CID']:
                 if (crt['CT'] == 0x15 and entry['RT'] != 0x01) or (crt['CT'] == 0x14 and entry['RT'] != 0x03) or (crt['CT'] == 0x25 and entry['RT'] != 0x05) or (crt['CT'] == 0x24 and entry['RT'] != 0x07):
-                    print("[WARNING] Mismatched CT/RT")
+                    add_message(record, "responses", "warning", "MISMATCHED_CT_RT", "Mismatched CT/RT")
                 if crt['CT'] == 0xE0 or crt['CT'] == 0x01:
                     # These fields are usually zeroed
                     if entry['Response'] != b'\x00\x00\x00\x00\x00':
-                        print(f"[WARNING] Unexpected non-zero data in challenge {crt['CT']:02X}")
+                        add_message(record, "responses", "warning", "UNEXPECTED_CHALLENGE_DATA", f"Unexpected non-zero data in challenge {crt['CT']:02X}")
                 else:
                     if crt['CT'] == 0x24 or crt['CT'] == 0x25:
                         # Deal with angle measurements differently
                         zeroed_angles = False
                         if crt['CD'] != entry['CD']:
-                            print(f"[WARNING] Mismatched CD for CID {entry['CID']:02X}")
+                            add_message(record, "responses", "warning", "MISMATCHED_CD", f"Mismatched CD for CID {entry['CID']:02X}")
                             if entry['CD'] == b'\x00\x00\x00\x00':
                                 zeroed_angles = True
                         if crt['angle'] > 359:
-                            print(f"[WARNING] Invalid angle (>359deg) in challenge")
+                            add_message(record, "responses", "warning", "INVALID_CHALLENGE_ANGLE", "Invalid angle (>359deg) in challenge")
                         if xgd != 3 and (entry['angle'] > 359 or entry['angle2'] > 359):
-                            print(f"[WARNING] Invalid angle (>359deg) in response")
+                            add_message(record, "responses", "warning", "INVALID_RESPONSE_ANGLE", "Invalid angle (>359deg) in response")
                         angle_diff = abs((entry['angle'] - crt['angle'] + 180) % 360 - 180)
                         if not zeroed_angles and angle_diff > 9:
-                            print(f"[WARNING] Angle {entry['angle']} varies significantly from expected {crt['angle']}")
+                            add_message(record, "responses", "warning", "ANGLE_DEVIATION", f"Angle {entry['angle']} varies significantly from expected {crt['angle']}")
                         angle2_diff = abs((entry['angle2'] - crt['angle'] + 180) % 360 - 180)
                         if not zeroed_angles and xgd != 3 and (xgd != 2 or not is_kreon_ss) and angle2_diff > 9:
-                            print(f"[WARNING] Angle2 {entry['angle2']} varies significantly from expected {crt['angle']}")
+                            add_message(record, "responses", "warning", "ANGLE2_DEVIATION", f"Angle2 {entry['angle2']} varies significantly from expected {crt['angle']}")
                         if entry['angle'] == 359:
-                            print(f"[INFO] First angle is 359deg, incompatible with iXtreme 1.4")
+                            add_message(record, "responses", "info", "ANGLE_359", "First angle is 359deg, incompatible with iXtreme 1.4")
                         if entry['angle'] != entry['angle2'] and entry['angle'] == 0 and entry['angle2'] == 359:
-                            print(f"[INFO] SS has been fixed by abgx for iXtreme 1.4 compatibility reasons")
+                            add_message(record, "responses", "info", "ABGX_FIXED_ANGLE", "SS has been fixed by abgx for iXtreme 1.4 compatibility reasons")
                         elif xgd != 3 and entry['angle'] != entry['angle2'] and not is_kreon_ss:
-                            print(f"[WARNING] Mismatched angles in response: {entry['angle']} vs {entry['angle2']}")
+                            add_message(record, "responses", "warning", "MISMATCHED_ANGLES", f"Mismatched angles in response: {entry['angle']} vs {entry['angle2']}")
                         break
                     elif crt['CD'] != entry['CD'] and crt['Response'] != entry['Response'][:-1]:
-                        print(f"[WARNING] Mismatched CD and Response for CID {entry['CID']:02X}")
+                        add_message(record, "responses", "warning", "MISMATCHED_CD_RESPONSE", f"Mismatched CD and Response for CID {entry['CID']:02X}")
                     elif crt['CD'] != entry['CD']:
-                        print(f"[WARNING] Mismatched CD for CID {entry['CID']:02X}")
+                        add_message(record, "responses", "warning", "MISMATCHED_CD", f"Mismatched CD for CID {entry['CID']:02X}")
                     elif crt['Response'] != entry['Response'][:-1]:
-                        print(f"[WARNING] Mismatched Response for CID {entry['CID']:02X}")
+                        add_message(record, "responses", "warning", "MISMATCHED_RESPONSE", f"Mismatched Response for CID {entry['CID']:02X}")
                     break
 
+    for entry in dcrtentry + rtentry:
+        for field in ("CD", "Response", "Data"):
+            if field in entry:
+                entry[field] = bytes(entry[field]).hex().upper()
+    record["challenges"] = dcrtentry
+    record["responses"] = rtentry
 
-def parse_pfi(data, xgd):
+
+def parse_pfi(data, xgd, record):
     version = data[0] & 0xF
     book_type = (data[0] >> 4) & 0xF
     max_rate = data[1] & 0xF
@@ -246,466 +263,739 @@ def parse_pfi(data, xgd):
     track_density = data[3] & 0xF
     linear_density = (data[3] >> 4) & 0xF
     if version != 0x1:
-        print(f"[WARNING] Unexpected PFI version: 0x{version:02X}")
+        add_message(record, "pfi", "warning", "PFI_VERSION", f"Unexpected PFI version: 0x{version:02X}")
     if(xgd   == 1 and book_type != 0xD) or (xgd != 1 and book_type != 0xE):
-        print(f"[WARNING] Unexpected PFI book type: 0x{book_type:02X}")
+        add_message(record, "pfi", "warning", "PFI_BOOK_TYPE", f"Unexpected PFI book type: 0x{book_type:02X}")
     if max_rate != 0xF:
-        print(f"[WARNING] Unexpected PFI maximum rate: 0x{max_rate:02X}")
+        add_message(record, "pfi", "warning", "PFI_MAX_RATE", f"Unexpected PFI maximum rate: 0x{max_rate:02X}")
     if disc_size != 0x0:
-        print(f"[WARNING] Unexpected PFI disc size: 0x{disc_size:02X}")
+        add_message(record, "pfi", "warning", "PFI_DISC_SIZE", f"Unexpected PFI disc size: 0x{disc_size:02X}")
     if layer_type != 0x1:
-        print(f"[WARNING] Unexpected PFI layer type: 0x{layer_type:02X}")
+        add_message(record, "pfi", "warning", "PFI_LAYER_TYPE", f"Unexpected PFI layer type: 0x{layer_type:02X}")
     if path != 0x1:
-        print(f"[WARNING] Unexpected PFI path bit unset")
+        add_message(record, "pfi", "warning", "PFI_PATH", "Unexpected PFI path bit unset")
     if layer_count1 != 0x1 or layer_count2 != 0x0:
-        print(f"[WARNING] Unexpected PFI layer count: 0b{layer_count2}{layer_count1}")
+        add_message(record, "pfi", "warning", "PFI_LAYER_COUNT", f"Unexpected PFI layer count: 0b{layer_count2}{layer_count1}")
     if reserved != 0x0:
-        print(f"[WARNING] Unexpected PFI reserved bit set")
+        add_message(record, "pfi", "warning", "PFI_RESERVED", "Unexpected PFI reserved bit set")
     if track_density != 0x0:
-        print(f"[WARNING] Unexpected PFI track density: 0x{track_density:02X}")
+        add_message(record, "pfi", "warning", "PFI_TRACK_DENSITY", f"Unexpected PFI track density: 0x{track_density:02X}")
     if linear_density != 0x1:
-        print(f"[WARNING] Unexpected PFI linear density: 0x{linear_density:02X}")
-    
+        add_message(record, "pfi", "warning", "PFI_LINEAR_DENSITY", f"Unexpected PFI linear density: 0x{linear_density:02X}")
+
     psn_start = 196608
     lba_start = int.from_bytes(data[4:8], byteorder='big') - psn_start
     layer0_end = int.from_bytes(data[12:16], byteorder='big') - psn_start
     layer1_size = int.from_bytes(data[8:12], byteorder='big') - (~(int.from_bytes(data[12:16], byteorder='big') + 1) & 0xFFFFFF)
-    print(f"LBA Data Start: {lba_start}")
-    print(f"LBA Layerbreak: {layer0_end}")
-    print(f"LBA Data Final: {layer0_end + layer1_size}")
-    
+    record["lba_start"] = lba_start
+    record["lba_layerbreak"] = layer0_end
+    record["lba_final"] = layer0_end + layer1_size
+
     bca_reserved = data[0x10] & 0x7F
     bca = (data[0x10] >> 7) & 1
     if bca_reserved != 0x00:
-        print(f"[WARNING] Unexpected reserved byte set: 0x{bca_reserved:02X}")
+        add_message(record, "bca", "warning", "BCA_RESERVED", f"Unexpected reserved byte set: 0x{bca_reserved:02X}")
     if bca != 0x0:
-        print(f"[WARNING] Unexpected BCA bit set")
+        add_message(record, "bca", "warning", "BCA_SET", "Unexpected BCA bit set")
 
 
-def filetime(data):
-    filetime = int.from_bytes(data, "little")
-    if filetime < 0x19DB1DED53E8000:
+def filetime(value):
+    if value < 0x19DB1DED53E8000:
+        return ""
+    time = divmod(value - 0x19DB1DED53E8000, 10000000)
+    try:
+        time = datetime.datetime.fromtimestamp(time[0], datetime.UTC).replace(microsecond=time[1] // 10)
+    except (ValueError, OverflowError, OSError):
         return ""
-    time = divmod(filetime - 0x19DB1DED53E8000, 10000000)
-    time = datetime.datetime.fromtimestamp(time[0], datetime.UTC).replace(microsecond=time[1] // 10)
     return f"{time.strftime(f"%Y-%m-%d %H:%M:%S%f")}"
 
 
-def time_t(data):
-    timet = int.from_bytes(data, 'little')
-    time = datetime.datetime.fromtimestamp(timet, datetime.UTC)
+def filetime_hex(value):
+    # Invalid FILETIMEs are shown as they are stored
+    return f"{int.from_bytes(value.to_bytes(8, 'little'), 'big'):016X}"
+
+
+def time_t(value):
+    time = datetime.datetime.fromtimestamp(value, datetime.UTC)
     return f"{time.strftime(f"%Y-%m-%d %H:%M:%S%f")}"
 
 
-def parse_ss(data, xgd, verbose):
+def parse_ss(data, xgd, record):
+    fields = Layouts.View(data, Layouts.SS_LAYOUTS[xgd]).load()
+    record["unknown1"] = fields.unknown1
+    record["unknown2"] = fields.unknown2
     if xgd == 2:
-        if data[0x100:0x104] != bytes([0x00, 0x00, 0x00, 0x30]):
-            print(f"Unexpected Unknown1 Value: {int.from_bytes(data[0x100:0x104], 'big'):08X}")
-        if data[0x104:0x108] != bytes([0x00, 0x00, 0x06, 0xE0]):
-            print(f"Unexpected Unknown2 Value: {int.from_bytes(data[0x104:0x108], 'big'):08X}")
-    
+        if fields.unknown1 != 0x30:
+            add_message(record, "unknown", "note", "UNKNOWN1", f"Unexpected Unknown1 Value: {fields.unknown1:08X}")
+        if fields.unknown2 != 0x6E0:
+            add_message(record, "unknown", "note", "UNKNOWN2", f"Unexpected Unknown2 Value: {fields.unknown2:08X}")
+
     if xgd > 2:
-        print(f"Unknown1 Value: {int.from_bytes(data[0x100:0x104], 'big'):08X}")
-        if data[0x104:0x108] != bytes([0x00, 0x00, 0x18, 0x80]):
-            print(f"[WARNING] Unexpected Unknown2 Value: {int.from_bytes(data[0x104:0x108], 'big'):08X}")
-    
-    if xgd > 1 and verbose:
-        print(f"SHA-1 (Unknown): {int.from_bytes(data[0x108:0x11B], 'big'):040X}")
-    
-    if xgd == 4:
-        cpr_mai = data[0x0F0:0x0F4]
-    else:
-        cpr_mai = data[0x2D0:0x2D4]
-    print(f"CPR_MAI Key: {int.from_bytes(cpr_mai, byteorder='big'):08X}")
-    
-    if (xgd == 1 and data[0x300] != 1) or (xgd > 1 and data[0x300] != 2):
-        print(f"Unexpected CCRT Version: 0x{data[0x300]:02X}")
-    if (xgd == 1 and data[0x301] != 23) or (xgd > 1 and data[0x301] != 21):
-        print(f"Unexpected CCRT Count: 0x{data[0x301]:02X}")
-    
-    if xgd == 1:        
-        parse_ccrt(data, xgd, cpr_mai, verbose)
-        
-        creation_time = filetime(data[0x41F:0x427])
+        if fields.unknown2 != 0x1880:
+            add_message(record, "unknown", "warning", "UNKNOWN2", f"Unexpected Unknown2 Value: {fields.unknown2:08X}")
+
+    if xgd > 1:
+        record["sha1_unknown"] = f"{int.from_bytes(fields.sha1_unknown, 'big'):040X}"
+
+    cpr_mai = fields.cpr_mai
+    record["cpr_mai"] = int.from_bytes(cpr_mai, byteorder='big')
+
+    if (xgd == 1 and fields.ccrt_version != 1) or (xgd > 1 and fields.ccrt_version != 2):
+        add_message(record, "ccrt_header", "note", "CCRT_VERSION", f"Unexpected CCRT Version: 0x{fields.ccrt_version:02X}")
+    if (xgd == 1 and fields.ccrt_count != 23) or (xgd > 1 and fields.ccrt_count != 21):
+        add_message(record, "ccrt_header", "note", "CCRT_COUNT", f"Unexpected CCRT Count: 0x{fields.ccrt_count:02X}")
+
+    if xgd == 1:
+        parse_ccrt(data, xgd, cpr_mai, record)
+
+        creation_time = filetime(fields.creation_filetime)
         if creation_time == "":
-            print(f"[WARNING] Invalid Creation FILETIME: {int.from_bytes(data[0x41F:0x427], 'big'):016X}")
+            add_message(record, "creation", "warning", "INVALID_CREATION_TIME", f"Invalid Creation FILETIME: {filetime_hex(fields.creation_filetime)}")
+        record["creation_filetime"] = fields.creation_filetime
+        record["creation_time"] = creation_time or None
+
+        record["certificate_guid"] = f"{int.from_bytes(fields.certificate_guid, 'big'):016X}"
+        record["authoring_guid"] = f"{int.from_bytes(fields.authoring_guid, 'big'):016X}"
+    elif xgd > 1:
+        parse_ccrt2(data, xgd, cpr_mai, record)
+
+        record["media_id"] = fields.media_id
+
+        if fields.media_id_flag != 0x04:
+            add_message(record, "media_id", "warning", "UNEXPECTED_0x49E", f"Unexpected value at 0x49E: 0x{fields.media_id_flag:02X}")
+
+    authoring_time = filetime(fields.authoring_filetime)
+    if authoring_time == "":
+        add_message(record, "authoring", "warning", "INVALID_AUTHORING_TIME", f"Invalid Authoring FILETIME: {filetime_hex(fields.authoring_filetime)}")
+    record["authoring_filetime"] = fields.authoring_filetime
+    record["authoring_time"] = authoring_time or None
+
+    if xgd == 1:
+        if fields.certificate_time_t == 0:
+            record["certificate_time"] = None
+        else:
+            record["certificate_time"] = time_t(fields.certificate_time_t)
+
+    record["unknown_guid"] = f"{int.from_bytes(fields.unknown_guid, 'big'):016X}"
+    record["ss_sha1_a"] = f"{int.from_bytes(fields.ss_sha1_a, 'big'):016X}"
+    record["ss_signature_a"] = f"{int.from_bytes(fields.ss_sha1_a, 'big'):016X}"
+
+    mastering_time = filetime(fields.mastering_filetime)
+    if mastering_time == "":
+        add_message(record, "mastering_time", "warning", "INVALID_MASTERING_TIME", f"Invalid Mastering FILETIME: {filetime_hex(fields.mastering_filetime)}")
+    record["mastering_filetime"] = fields.mastering_filetime
+    record["mastering_time"] = mastering_time or None
+
+    if fields.mastering_time_t != 0:
+        cert_time = time_t(fields.mastering_time_t)
+        add_message(record, "mastering", "warning", "UNEXPECTED_MASTERING_TIMESTAMP", f"Unexpected Mastering Timestamp: {cert_time}")
+
+    if xgd == 1 and fields.mastering_flag != 0xFF:
+        if fields.mastering_flag == 0x02:
+            add_message(record, "mastering", "note", "XGD1_LATE_PRESSING", "XGD1 is late pressing, extra data is in DMI")
+        else:
+            add_message(record, "mastering", "warning", "UNEXPECTED_0x5FA", f"Unexpected value at 0x5FA: {fields.mastering_flag:02X}")
+    elif xgd > 1 and fields.mastering_flag != 0x02:
+        add_message(record, "mastering", "warning", "UNEXPECTED_0x5FA", f"Unexpected value at 0x5FA: {fields.mastering_flag:02X}")
+
+    record["mastering_guid"] = f"{int.from_bytes(fields.mastering_guid, 'big'):016X}"
+    record["ss_sha1_b"] = f"{int.from_bytes(fields.ss_sha1_b, 'big'):016X}"
+    record["ss_signature_b"] = f"{int.from_bytes(fields.ss_signature_b, 'big'):016X}"
+
+    if xgd == 1 and fields.ss_version != 0x01:
+        if fields.ss_version != 0x01:
+            add_message(record, "ss_version", "note", "XGD1_SSV2", "XGD1 with SS Version 2")
+        else:
+            add_message(record, "ss_version", "warning", "UNEXPECTED_0x65F", f"Unexpected value at 0x65F: {fields.ss_version:02X}")
+    elif xgd > 1 and fields.ss_version != 0x02:
+        add_message(record, "ss_version", "warning", "UNEXPECTED_0x65F", f"Unexpected value at 0x65F: {fields.ss_version:02X}")
+
+    layer1_offset = (fields.layerbreak * 2) - 196608 + 1
+    ranges = fields.ranges
+    psn_ranges = []
+    lba_ranges = []
+    for i, offset in enumerate(range(0, 23 * 9, 9), start=1):
+        range_start = int.from_bytes(ranges[offset+3:offset+6], 'big')
+        range_end = int.from_bytes(ranges[offset+6:offset+9], 'big')
+        psn_ranges.append((range_start, range_end))
+        if (xgd == 1 and i < 9) or (xgd > 1 and i == 1):
+            lba_ranges.append((i, range_start - 196608, range_end - 196608))
+        elif (xgd == 1 and i < 17) or (xgd > 1 and i == 4):
+            lba_ranges.append((i, layer1_offset - (~range_start & 0xFFFFFF), layer1_offset - (~range_end & 0xFFFFFF)))
+    record["psn_ranges"] = psn_ranges
+    record["lba_ranges"] = lba_ranges
+
+    if ranges != fields.ranges_copy:
+        add_message(record, "ranges", "warning", "DUPLICATE_RANGE_MISMATCH", "Duplicated SS range does not match")
+
+
+def crc32_shift_tables(length):
+    # Byte tables for the linear map that appending `length` zero bytes applies to a CRC32 register
+    zeros = bytes(length)
+    basis = [~zlib.crc32(zeros, ~(1 << bit) & 0xFFFFFFFF) & 0xFFFFFFFF for bit in range(32)]
+    tables = []
+    for k in range(4):
+        table = [0] * 256
+        for b in range(1, 256):
+            low = b & -b
+            table[b] = table[b ^ low] ^ basis[8 * k + low.bit_length() - 1]
+        tables.append(table)
+    return tables
+
+
+def crc_patch(profile):
+    # A patch is an AngleProfiles window with the CRC32 tables to shift its delta to the end of the SS
+    offset, length, mask, value = profile
+    return (offset, length, mask, value, zlib.crc32(bytes(length)), crc32_shift_tables(2048 - offset - length))
+
+
+def patched_crc32(data, crc, patches):
+    # CRC32 is affine, so crc(patched) = crc(data) ^ crc0(data ^ patched), where only the
+    # patched windows of data ^ patched are non-zero and the trailing zeros are a table shift
+    for offset, length, mask, value, zero_crc, tables in patches:
+        delta = (int.from_bytes(data[offset:offset + length], 'big') ^ value) & mask
+        if delta:
+            delta_crc = zlib.crc32(delta.to_bytes(length, 'big')) ^ zero_crc
+            crc ^= tables[0][delta_crc & 0xFF] ^ tables[1][(delta_crc >> 8) & 0xFF] ^ tables[2][(delta_crc >> 16) & 0xFF] ^ tables[3][delta_crc >> 24]
+    return crc
+
+
+XGD1_FIXED_PATCHES = [crc_patch(AngleProfiles.window({i: 0x00 for i in range(start, end)})) for start, end in ((0x200, 0x2CF), (0x5DF, 0x5E7), (0x5FA, 0x65F))]
+XGD2_KREON_PATCHES = [crc_patch(AngleProfiles.XGD2_CLEAN_KREON)]
+XGD2_0800_PATCHES = [crc_patch(AngleProfiles.XGD2_CLEAN_0800)]
+XGD2_ABGX_PATCHES = [crc_patch(AngleProfiles.XGD2_ABGX)]
+XGD3_KREON_PATCHES = [crc_patch(AngleProfiles.XGD3_REDUMP_KREON)]
+XGD3_0800_PATCHES = [crc_patch(AngleProfiles.XGD3_CLEAN)]
+XGD3_ABGX_PATCHES = [crc_patch(AngleProfiles.XGD3_ABGX)]
+
+
+def detect_xgd(data, record):
+    xgd = 0
+    layer0_end = data[13:16]
+    if layer0_end == bytes([0x20, 0x33, 0xAF]):
+        xgd = 1
+    elif layer0_end == bytes([0x20, 0x33, 0x9F]):
+        xgd = 2
+    elif layer0_end == bytes([0x23, 0x8E, 0x0F]):
+        xgd = 3
+    else:
+        add_message(record, "detect", "warning", "UNEXPECTED_LAYERBREAK", f"Unexpected PSN Layer 0 End: {int.from_bytes(layer0_end, 'big'):04X}")
+
+    if data[0x4BA] == 0x01:
+        if xgd == 0:
+            xgd = 1
+        elif xgd != 1:
+            add_message(record, "detect", "warning", "UNEXPECTED_0x4BA", f"XGD1 but value at 0x4BA is: {data[0x4BA]}")
+    elif data[0x4BA] == 0x02:
+        if xgd == 0:
+            xgd = 2.5
+        elif xgd != 2 and xgd != 3:
+            add_message(record, "detect", "warning", "UNEXPECTED_0x4BA", f"XGD{xgd} but value at 0x4BA is: {data[0x4BA]}")
+    else:
+        add_message(record, "detect", "warning", "UNEXPECTED_0x4BA", f"Unexpected value at 0x4BA: {data[0x4BA]}")
+
+    if xgd == 2.5:
+        add_message(record, "detect", "warning", "MALFORMED_XGD2", "System: Xbox 360 (Malformed XGD2)")
+        xgd = 2
+    elif xgd == 0:
+        add_message(record, "detect", "error", "UNKNOWN_XGD", "Could not detect XGD version")
+        return 0
+
+    if data[32:104] != b'\x00' * 72:
+        if xgd == 3:
+            xgd = 4
         else:
-            print(f"Creation Timestamp: {creation_time}")
-        
+            add_message(record, "table", "warning", "NONZERO_XGD3_TABLE", f"XGD{xgd} SS with non-zero data in XGD3 SS table")
+    elif xgd == 3:
+        add_message(record, "table", "warning", "EMPTY_XGD3_TABLE", "XGD3 with empty SS table")
+    # xgd 4 (XGD3 with an SS table) is only used inside the parsers, records keep the disc's XGD number
+    record["xgd"] = min(xgd, 3)
+    record["has_ss_table"] = xgd == 4
+    record["system"] = SYSTEM_NAMES[xgd]
+
+    return xgd
+
+
+def detect_style(data, xgd, record):
+    if AngleProfiles.is_abgx(data, xgd):
+        add_message(record, "abgx", "warning", "ABGX_BAD_ANGLES", f"XGD{min(xgd, 3)} SS matches abgx360 internal hash, bad angles")
+    style = AngleProfiles.classify(data, xgd)
+    if style is not None:
+        record["style"] = style
+        add_message(record, "style", *STYLE_MESSAGES[style])
+
+
+def hash_variants(data, xgd, record):
+    view = memoryview(data)
+    ss_crc = zlib.crc32(data)
+    # Every variant is the raw SS with a few bytes replaced, so its hash is derived from ss_crc
+    record["ss_crc"] = ss_crc
+    if xgd == 1:
+        record["internal_crc"] = patched_crc32(view, ss_crc, XGD1_FIXED_PATCHES)
+    elif xgd == 2:
+        record["redump_crc"] = patched_crc32(view, ss_crc, XGD2_KREON_PATCHES)
+        record["fixed_angles_crc"] = patched_crc32(view, ss_crc, XGD2_0800_PATCHES)
+        record["abgx_crc"] = patched_crc32(view, ss_crc, XGD2_ABGX_PATCHES)
+    elif xgd == 3:
+        record["redump_crc"] = patched_crc32(view, ss_crc, XGD3_KREON_PATCHES)
+    elif xgd == 4:
+        record["redump_crc"] = patched_crc32(view, ss_crc, XGD3_0800_PATCHES)
+        record["abgx_crc"] = patched_crc32(view, ss_crc, XGD3_ABGX_PATCHES)
+
+
+def parse_ss_bytes(data):
+    record = new_record()
+    if len(data) < 2048:
+        add_message(record, "detect", "error", "SHORT_SS", "Not a valid SS: <2048 bytes")
+        return record
+    data = bytes(data[:2048])
+
+    xgd = detect_xgd(data, record)
+    if not xgd:
+        return record
+    detect_style(data, xgd, record)
+    hash_variants(data, xgd, record)
+
+    parse_pfi(data, xgd, record)
+
+    parse_ss(data, xgd, record)
+
+    all_zero = Layouts.is_zeroed(data, Layouts.SS_ZEROED[xgd])
+    record["reserved_zeroed"] = all_zero
+    if not all_zero:
+        add_message(record, "reserved", "warning", "RESERVED_BYTES", "Unexpected data in reserved bytes")
+
+    return record
+
+
+class SSView(Layouts.View):
+    # Decodes only the fields that are read, e.g. SSView(data).media_id and .redump_crc for a bulk job, instead of parse_ss_bytes
+    def __init__(self, data):
+        if len(data) < 2048:
+            raise ValueError("Not a valid SS: <2048 bytes")
+        data = memoryview(data)[:2048]
+        record = new_record()
+        xgd = detect_xgd(data, record)
+        if not xgd:
+            raise ValueError(record["error"])
+        super().__init__(data, Layouts.SS_LAYOUTS[xgd])
+        self.xgd = record["xgd"]
+        self.has_ss_table = record["has_ss_table"]
+
+    @functools.cached_property
+    def hashes(self):
+        record = new_record()
+        hash_variants(self.data, 4 if self.has_ss_table else self.xgd, record)
+        return record
+
+    @property
+    def ss_crc(self):
+        return self.hashes["ss_crc"]
+
+    @property
+    def redump_crc(self):
+        return self.hashes["redump_crc"]
+
+    @functools.cached_property
+    def style(self):
+        return AngleProfiles.classify(self.data, 4 if self.has_ss_table else self.xgd)
+
+
+def print_messages(record, section):
+    for message in record["messages"]:
+        if message["section"] == section:
+            print(f"{MESSAGE_PREFIX[message['level']]}{message['message']}")
+
+
+def print_record(record, verbose):
+    print_messages(record, "detect")
+    if record["error"] is not None:
+        return
+
+    xgd = record["xgd"]
+    if not any(message["code"] == "MALFORMED_XGD2" for message in record["messages"]):
+        print(f"System: {record['system']}")
+    print_messages(record, "table")
+    print_messages(record, "abgx")
+    print_messages(record, "style")
+
+    print(f"SS Hash: {record['ss_crc']:08X}")
+    if record["internal_crc"] is not None:
+        print(f"Internal SS Hash: {record['internal_crc']:08X}")
+    if record["redump_crc"] is not None:
+        print(f"Redump SS Hash: {record['redump_crc']:08X}")
+    if record["fixed_angles_crc"] is not None:
+        print(f"Fixed angles SS Hash: {record['fixed_angles_crc']:08X}")
+    if record["abgx_crc"] is not None:
+        print(f"abgx360 filename: SS_{record['abgx_crc']:08X}.bin")
+
+    print_messages(record, "pfi")
+    print(f"LBA Data Start: {record['lba_start']}")
+    print(f"LBA Layerbreak: {record['lba_layerbreak']}")
+    print(f"LBA Data Final: {record['lba_final']}")
+    print_messages(record, "bca")
+
+    if xgd > 2:
+        print(f"Unknown1 Value: {record['unknown1']:08X}")
+    print_messages(record, "unknown")
+    if xgd > 1 and verbose:
+        print(f"SHA-1 (Unknown): {record['sha1_unknown']}")
+    print(f"CPR_MAI Key: {record['cpr_mai']:08X}")
+    print_messages(record, "ccrt_header")
+
+    if xgd == 1:
+        print(f"enCrypted Challenge Responses: {record['ccrt_count']}")
+        if verbose and record["challenges"]:
+            print("Valid Decrypted Challenge Responses:")
+            for entry in record["challenges"]:
+                print(f"Challenge ID: {entry['CID']:02X}, Value: {entry['Value']:04X}, Response Modifier: {entry['Mod']:02X}, Response: {entry['Response']:04X}")
+        print_messages(record, "ccrt")
+
+        print_messages(record, "creation")
+        if record["creation_time"] is not None:
+            print(f"Creation Timestamp: {record['creation_time']}")
+
         if verbose:
-            print(f"Certificate GUID: {int.from_bytes(data[0x427:0x437], 'big'):016X}")
-            print(f"Authoring GUID: {int.from_bytes(data[0x43B:0x44B], 'big'):016X}")
-    elif xgd > 1:        
-        parse_ccrt2(data, xgd, cpr_mai, verbose)
-        
-        media_id = data[0x460:0x470]
-        media_id_str = ''.join(f"{b:02X}" for b in media_id)
-        print(f"Media ID: {media_id_str[:-8] + '-' + media_id_str[-8:]}")
-        
-        if data[0x49E] != 0x04:
-            print(f"[WARNING] Unexpected value at 0x49E: 0x{data[0x49E]:02X}")
-    
-    authoring_time = filetime(data[0x49F:0x4A7])
-    if authoring_time == "":
-        print(f"[WARNING] Invalid Authoring FILETIME: {int.from_bytes(data[0x49F:0x4A7], 'big'):016X}")
+            print(f"Certificate GUID: {record['certificate_guid']}")
+            print(f"Authoring GUID: {record['authoring_guid']}")
     else:
-        print(f"Authoring Timestamp: {authoring_time}")
-    
+        print_messages(record, "ccrt_count")
+        if verbose:
+            print(f"Decrypted Challenges: {record['ccrt_count']}")
+            print(f"{'CT':<4}{'CID':<4}{'Tol':<4}{'Type':<6}{'Challenge':<11}{'Response':<10}{'Angle':<8}")
+            for entry in record["challenges"]:
+                if entry["CT"] != 24 and entry["CT"] != 25:
+                    angle = ''
+                else:
+                    angle = f"{entry['angle']}°"
+                print(f"{entry['CT']:02X}  {entry['CID']:02X}  {entry['Tolerance']:02X}   {entry['Type']:02X}   "
+                  f"{entry['CD']}   {entry['Response']}   {angle:<7}")
+        print_messages(record, "ccrt")
+        if verbose:
+            print(f"Challenge Responses: {record['response_count']}")
+            print(f"{'RT':<4}{'CID':<4}{'Mod':<5}{'Data':<15}{'Challenge':<11}{'Response':<11}")
+            for entry in record["responses"]:
+                print(f"{entry['RT']:02X}  {entry['CID']:02X}  {entry['Mod']:02X}   "
+                  f"{entry['Data']}   {entry['CD']}   {entry['Response']}   ")
+        print_messages(record, "responses")
+
+        print(f"Media ID: {record['media_id']}")
+        print_messages(record, "media_id")
+
+    print_messages(record, "authoring")
+    if record["authoring_time"] is not None:
+        print(f"Authoring Timestamp: {record['authoring_time']}")
+
     if xgd == 1:
-        if data[0x4A7:0x4AB] == b'\x00' * 4:
+        if record["certificate_time"] is None:
             if verbose:
                 print("Zeroed Certificate Timestamp")
         else:
-            cert_time = time_t(data[0x4A7:0x4AB])
-            print(f"Certificate Timestamp: {cert_time}")
-    
+            print(f"Certificate Timestamp: {record['certificate_time']}")
+
     if verbose:
-        print(f"Unknown GUID: {int.from_bytes(data[0x4BB:0x4CB], 'big'):016X}")
-        print(f"SS SHA-1 A: {int.from_bytes(data[0x4CB:0x4DF], 'big'):016X}")
-        print(f"SS Signature A: {int.from_bytes(data[0x4CB:0x4DF], 'big'):016X}")
-    
-    mastering_time = filetime(data[0x5DF:0x5E7])
-    if mastering_time == "":
-        print(f"[WARNING] Invalid Mastering FILETIME: {int.from_bytes(data[0x5DF:0x5E7], 'big'):016X}")
-    else:
-        print(f"Mastering Timestamp: {mastering_time}")
-    
-    if data[0x5E7:0x5EB] != b'\x00' * 4:
-        cert_time = time_t(data[0x5E7:0x5EB])
-        print(f"[WARNING] Unexpected Mastering Timestamp: {cert_time}")
-    
-    if xgd == 1 and data[0x5FA] != 0xFF: 
-        if data[0x5FA] == 0x02:
-            print("XGD1 is late pressing, extra data is in DMI")
-        else:
-            print(f"[WARNING] Unexpected value at 0x5FA: {data[0x5FA]:02X}")
-    elif xgd > 1 and data[0x5FA] != 0x02:
-        print(f"[WARNING] Unexpected value at 0x5FA: {data[0x5FA]:02X}")
-    
+        print(f"Unknown GUID: {record['unknown_guid']}")
+        print(f"SS SHA-1 A: {record['ss_sha1_a']}")
+        print(f"SS Signature A: {record['ss_signature_a']}")
+
+    print_messages(record, "mastering_time")
+    if record["mastering_time"] is not None:
+        print(f"Mastering Timestamp: {record['mastering_time']}")
+    print_messages(record, "mastering")
+
     if verbose:
-        print(f"Mastering GUID: {int.from_bytes(data[0x5FB:0x60B], 'big'):016X}")
-        print(f"SS SHA-1 B: {int.from_bytes(data[0x60B:0x61F], 'big'):016X}")
-        print(f"SS Signature B: {int.from_bytes(data[0x61F:0x65F], 'big'):016X}")
-    
-    if xgd == 1 and data[0x65F] != 0x01:
-        if data[0x65F] != 0x01:
-            print("XGD1 with SS Version 2")
-        else:
-            print(f"[WARNING] Unexpected value at 0x65F: {data[0x65F]:02X}")
-    elif xgd > 1 and data[0x65F] != 0x02:
-        print(f"[WARNING] Unexpected value at 0x65F: {data[0x65F]:02X}")
-    
-    layer1_offset = (int.from_bytes(data[12:16], byteorder='big') * 2) - 196608 + 1
-    for i, offset in enumerate(range(0x661, 0x72E, 9), start=1):
-        range_start = int.from_bytes(data[offset+3:offset+6], 'big')
-        range_end = int.from_bytes(data[offset+6:offset+9], 'big')
-        if not verbose and (xgd == 1 and i < 9) or (xgd > 1 and i == 1):
-            print(f"SS LBA Range #{i:02}: {range_start - 196608}-{range_end - 196608}")
-        elif not verbose and (xgd == 1 and i < 17) or (xgd > 1 and i == 4):
-            print(f"SS LBA Range #{i:02}: {layer1_offset - (~range_start & 0xFFFFFF)}-{layer1_offset - (~range_end & 0xFFFFFF)}")
+        print(f"Mastering GUID: {record['mastering_guid']}")
+        print(f"SS SHA-1 B: {record['ss_sha1_b']}")
+        print(f"SS Signature B: {record['ss_signature_b']}")
+    print_messages(record, "ss_version")
+
+    if not verbose or xgd > 1:
+        for i, range_start, range_end in record["lba_ranges"]:
+            print(f"SS LBA Range #{i:02}: {range_start}-{range_end}")
     if verbose:
-        for i, offset in enumerate(range(0x661, 0x72E, 9), start=1):
-            range_start = int.from_bytes(data[offset+3:offset+6], 'big')
-            range_end = int.from_bytes(data[offset+6:offset+9], 'big')
+        for i, (range_start, range_end) in enumerate(record["psn_ranges"], start=1):
             print(f"SS PSN Range #{i:02}: {range_start:06X}-{range_end:06X}")
-    
-    if data[0x661:0x730] != data[0x730:0x7FF]:
-        print("[WARNING] Duplicated SS range does not match")
+
+    print_messages(record, "ranges")
+    print_messages(record, "reserved")
+
+
+def show_record(record, verbose, index=None):
+    print_record(record, verbose)
+    if index is not None and record["error"] is None:
+        RedumpIndex.annotate(record, index, "ss")
+        RedumpIndex.print_annotation(record)
+
+
+def write_record(writer, file_path, record, index=None):
+    if index is not None and record["error"] is None:
+        RedumpIndex.annotate(record, index, "ss")
+    writer.write(file_path, record)
 
 
-def parse_file(file_path, verbose):
+def read_ss(file_path):
     with open(file_path, 'rb') as f:
-        data = f.read(2048)
-        if len(data) < 2048:
-            print("[ERROR] Not a valid SS: <2048 bytes")
-            return
-        
-        xgd = 0
-        layer0_end = data[13:16]
-        if layer0_end == bytes([0x20, 0x33, 0xAF]):
-            xgd = 1
-        elif layer0_end == bytes([0x20, 0x33, 0x9F]):
-            xgd = 2
-        elif layer0_end == bytes([0x23, 0x8E, 0x0F]):
-            xgd = 3
-        else:
-            print(f"[WARNING] Unexpected PSN Layer 0 End: {int.from_bytes(layer0_end, 'big'):04X}")
-        
-        if data[0x4BA] == 0x01:
-            if xgd == 0:
-                xgd = 1
-            elif xgd != 1:
-                print(f"[WARNING] XGD1 but value at 0x4BA is: {data[0x4BA]}")
-        elif data[0x4BA] == 0x02:
-            if xgd == 0:
-                xgd = 2.5
-            elif xgd != 2 and xgd != 3:
-                print(f"[WARNING] XGD{xgd} but value at 0x4BA is: {data[0x4BA]}")
-        else:
-            print(f"[WARNING] Unexpected value at 0x4BA: {data[0x4BA]}")
-
-        if xgd == 1:
-            print("System: Xbox (XGD1)")
-        elif xgd == 2:
-            print("System: Xbox 360 (XGD2)")
-        elif xgd == 2.5:
-            print("[WARNING] System: Xbox 360 (Malformed XGD2)")
-            xgd = 2
-        elif xgd == 3:
-            print("System: Xbox 360 (XGD3)")
+        return f.read(2048)
+
+
+def parse_file(file_path, verbose, index=None):
+    record = parse_ss_bytes(read_ss(file_path))
+    show_record(record, verbose, index)
+    return record
+
+
+def exception_record(e):
+    record = new_record()
+    add_message(record, "detect", "error", "EXCEPTION", f"{e}")
+    return record
+
+
+def parse_path(file_path):
+    # Worker entry point for --jobs, a bad file must not abort the batch
+    try:
+        return parse_ss_bytes(read_ss(file_path))
+    except Exception as e:
+        return exception_record(e)
+
+
+def find_files(input_path, recursive, ss_only):
+    if recursive:
+        for root, _, files in os.walk(input_path):
+            for file in files:
+                if not ss_only or (file.startswith("SS") and file.endswith(".bin")):
+                    yield os.path.join(root, file)
+    else:
+        for entry in os.listdir(input_path):
+            file_path = os.path.join(input_path, entry)
+            if os.path.isfile(file_path) and (not ss_only or (os.path.basename(file_path).startswith("SS") and file_path.endswith(".bin"))):
+                yield file_path
+
+
+def parse_files(file_paths, verbose, jobs, cache_path=None, index=None, writer=None):
+    from concurrent.futures import ProcessPoolExecutor
+    executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    cache = None
+    try:
+        if cache_path is not None:
+            import ResultCache
+            cache = ResultCache.ResultCache(cache_path, "SS", parse_ss_bytes, SOURCE_FILES)
+            records = cache.get_many(file_paths, executor, exception_record)
         else:
-            print("[ERROR] Could not detect XGD version")
+            # map() yields in submission order, so output matches the serial walk
+            records = executor.map(parse_path, file_paths, chunksize=64)
+        for file_path, record in zip(file_paths, records):
+            if writer is not None:
+                write_record(writer, file_path, record, index)
+                continue
+            print(file_path)
+            show_record(record, verbose, index)
+    finally:
+        if cache is not None:
+            cache.close()
+        if executor is not None:
+            executor.shutdown()
+
+
+def parse_files_async(file_paths, verbose, inflight, index=None, writer=None):
+    import AsyncReader
+    def handle(file_path, data, error):
+        try:
+            record = exception_record(error) if error is not None else parse_ss_bytes(data)
+        except Exception as e:
+            record = exception_record(e)
+        if writer is not None:
+            write_record(writer, file_path, record, index)
             return
-        
-        if data[32:104] != b'\x00' * 72:
-            if xgd == 3:
-                xgd = 4
-            else:
-                print(f"[WARNING] XGD{xgd} SS with non-zero data in XGD3 SS table")
-        elif xgd == 3:
-            print("[WARNING] XGD3 with empty SS table")
-        
-        clean_kreon_ss = bytearray(data)
-        abgx_ss = bytearray(data)
-        clean_0800_ss = bytearray(data)
-        xgd1_fixed_ss = bytearray(data)
-        if xgd == 2:
-            for i in range(0x200, 0x300):
-                abgx_ss[i] = 0xFF
-            if abgx_ss == bytearray(data):
-                print("[WARNING] XGD2 SS matches abgx360 internal hash, bad angles")
-        elif xgd == 4:
-            for i in range(0x20, 0xF4):
-                abgx_ss[i] = 0xFF
-            if abgx_ss == bytearray(data):
-                print("[WARNING] XGD3 SS matches abgx360 internal hash, bad angles")
-        
-        if xgd == 1:
-            xgd1_fixed_ss[0x200:0x2CF] = b'\x00' * (0x2CF - 0x200)
-            xgd1_fixed_ss[0x5DF:0x5E7] = b'\x00' * (0x5E7 - 0x5DF)
-            xgd1_fixed_ss[0x5FA:0x65F] = b'\x00' * (0x65F - 0x5FA)
-        elif xgd == 2:            
-            if data[552] == 0x01 and data[553] == 0x00 and data[555] == 0x00 and data[556] == 0x00 and data[561] == 0x5B and data[562] == 0x00 and data[564] == 0x00 and data[565] == 0x00 and data[570] == 0xB5 and data[571] == 0x00 and data[573] == 0x00 and data[574] == 0x00 and data[579] == 0x0F and data[580] == 0x01 and data[582] == 0x00 and data[583] == 0x00:
-                print("XGD2: Cleaned Kreon-style SS (Redump hash)")
-                clean_0800_ss[552] = 0x01
-                clean_0800_ss[553] = 0x00
-                clean_0800_ss[555] = 0x01
-                clean_0800_ss[556] = 0x00
-                clean_0800_ss[561] = 0x5B
-                clean_0800_ss[562] = 0x00
-                clean_0800_ss[564] = 0x5B
-                clean_0800_ss[565] = 0x00
-                clean_0800_ss[570] = 0xB5
-                clean_0800_ss[571] = 0x00
-                clean_0800_ss[573] = 0xB5
-                clean_0800_ss[574] = 0x00
-                clean_0800_ss[579] = 0x0F
-                clean_0800_ss[580] = 0x01
-                clean_0800_ss[582] = 0x0F
-                clean_0800_ss[583] = 0x01
-            elif data[552] == 0x01 and data[553] == 0x00 and data[555] == 0x01 and data[556] == 0x00 and data[561] == 0x5B and data[562] == 0x00 and data[564] == 0x5B and data[565] == 0x00 and data[570] == 0xB5 and data[571] == 0x00 and data[573] == 0xB5 and data[574] == 0x00 and data[579] == 0x0F and data[580] == 0x01 and data[582] == 0x0F and data[583] == 0x01:
-                print("XGD2: Cleaned 0800-style SS (Fixed angles)")
-                clean_kreon_ss[552] = 0x01
-                clean_kreon_ss[553] = 0x00
-                clean_kreon_ss[555] = 0x00
-                clean_kreon_ss[556] = 0x00
-                clean_kreon_ss[561] = 0x5B
-                clean_kreon_ss[562] = 0x00
-                clean_kreon_ss[564] = 0x00
-                clean_kreon_ss[565] = 0x00
-                clean_kreon_ss[570] = 0xB5
-                clean_kreon_ss[571] = 0x00
-                clean_kreon_ss[573] = 0x00
-                clean_kreon_ss[574] = 0x00
-                clean_kreon_ss[579] = 0x0F
-                clean_kreon_ss[580] = 0x01
-                clean_kreon_ss[582] = 0x00
-                clean_kreon_ss[583] = 0x00
-            else:
-                is_kreon_ss = False
-                if data[555] == 0x00 and data[556] == 0x00 and data[564] == 0x00 and data[565] == 0x00 and data[573] == 0x00 and data[574] == 0x00 and data[582] == 0x00 and data[583] == 0x00:
-                    is_kreon_ss = True
-                if is_kreon_ss and data[552] == 0x00 and data[553] == 0x00 and data[561] == 0x00 and data[562] == 0x00 and data[570] == 0x00 and data[571] == 0x00 and data[579] == 0x00 and data[580] == 0x00:
-                    is_kreon_ss = False
-                if is_kreon_ss:
-                    print("XGD2: Raw Kreon-style SS (Raw SSv1)")
-                else:
-                    print("XGD2: Raw 0800-style SS (Raw SSv2)")
-                clean_kreon_ss[552] = 0x01
-                clean_kreon_ss[553] = 0x00
-                clean_kreon_ss[555] = 0x00
-                clean_kreon_ss[556] = 0x00
-                clean_kreon_ss[561] = 0x5B
-                clean_kreon_ss[562] = 0x00
-                clean_kreon_ss[564] = 0x00
-                clean_kreon_ss[565] = 0x00
-                clean_kreon_ss[570] = 0xB5
-                clean_kreon_ss[571] = 0x00
-                clean_kreon_ss[573] = 0x00
-                clean_kreon_ss[574] = 0x00
-                clean_kreon_ss[579] = 0x0F
-                clean_kreon_ss[580] = 0x01
-                clean_kreon_ss[582] = 0x00
-                clean_kreon_ss[583] = 0x00
-                clean_0800_ss[552] = 0x01
-                clean_0800_ss[553] = 0x00
-                clean_0800_ss[555] = 0x01
-                clean_0800_ss[556] = 0x00
-                clean_0800_ss[561] = 0x5B
-                clean_0800_ss[562] = 0x00
-                clean_0800_ss[564] = 0x5B
-                clean_0800_ss[565] = 0x00
-                clean_0800_ss[570] = 0xB5
-                clean_0800_ss[571] = 0x00
-                clean_0800_ss[573] = 0xB5
-                clean_0800_ss[574] = 0x00
-                clean_0800_ss[579] = 0x0F
-                clean_0800_ss[580] = 0x01
-                clean_0800_ss[582] = 0x0F
-                clean_0800_ss[583] = 0x01
-        elif xgd == 3:
-            if data[552] == 0x01 and data[553] == 0x00 and data[561] == 0x5B and data[562] == 0x00 and data[570] == 0xB5 and data[571] == 0x00 and data[579] == 0x0F and data[580] == 0x00:
-                print("[WARNING] XGD3: Cleaned Kreon-style invalid SS (Bad Redump hash)")
-                clean_kreon_ss[552] = 0x01
-                clean_kreon_ss[553] = 0x00
-                clean_kreon_ss[561] = 0x5B
-                clean_kreon_ss[562] = 0x00
-                clean_kreon_ss[570] = 0xB5
-                clean_kreon_ss[571] = 0x00
-                clean_kreon_ss[579] = 0x0F
-                clean_kreon_ss[580] = 0x00
-            else:
-                print("[WARNING] XGD3: Raw Kreon-style invalid SS")
-                clean_kreon_ss[552] = 0x01
-                clean_kreon_ss[553] = 0x00
-                clean_kreon_ss[561] = 0x5B
-                clean_kreon_ss[562] = 0x00
-                clean_kreon_ss[570] = 0xB5
-                clean_kreon_ss[571] = 0x00
-                clean_kreon_ss[579] = 0x0F
-                clean_kreon_ss[580] = 0x00
-        elif xgd == 4:
-            if data[72] == 0x01 and data[73] == 0x00 and data[75] == 0x01 and data[76] == 0x00 and data[81] == 0x5B and data[82] == 0x00 and data[84] == 0x5B and data[85] == 0x00 and data[90] == 0xB5 and data[91] == 0x00 and data[93] == 0xB5 and data[94] == 0x00 and data[99] == 0x0F and data[100] == 0x01 and data[102] == 0x0F and data[103] == 0x01:
-                print("XGD3: Cleaned SSv2 (Redump hash)")
+        print(file_path)
+        show_record(record, verbose, index)
+    AsyncReader.read_files(file_paths, 2048, inflight, handle)
+
+
+def parse_pack(pack_path, verbose, index=None, writer=None):
+    # One sequential pass over a memory-mapped SectorPack, each sector is reported under its packed name
+    with SectorPack.SectorPack(pack_path) as pack:
+        for entry, data in pack:
+            try:
+                record = parse_ss_bytes(data)
+            except Exception as e:
+                record = exception_record(e)
+            if writer is not None:
+                write_record(writer, entry["path"], record, index)
+                continue
+            print(entry["path"])
+            show_record(record, verbose, index)
+
+
+def open_writer(output_format, store_path):
+    if store_path is not None:
+        import ColumnStore
+        return ColumnStore.ColumnWriter(store_path, "SS")
+    return RecordWriter.RecordWriter(output_format, FIELDS)
+
+
+def profile_files(file_paths, verbose, index=None, writer=None, show_paths=True):
+    # Runs serially so every stage is timed in this process, timings include the tracemalloc overhead
+    import StageProfiler
+    profiler = StageProfiler.StageProfiler()
+    module = sys.modules[__name__]
+    for name, stage in (("read_ss", "read"), ("parse_ss_bytes", "parse"), ("detect_xgd", "detect"),
+                        ("detect_style", "classify"), ("hash_variants", "crc"), ("parse_ccrt", "challenges"),
+                        ("parse_ccrt2", "challenges"), ("filetime", "timestamps"),
+                        ("time_t", "timestamps"), ("show_record", "output"), ("write_record", "output")):
+        profiler.instrument(module, name, stage)
+    profiler.instrument(CCRT, "decrypt_ccrt1", "ccrt")
+    profiler.instrument(CCRT, "decrypt_ccrt2", "ccrt")
+    profiler.start()
+    try:
+        for file_path in file_paths:
+            profiler.start_file(file_path)
+            record = module.parse_path(file_path)
+            if writer is not None:
+                module.write_record(writer, file_path, record, index)
             else:
-                is_kreon_ss = False
-                if data[75] == 0x00 and data[76] == 0x00 and data[84] == 0x00 and data[85] == 0x00 and data[93] == 0x00 and data[94] == 0x00 and data[102] == 0x00 and data[103] == 0x00:
-                    is_kreon_ss = True
-                if is_kreon_ss and data[72] == 0x00 and data[73] == 0x00 and data[81] == 0x00 and data[82] == 0x00 and data[90] == 0x00 and data[91] == 0x00 and data[99] == 0x00 and data[100] == 0x00:
-                    is_kreon_ss = False
-                if is_kreon_ss:
-                    print("XGD3: Raw Kreon-style SS (SSv1)")
-                else:
-                    print("XGD3: Raw 0800-style SS (SSv2)")
-                clean_kreon_ss[72] = 0x01
-                clean_kreon_ss[73] = 0x00
-                clean_kreon_ss[75] = 0x01
-                clean_kreon_ss[76] = 0x00
-                clean_kreon_ss[81] = 0x5B
-                clean_kreon_ss[82] = 0x00
-                clean_kreon_ss[84] = 0x5B
-                clean_kreon_ss[85] = 0x00
-                clean_kreon_ss[90] = 0xB5
-                clean_kreon_ss[91] = 0x00
-                clean_kreon_ss[93] = 0xB5
-                clean_kreon_ss[94] = 0x00
-                clean_kreon_ss[99] = 0x0F
-                clean_kreon_ss[100] = 0x01
-                clean_kreon_ss[102] = 0x0F
-                clean_kreon_ss[103] = 0x01
-        
-        ss_crc = zlib.crc32(data)
-        print(f"SS Hash: {ss_crc:08X}")
-        if xgd == 1:
-            xgd1_fixed_ss_crc = zlib.crc32(xgd1_fixed_ss)
-            print(f"Internal SS Hash: {xgd1_fixed_ss_crc:08X}")
-        elif xgd == 2:
-            clean_kreon_ss_crc = zlib.crc32(clean_kreon_ss)
-            print(f"Redump SS Hash: {clean_kreon_ss_crc:08X}")
-            clean_0800_ss_crc = zlib.crc32(clean_0800_ss)
-            print(f"Fixed angles SS Hash: {clean_0800_ss_crc:08X}")
-            abgx_ss_crc = zlib.crc32(abgx_ss)
-            print(f"abgx360 filename: SS_{abgx_ss_crc:08X}.bin")
-        elif xgd == 3:
-            clean_kreon_ss_crc = zlib.crc32(clean_kreon_ss)
-            print(f"Redump SS Hash: {clean_kreon_ss_crc:08X}")
-        elif xgd == 4:
-            clean_kreon_ss_crc = zlib.crc32(clean_kreon_ss)
-            print(f"Redump SS Hash: {clean_kreon_ss_crc:08X}")
-            abgx_ss_crc = zlib.crc32(abgx_ss)
-            print(f"abgx360 filename: SS_{abgx_ss_crc:08X}.bin")
-        
-        parse_pfi(data, xgd)
-        
-        parse_ss(data, xgd, verbose)
-        
-        if xgd == 1:
-            empty_ranges = [(0x011, 0x2D0), (0x2D4, 0x300), (0x3FF, 0x41F), (0x437, 0x43B), (0x44B, 0x49F), (0x4AB, 0x4BA), (0x7FF, 0x800)]
-            all_zero = all(data[start:end] == b'\x00' * (end - start) for start, end in empty_ranges)
-            if not all_zero:
-                print("[WARNING] Unexpected data in reserved bytes")
-        elif xgd == 2:
-            empty_ranges = [(0x011, 0x100), (0x11C, 0x200), (0x2CF, 0x2D0), (0x2D4, 0x300), (0x302, 0x304), (0x400, 0x460), (0x470, 0x49E), (0x4A7, 0x4BA), (0x5EB, 0x5FA), (0x7FF, 0x800)]
-            all_zero = all(data[start:end] == b'\x00' * (end - start) for start, end in empty_ranges)
-            if not all_zero:
-                print("[WARNING] Unexpected data in reserved bytes")
-        elif xgd > 2:
-            empty_ranges = [(0x011, 0x01B), (0x01C, 0x020), (0x0F5, 0x0FF), (0x302, 0x304), (0x400, 0x460), (0x470, 0x49E), (0x4A7, 0x4BA), (0x5EB, 0x5FA), (0x7FF, 0x800)]
-            all_zero = all(data[start:end] == b'\x00' * (end - start) for start, end in empty_ranges)
-            if not all_zero:
-                print("[WARNING] Unexpected data in reserved bytes")
-        
-        else:
-            print(f"[ERROR] Not a valid Xbox SS: Byte at 0x4BA is 0x{data[0]:02X}")
-            return
+                if show_paths:
+                    print(file_path)
+                module.show_record(record, verbose, index)
+            profiler.end_file()
+    finally:
+        profiler.stop()
+    sys.stdout.flush()
+    profiler.report()
 
 
 if __name__ == "__main__":
     try:
-        if len(sys.argv) < 2 or len(sys.argv) > 5:
-            print("Usage: python ParseSS.py <filename|directory> [-v|--verbose] [-r|--recursive] [-s|--ss-only]")
+        if len(sys.argv) < 2 or len(sys.argv) > 18:
+            print("Usage: python ParseSS.py <filename|directory> [-v|--verbose] [-r|--recursive] [-s|--ss-only] [-j|--jobs N] [-c|--cache FILE] [--redump INDEX] [--format text|jsonl|csv] [--store DIR] [--profile] [--inflight N]")
             print()
             print("Options:")
-            print("input: file path to parse, or directory of files to parse")
+            print("input: file path to parse, directory of files to parse, or sector pack made by SectorPack.py")
             print("-v, --verbose\t Prints extra information about SS")
             print("-r, --recursive\t Parses all files in dir recursively")
             print("-s, --ss-only\t Only parses .bin files in dir that start with SS")
+            print("-j, --jobs N\t Parses files in dir using N worker processes")
+            print("-c, --cache FILE Reuses results for files unchanged since the last run")
+            print("--redump INDEX\t Looks up each SS hash in an index built by RedumpIndex.py")
+            print("--format\t Writes one record per file as JSON Lines or CSV instead of text")
+            print("--store DIR\t Adds one row per file to a column store queried with ColumnStore.py, instead of text")
+            print("--profile\t Prints per-stage timings, allocations and the slowest files to stderr, runs serially")
+            print("--inflight N\t Keeps N file reads in flight while parsing a dir, for network shares")
             sys.exit(0)
-        
+
         input_path = None
         verbose = False
         recursive = False
         ss_only = False
-        for arg in sys.argv[1:]:
+        jobs = 1
+        cache_path = None
+        index = None
+        output_format = "text"
+        store_path = None
+        profile = False
+        inflight = 0
+        args = iter(sys.argv[1:])
+        for arg in args:
             if arg in ("-v", "--verbose"):
                 verbose = True
             elif arg in ("-r", "--recursive"):
                 recursive = True
             elif arg in ("-s", "--ss-only"):
                 ss_only = True
+            elif arg in ("-j", "--jobs"):
+                jobs = int(next(args, "0"))
+                if jobs < 1:
+                    print("[ERROR] --jobs requires a positive number of workers")
+                    sys.exit(0)
+            elif arg in ("-c", "--cache"):
+                cache_path = next(args, None)
+                if not cache_path:
+                    print("[ERROR] --cache requires a cache file path")
+                    sys.exit(0)
+            elif arg == "--redump":
+                index_path = next(args, None)
+                if not index_path:
+                    print("[ERROR] --redump requires an index file path")
+                    sys.exit(0)
+                index = RedumpIndex.RedumpIndex(index_path)
+            elif arg == "--format":
+                output_format = next(args, "").lower()
+                if output_format not in RecordWriter.FORMATS:
+                    print("[ERROR] --format must be text, jsonl or csv")
+                    sys.exit(0)
+            elif arg == "--store":
+                store_path = next(args, None)
+                if not store_path:
+                    print("[ERROR] --store requires a directory path")
+                    sys.exit(0)
+            elif arg == "--profile":
+                profile = True
+            elif arg == "--inflight":
+                inflight = int(next(args, "0"))
+                if inflight < 1:
+                    print("[ERROR] --inflight requires a positive number of reads")
+                    sys.exit(0)
             else:
                 input_path = arg
-        
+
         if not input_path:
             print("[ERROR] No valid filename provided")
             sys.exit(0)
-        
-        if os.path.isdir(input_path):
-            if recursive:
-                for root, _, files in os.walk(input_path):
-                    for file in files:
-                        if not ss_only or (file.startswith("SS") and file.endswith(".bin")):
-                            file_path = os.path.join(root, file)
-                            print(file_path)
-                            parse_file(file_path, verbose)
+        if inflight and (jobs > 1 or cache_path is not None or profile):
+            print("[ERROR] --inflight cannot be combined with --jobs, --cache or --profile")
+            sys.exit(0)
+
+        if store_path is not None and output_format != "text":
+            print("[ERROR] --store cannot be combined with --format")
+            sys.exit(0)
+
+        if os.path.isfile(input_path) and SectorPack.is_pack(input_path):
+            if jobs > 1 or cache_path is not None or profile or inflight:
+                print("[ERROR] A sector pack is parsed in one pass and cannot be combined with --jobs, --cache, --profile or --inflight")
+                sys.exit(0)
+            if output_format != "text" or store_path is not None:
+                with open_writer(output_format, store_path) as writer:
+                    parse_pack(input_path, verbose, index, writer)
+            else:
+                parse_pack(input_path, verbose, index)
+        elif output_format != "text" or store_path is not None:
+            if os.path.isdir(input_path):
+                file_paths = list(find_files(input_path, recursive, ss_only))
+            elif os.path.isfile(input_path):
+                file_paths = [input_path]
             else:
-                for entry in os.listdir(input_path):
-                    file_path = os.path.join(input_path, entry)
-                    if os.path.isfile(file_path) and (not ss_only or (os.path.basename(file_path).startswith("SS") and file_path.endswith(".bin"))):
-                        print(file_path)
-                        parse_file(file_path, verbose)
+                print(f"[ERROR] Invalid path: {input_path}")
+                sys.exit(0)
+            with open_writer(output_format, store_path) as writer:
+                if profile:
+                    profile_files(file_paths, verbose, index, writer)
+                elif inflight:
+                    parse_files_async(file_paths, verbose, inflight, index, writer)
+                elif jobs > 1 or cache_path is not None:
+                    parse_files(file_paths, verbose, jobs, cache_path, index, writer)
+                else:
+                    for file_path in file_paths:
+                        write_record(writer, file_path, parse_path(file_path), index)
+        elif profile and os.path.isdir(input_path):
+            profile_files(list(find_files(input_path, recursive, ss_only)), verbose, index)
+        elif inflight and os.path.isdir(input_path):
+            parse_files_async(find_files(input_path, recursive, ss_only), verbose, inflight, index)
+        elif profile and os.path.isfile(input_path):
+            profile_files([input_path], verbose, index, show_paths=False)
+        elif os.path.isdir(input_path):
+            if jobs > 1 or cache_path is not None:
+                parse_files(list(find_files(input_path, recursive, ss_only)), verbose, jobs, cache_path, index)
+            else:
+                for file_path in find_files(input_path, recursive, ss_only):
+                    print(file_path)
+                    parse_file(file_path, verbose, index)
         elif os.path.isfile(input_path):
-            parse_file(input_path, verbose)
+            if cache_path is not None:
+                import ResultCache
+                cache = ResultCache.ResultCache(cache_path, "SS", parse_ss_bytes, SOURCE_FILES)
+                show_record(cache.get(input_path), verbose, index)
+                cache.close()
+            else:
+                parse_file(input_path, verbose, index)
         else:
             print(f"[ERROR] Invalid path: {input_path}")
     except Exception as e:
@@ -0,0 +1,198 @@
+import sys
+import io
+import os
+import stat
+import socket
+import json
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import ParseSS
+import ParseDMI
+import ParseXBE
+import ParseXEX
+import ScanDumps
+import RecordWriter
+
+
+DEFAULT_PORT = 8765
+# Largest request body accepted, an XBE or XEX only needs its header block to be parsed
+MAX_BODY_SIZE = 64 << 20
+
+
+def parse_xbe_bytes(data):
+    return ParseXBE.parse_xbe_bytes(ParseXBE.read_headers(io.BytesIO(data), len(data)), len(data), "request")
+
+
+def parse_xex_bytes(data):
+    return ParseXEX.read_record(io.BytesIO(data), len(data))
+
+
+# File type, parser for bytes in memory, parser for a file path
+PARSERS = {
+    "ss": (ParseSS.parse_ss_bytes, ParseSS.parse_path),
+    "dmi": (ParseDMI.parse_dmi_bytes, ParseDMI.parse_path),
+    "xbe": (parse_xbe_bytes, ParseXBE.parse_path),
+    "xex": (parse_xex_bytes, ParseXEX.parse_path),
+}
+
+
+def sniff_path(file_path):
+    with open(file_path, 'rb') as f:
+        return ScanDumps.sniff(f.read(2049))
+
+
+def parse_request(kind, data=None, file_path=None):
+    # Returns the file type and its record, or None for a file that is not recognised
+    if kind == "auto":
+        file_type = ScanDumps.sniff(data[:2049]) if file_path is None else sniff_path(file_path)
+        if file_type is None:
+            return None, None
+        kind = file_type.lower()
+    parse_bytes, parse_path = PARSERS[kind]
+    if file_path is None:
+        return kind, parse_bytes(data)
+    return kind, parse_path(file_path)
+
+
+class ParseHandler(BaseHTTPRequestHandler):
+    # Keeps the connection open so a frontend can send one request per disc without reconnecting
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, Nagle would hold the body back for the client's delayed ACK
+    disable_nagle_algorithm = True
+    verbose = False
+
+    def send_json(self, status, value):
+        body = json.dumps(value, default=RecordWriter.json_value, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_parse(self, data):
+        url = urlsplit(self.path)
+        kind = url.path.strip("/").lower()
+        if kind not in PARSERS and kind != "auto":
+            self.send_json(404, {"error": f"Unknown file type: {kind}, expected ss, dmi, xbe, xex or auto"})
+            return
+        file_path = parse_qs(url.query).get("path", [None])[0]
+        if file_path is None and not data:
+            self.send_json(400, {"error": "Send the file as the request body or its location as ?path="})
+            return
+        try:
+            file_type, record = parse_request(kind, data, file_path)
+        except Exception as e:
+            self.send_json(400, {"error": f"{e}"})
+            return
+        if record is None:
+            self.send_json(422, {"error": "Unrecognised file"})
+            return
+        self.send_json(200, dict(record, type=file_type))
+
+    def do_GET(self):
+        if urlsplit(self.path).path == "/health":
+            self.send_json(200, {"status": "ok"})
+            return
+        self.handle_parse(None)
+
+    def do_POST(self):
+        try:
+            size = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            size = -1
+        if size < 0:
+            self.send_json(400, {"error": "Invalid Content-Length"})
+            self.close_connection = True
+            return
+        if size > MAX_BODY_SIZE:
+            self.send_json(413, {"error": f"Request body is larger than {MAX_BODY_SIZE} bytes"})
+            self.close_connection = True
+            return
+        self.handle_parse(self.rfile.read(size))
+
+    def log_message(self, format, *args):
+        if self.verbose:
+            sys.stderr.write(f"{self.command} {self.path} {format % args}\n")
+
+
+class UnixParseHandler(ParseHandler):
+    disable_nagle_algorithm = False
+
+
+class ParseHTTPServer(ThreadingHTTPServer):
+    # socketserver listens with a backlog of 5, too few for a frontend sending a burst of requests at once
+    request_queue_size = socket.SOMAXCONN
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    # A Unix socket refuses connections as soon as its backlog is full, unlike TCP which retries
+    request_queue_size = socket.SOMAXCONN
+
+    def get_request(self):
+        # Unix sockets have no client address, the handler expects a (host, port) pair
+        request, _ = super().get_request()
+        return request, ("local", 0)
+
+
+def serve(host, port, socket_path=None):
+    if socket_path is not None:
+        # Only a stale socket left by an earlier run is replaced, never a regular file or directory
+        if os.path.lexists(socket_path):
+            if not stat.S_ISSOCK(os.lstat(socket_path).st_mode):
+                raise ValueError(f"{socket_path} exists and is not a socket")
+            os.remove(socket_path)
+        server = UnixHTTPServer(socket_path, UnixParseHandler)
+        print(f"Listening on {socket_path}", flush=True)
+    else:
+        server = ParseHTTPServer((host, port), ParseHandler)
+        print(f"Listening on http://{host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path is not None and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+if __name__ == "__main__":
+    try:
+        if len(sys.argv) > 8 or any(arg in ("-h", "--help") for arg in sys.argv[1:]):
+            print("Usage: python ParseService.py [--host HOST] [-p|--port N] [--socket PATH] [-v|--verbose]")
+            print()
+            print("Options:")
+            print("--host HOST\t Address to listen on (default: 127.0.0.1)")
+            print(f"-p, --port N\t Port to listen on (default: {DEFAULT_PORT})")
+            print("--socket PATH\t Listens on a Unix domain socket instead of a port")
+            print("-v, --verbose\t Logs every request to stderr")
+            sys.exit(0)
+
+        host = "127.0.0.1"
+        port = DEFAULT_PORT
+        socket_path = None
+        args = iter(sys.argv[1:])
+        for arg in args:
+            if arg == "--host":
+                host = next(args, host)
+            elif arg in ("-p", "--port"):
+                port = int(next(args, "-1"))
+                if not 0 <= port <= 65535:
+                    print("[ERROR] --port requires a port number")
+                    sys.exit(0)
+            elif arg == "--socket":
+                socket_path = next(args, None)
+                if not socket_path:
+                    print("[ERROR] --socket requires a socket file path")
+                    sys.exit(0)
+            elif arg in ("-v", "--verbose"):
+                ParseHandler.verbose = True
+            else:
+                print(f"[ERROR] Unknown option: {arg}")
+                sys.exit(0)
+
+        serve(host, port, socket_path)
+    except Exception as e:
+        print(f"[ERROR] {e}")
@@ -1,6 +1,26 @@
 import sys
 import os
 import datetime
+import struct
+import RecordWriter
+
+
+MESSAGE_PREFIX = {
+    "error": "Error: ",
+    "warning": "Warning: ",
+}
+
+# Enough for the image header and a certificate placed right after it, as in every retail XBE
+HEADER_READ_SIZE = 0x1000
+# magic, (signature), base address, size of headers, size of image, size of image header, timestamp, certificate address
+IMAGE_HEADER = struct.Struct("<4s256xIIIIII")
+# size, timestamp, title ID, title name, alternate title IDs, (keys), allowed media, region, ratings, disc number, version
+CERTIFICATE = struct.Struct("<II4s80s40s24xIIIII")
+# Columns written by --format jsonl|csv
+FIELDS = (
+    "path", "xbe_timestamp", "certificate_timestamp", "title_id", "title_name", "alt_title_ids", "allowed_media",
+    "game_region", "game_ratings", "disc_number", "certificate_version", "messages", "error",
+)
 
 
 def decode_title_id(byte_data):
@@ -8,173 +28,231 @@ def decode_title_id(byte_data):
     serial = int.from_bytes(byte_data[:2], byteorder='little')
     return f"{prefix}-{serial:03d}"
 
-def main(): 
-    if len(sys.argv) < 2:
-        print("Usage: python ParseXBE.py <filename.xbe>")
-        sys.exit(1)
-    
-    file_path = sys.argv[1]
-    
+
+def new_record():
+    return {
+        "xbe_timestamp": None,
+        "certificate_timestamp": None,
+        "title_id": None,
+        "title_name": None,
+        "alt_title_ids": [],
+        "allowed_media": None,
+        "game_region": None,
+        "game_ratings": None,
+        "disc_number": None,
+        "certificate_version": None,
+        "messages": [],
+        "error": None,
+    }
+
+
+def add_message(record, level, message):
+    record["messages"].append({"level": level, "message": message})
+    if level == "error" and record["error"] is None:
+        record["error"] = message
+
+
+def utc_time(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
+
+
+def read_headers(f, file_size):
+    # One read covers the header and certificate, a second only for an unusually placed certificate
+    f.seek(0)
+    data = f.read(min(file_size, HEADER_READ_SIZE))
+    if len(data) >= IMAGE_HEADER.size:
+        _, base_address, _, _, _, _, cert_address = IMAGE_HEADER.unpack_from(data)
+        cert_end = cert_address - base_address + CERTIFICATE.size
+        if len(data) < cert_end <= file_size:
+            f.seek(0)
+            data = f.read(cert_end)
+    return data
+
+
+def parse_xbe_bytes(data, file_size, file_path):
+    record = new_record()
+    if file_size < 0x370 or len(data) < IMAGE_HEADER.size:
+        add_message(record, "error", "File is too small to be a valid XBE file")
+        return record
+
+    magic, base_address, _, _, header_size, xbe_timestamp, cert_address = IMAGE_HEADER.unpack_from(data)
+    if magic != b"XBEH":
+        add_message(record, "error", "Not a valid XBE file")
+        return record
+
+    cert_offset = cert_address - base_address
+    if cert_offset != header_size:
+        add_message(record, "warning", f"Parsed data may be incorrect due to unexpected XBE header in {file_path}.")
+    if cert_offset < 0 or cert_offset + 4 >= file_size:
+        add_message(record, "error", f"Certificate address {hex(cert_offset)} is larger than XBE file size")
+        return record
+    if cert_offset + 0xB0 > file_size or cert_offset + CERTIFICATE.size > len(data):
+        add_message(record, "error", f"Certificate file offset {hex(cert_offset + 204)} is larger than XBE file size {file_size}")
+        return record
+
+    (cert_size, cert_timestamp, title_id, title_name, alt_title_ids,
+     allowed_media, game_region, game_ratings, disc_number, cert_version) = CERTIFICATE.unpack_from(data, cert_offset)
+    if cert_size != 492:
+        add_message(record, "warning", f"Unusual certificate size {cert_size} in {file_path}")
+
+    record["xbe_timestamp"] = utc_time(xbe_timestamp)
+    record["certificate_timestamp"] = utc_time(cert_timestamp)
+    record["title_id"] = decode_title_id(title_id)
+    record["title_name"] = title_name.decode('utf-16le', errors='replace').split('\x00')[0]
+    for i in range(0, len(alt_title_ids), 4):
+        if alt_title_ids[i:i+4] == b'\x00' * 4:
+            break
+        record["alt_title_ids"].append(decode_title_id(alt_title_ids[i:i+4]))
+    record["allowed_media"] = allowed_media
+    record["game_region"] = game_region
+    record["game_ratings"] = game_ratings
+    record["disc_number"] = disc_number
+    record["certificate_version"] = cert_version
+    return record
+
+
+def print_record(record):
+    for message in record["messages"]:
+        print(f"{MESSAGE_PREFIX[message['level']]}{message['message']}")
+    if record["error"] is not None:
+        return
+
+    print(f"XBE Timestamp: {record['xbe_timestamp']}")
+    print(f"Certificate Timestamp: {record['certificate_timestamp']}")
+    print(f"Title ID: {record['title_id']}")
+    print(f"Title Name: {record['title_name']}")
+    if len(record["alt_title_ids"]) > 0:
+        print("Alternate Title IDs:")
+        for id in record["alt_title_ids"]:
+            print(f"    {id}")
+    print(f"Allowed Media: 0x{record['allowed_media']:x}")
+    print(f"Game Region: 0x{record['game_region']:x}")
+    print(f"Game Ratings: 0x{record['game_ratings']:x}")
+    print(f"Disc Number: {record['disc_number']}")
+    print(f"Certificate Version: {record['certificate_version']}")
+
+
+def parse_xbe(f, file_size, file_path):
+    record = parse_xbe_bytes(read_headers(f, file_size), file_size, file_path)
+    print_record(record)
+    return record
+
+
+def exception_record(e):
+    record = new_record()
+    add_message(record, "error", f"{e}")
+    return record
+
+
+def parse_path(file_path):
+    # Worker entry point for --jobs, a bad file must not abort the batch
     try:
-        file_size = os.path.getsize(file_path)
-        if file_size < 0x370:
-            print(f"Error: File is too small to be a valid XBE file")
-            sys.exit(1)
+        with open(file_path, 'rb') as f:
+            file_size = os.fstat(f.fileno()).st_size
+            return parse_xbe_bytes(read_headers(f, file_size), file_size, file_path)
     except Exception as e:
-        print(f"Error opening file: {e}")
-        sys.exit(1)
-    
+        return exception_record(e)
+
+
+def parse_file(file_path):
+    record = parse_path(file_path)
+    print_record(record)
+    return record
+
+
+def find_files(input_path, recursive, xbe_only):
+    if recursive:
+        for root, _, files in os.walk(input_path):
+            for file in files:
+                if not xbe_only or file.lower().endswith(".xbe"):
+                    yield os.path.join(root, file)
+    else:
+        for entry in os.listdir(input_path):
+            file_path = os.path.join(input_path, entry)
+            if os.path.isfile(file_path) and (not xbe_only or entry.lower().endswith(".xbe")):
+                yield file_path
+
+
+def parse_files(file_paths, jobs, writer=None):
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        # map() yields in submission order, so output matches the serial walk
+        for file_path, record in zip(file_paths, executor.map(parse_path, file_paths, chunksize=64)):
+            if writer is not None:
+                writer.write(file_path, record)
+                continue
+            print(file_path)
+            print_record(record)
+
+
+if __name__ == "__main__":
     try:
-        with open(file_path, 'rb') as f:
-            # Check XBE file header
-            magic = f.read(4)
-            if len(magic) != 4:
-                raise ValueError("Unexpected read error at 0x0")
-            if magic != b"XBEH":
-                print(f"Error: Not a valid XBE file")
+        if len(sys.argv) < 2 or len(sys.argv) > 8:
+            print("Usage: python ParseXBE.py <filename|directory> [-r|--recursive] [-x|--xbe-only] [-j|--jobs N] [--format text|jsonl|csv]")
+            print()
+            print("Options:")
+            print("input: file path to parse, or directory of files to parse")
+            print("-r, --recursive\t Parses all files in dir recursively")
+            print("-x, --xbe-only\t Only parses .xbe files in dir")
+            print("-j, --jobs N\t Parses files in dir using N worker processes")
+            print("--format\t Writes one record per file as JSON Lines or CSV instead of text")
+            sys.exit(1)
+
+        input_path = None
+        recursive = False
+        xbe_only = False
+        jobs = 1
+        output_format = "text"
+        args = iter(sys.argv[1:])
+        for arg in args:
+            if arg in ("-r", "--recursive"):
+                recursive = True
+            elif arg in ("-x", "--xbe-only"):
+                xbe_only = True
+            elif arg in ("-j", "--jobs"):
+                jobs = int(next(args, "0"))
+                if jobs < 1:
+                    print("Error: --jobs requires a positive number of workers")
+                    sys.exit(1)
+            elif arg == "--format":
+                output_format = next(args, "").lower()
+                if output_format not in RecordWriter.FORMATS:
+                    print("Error: --format must be text, jsonl or csv")
+                    sys.exit(1)
+            else:
+                input_path = arg
+
+        if not input_path:
+            print("Error: No valid filename provided")
+            sys.exit(1)
+
+        if output_format != "text":
+            if os.path.isdir(input_path):
+                file_paths = list(find_files(input_path, recursive, xbe_only))
+            elif os.path.isfile(input_path):
+                file_paths = [input_path]
+            else:
+                print(f"Error: File '{input_path}' not found.")
                 sys.exit(1)
-            
-            # Read memory address
-            f.seek(0x104)
-            mem_offset = f.read(4)
-            if len(mem_offset) != 4:
-                raise ValueError("Unexpected read error at 0x104")
-            mem_offset = int.from_bytes(mem_offset, byteorder='little')
-            
-            # Read header size
-            f.seek(0x110)
-            header_size = f.read(4)
-            if len(header_size) != 4:
-                raise ValueError("Unexpected read error at 0x110")
-            header_size = int.from_bytes(header_size, byteorder='little')
-            
-            # Read xbe timestamp
-            f.seek(0x114)
-            xbe_timestamp = f.read(4)
-            if len(xbe_timestamp) != 4:
-                raise ValueError("Unexpected read error at xbe_timestamp")
-            xbe_timestamp = int.from_bytes(xbe_timestamp, byteorder='little')
-            xbe_timestamp = datetime.datetime.fromtimestamp(xbe_timestamp, tz=datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
-            
-            # Read relative certificate address
-            f.seek(0x118)
-            cert_memory_offset = f.read(4)
-            if len(cert_memory_offset) != 4:
-                raise ValueError("Unexpected read error at 0x118")
-            cert_memory_offset = int.from_bytes(cert_memory_offset, byteorder='little')
-            
-            # Determine absolute certificate address
-            cert_offset = cert_memory_offset - mem_offset
-            
-            # Compare cert offset against header size
-            if cert_offset != header_size:
-                print(f"Warning: Parsed data may be incorrect due to unexpected XBE header in {file_path}.")
-            
-            # Read certificate size
-            if cert_offset + 4 < file_size:
-                f.seek(cert_offset)
-                cert_size = f.read(4)
-                if len(cert_size) != 4:
-                    print(f"Unexpected read error at {hex(cert_offset)}")
+            with RecordWriter.RecordWriter(output_format, FIELDS) as writer:
+                if jobs > 1:
+                    parse_files(file_paths, jobs, writer)
                 else:
-                    cert_size = int.from_bytes(cert_size, byteorder='little')
-                    if cert_size != 492:
-                        print(f"Warning: Unusual certificate size {cert_size} in {file_path}")
+                    for file_path in file_paths:
+                        writer.write(file_path, parse_path(file_path))
+        elif os.path.isdir(input_path):
+            if jobs > 1:
+                parse_files(list(find_files(input_path, recursive, xbe_only)), jobs)
             else:
-                raise ValueError(f"Certificate address {hex(cert_offset)} is larger than XBE file size")
-            
-            # Check file size before continuing
-            if cert_offset + 0xB0 > file_size:
-                raise ValueError(f"Certificate file offset {hex(cert_offset + 204)} is larger than XBE file size {file_size}")
-                
-            # Print XBE timestamp
-            print(f"XBE Timestamp: {xbe_timestamp}")
-            
-            # Read Cert Timestamp
-            f.seek(cert_offset + 0x04)
-            timestamp = f.read(4)
-            if len(timestamp) != 4:
-                raise ValueError("Unexpected read error at timestamp")
-            timestamp = int.from_bytes(timestamp, byteorder='little')
-            readable_time = datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
-            print(f"Certificate Timestamp: {readable_time}")
-            
-            # Read Cert Title ID
-            f.seek(cert_offset + 0x08)
-            title_id = f.read(4)
-            if len(title_id) != 4:
-                raise ValueError("Unexpected read error at Title ID")
-            title_id = decode_title_id(title_id)
-            print(f"Title ID: {title_id}")
-            
-            # Read Cert Title Name
-            f.seek(cert_offset + 0x0C)
-            title_name = f.read(50)
-            if len(title_name) != 50:
-                raise ValueError("Unexpected read error at Title Name")
-            title_name = title_name.decode('utf-16le')
-            print(f"Title Name: {title_name}")
-            
-            # Read Alt Title IDs
-            f.seek(cert_offset + 0x5C)
-            alt_title_ids = f.read(40)
-            if len(alt_title_ids) != 40:
-                raise ValueError("Unexpected read error at Alt Title IDs")
-            alt_title_id = []
-            for i in range(0, len(alt_title_ids), 4):
-                cur_title_id = alt_title_ids[i:i+4]
-                if all(b == 0x00 for b in cur_title_id):
-                    break
-                alt_title_id.append(decode_title_id(cur_title_id))
-            if len(alt_title_id) > 0:
-                print("Alternate Title IDs:")
-                for id in alt_title_id:
-                    print(f"    {id}")
-            
-            # Read Allowed Media
-            f.seek(cert_offset + 0x9C)
-            allowed_media = f.read(4)
-            if len(allowed_media) != 4:
-                raise ValueError("Unexpected read error at Allowed Media")
-            allowed_media_int = int.from_bytes(allowed_media, byteorder='little')
-            print(f"Allowed Media: 0x{allowed_media_int:x}")
-            
-            # Read Game Region
-            f.seek(cert_offset + 0xA0)
-            game_region = f.read(4)
-            if len(game_region) != 4:
-                raise ValueError("Unexpected read error at Game Region")
-            game_region_int = int.from_bytes(game_region, byteorder='little')
-            print(f"Game Region: 0x{game_region_int:x}")
-            
-            # Read Game Ratings
-            f.seek(cert_offset + 0xA4)
-            game_ratings = f.read(4)
-            if len(game_ratings) != 4:
-                raise ValueError("Unexpected read error at Game Ratings")
-            game_ratings_int = int.from_bytes(game_ratings, byteorder='little')
-            print(f"Game Ratings: 0x{game_ratings_int:x}")
-            
-            # Read Disc Number
-            f.seek(cert_offset + 0xA8)
-            disc_num = f.read(4)
-            if len(disc_num) != 4:
-                raise ValueError("Unexpected read error at Disc Number")
-            disc_num = int.from_bytes(disc_num, byteorder='little')
-            print(f"Disc Number: {disc_num}")
-            
-            # Read Certificate Version
-            f.seek(cert_offset + 0xAC)
-            cert_version = f.read(4)
-            if len(cert_version) != 4:
-                raise ValueError("Unexpected read error at Certificate Version")
-            cert_version = int.from_bytes(cert_version, byteorder='little')
-            print(f"Certificate Version: {cert_version}")
-            
-    except FileNotFoundError:
-        print(f"Error: File '{file_path}' not found.")
+                for file_path in find_files(input_path, recursive, xbe_only):
+                    print(file_path)
+                    parse_file(file_path)
+        elif os.path.isfile(input_path):
+            if parse_file(input_path)["error"] is not None:
+                sys.exit(1)
+        else:
+            print(f"Error: File '{input_path}' not found.")
+            sys.exit(1)
     except Exception as e:
         print(f"Error: {e}")
-
-if __name__ == "__main__":
-    main()
+        sys.exit(1)
@@ -1,6 +1,30 @@
 import sys
 import os
 import datetime
+import struct
+import RecordWriter
+from functools import cached_property
+
+
+# Optional headers and the security info sit below the PE data, which is 0x2000 or less in retail XEX files
+HEADER_READ_SIZE = 0x2000
+# magic, module flags, PE data offset, (reserved), security info offset, optional header count
+XEX_HEADER = struct.Struct(">4sII4xII")
+OPTIONAL_HEADER = struct.Struct(">II")
+# media ID, version, base version, title ID, platform, executable type, disc number, disc count
+EXECUTION_INFO = struct.Struct(">III4sBBBB")
+
+CHECKSUM_TIMESTAMP_ID = 0x00018002
+EXECUTION_INFO_ID = 0x00040006
+GAME_RATINGS_ID = 0x00040310
+
+# Columns written by --format jsonl|csv
+FIELDS = (
+    "path", "timestamp", "title_id", "title_id_name", "version", "base_version", "disc_number", "disc_count",
+    "media_id", "region", "region_name", "allowed_media", "game_ratings", "error",
+)
+
+RATING_BOARDS = ("ESRB", "PEGI", "PEGI-FI", "PEGI-PT", "BBFC", "CERO", "USK", "OFLC-AU", "OFLC-NZ", "KMRB", "Brazil", "FPB")
 
 
 def decode_title_id(byte_data):
@@ -8,117 +32,261 @@ def decode_title_id(byte_data):
     serial = int.from_bytes(byte_data[:2], byteorder='little')
     return f"{prefix}-{serial:03d}"
 
-def main(): 
-    if len(sys.argv) < 2:
-        print("Usage: python ParseXEX.py <filename.xex>")
-        sys.exit(1)
-    
-    file_path = sys.argv[1]
-    
+def decode_version(version):
+    return f"{version >> 28}.{(version >> 24) & 0xF}.{(version >> 8) & 0xFFFF}.{version & 0xFF}"
+
+def decode_region(val):
+    if val == 0xFFFFFFFF:
+        return "Region Free"
+    matches = []
+    if (val & 0x000000FF) == 0x000000FF:
+        matches.append("NTSC/U")
+
+    if (val & 0x00FF0000) == 0x00FF0000:
+        matches.append("PAL")
+    else:
+        if (val & 0x00FE0000) == 0x00FE0000: matches.append("Europe")
+        if (val & 0x00010000) == 0x00010000: matches.append("Oceania")
+
+    if (val & 0x0000FF00) == 0x0000FF00:
+        matches.append("NTSC/J")
+    elif (val & 0x0000FD00) == 0x0000FD00:
+        matches.append("NTSC/J, Excluding China")
+    elif (val & 0x0000F900) == 0x0000F900:
+        matches.append("NTSC/J, Unknown 0xF9")
+    else:
+        if (val & 0x0000F800) == 0x0000F800: matches.append("Other Asia")
+        if (val & 0x00000200) == 0x00000200: matches.append("China")
+        if (val & 0x00000100) == 0x00000100: matches.append("Japan")
+
+    return ", ".join(matches)
+
+
+class XexHeader:
+    # Indexes the optional headers from one read, each field is only decoded when first used
+    def __init__(self, f, file_size):
+        self.f = f
+        f.seek(0)
+        self.data = f.read(min(file_size, HEADER_READ_SIZE))
+        if len(self.data) < XEX_HEADER.size:
+            raise ValueError("Unexpected read error at 0x0")
+        self.magic, self.module_flags, self.pe_offset, self.cert_offset, optional_header_count = XEX_HEADER.unpack_from(self.data)
+        self.optional_headers = {}
+        if self.magic == b"XEX2":
+            table = self.read(XEX_HEADER.size, optional_header_count * OPTIONAL_HEADER.size, "optional headers")
+            self.optional_headers = dict(OPTIONAL_HEADER.iter_unpack(table))
+
+    def read(self, offset, size, name):
+        # Falls back to the file for headers placed past the first read
+        if offset + size > len(self.data):
+            self.f.seek(offset)
+            data = self.f.read(size)
+        else:
+            data = self.data[offset:offset + size]
+        if len(data) != size:
+            raise ValueError(f"Unexpected read error at {name}")
+        return data
+
+    def optional_header(self, header_id):
+        # Low byte 0x00/0x01: inline value, 0xFF: block starting with its size, otherwise: size in dwords
+        if header_id not in self.optional_headers:
+            return None
+        value = self.optional_headers[header_id]
+        size = header_id & 0xFF
+        if size <= 0x01:
+            return value
+        if size == 0xFF:
+            size = int.from_bytes(self.read(value, 4, f"optional header {header_id:08X}"), byteorder='big')
+        else:
+            size *= 4
+        return self.read(value, size, f"optional header {header_id:08X}")
+
+    @cached_property
+    def media_id(self):
+        return self.read(self.cert_offset + 320, 16, "Media ID")
+
+    @cached_property
+    def region(self):
+        return self.read(self.cert_offset + 376, 4, "Region")
+
+    @cached_property
+    def allowed_media(self):
+        return int.from_bytes(self.read(self.cert_offset + 380, 4, "Allowed Media"), byteorder='big')
+
+    @cached_property
+    def timestamp(self):
+        data = self.optional_header(CHECKSUM_TIMESTAMP_ID)
+        if data is None or len(data) < 8:
+            return None
+        timestamp = int.from_bytes(data[4:8], byteorder='big')
+        return datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
+
+    @cached_property
+    def execution_info(self):
+        data = self.optional_header(EXECUTION_INFO_ID)
+        if data is None or len(data) < EXECUTION_INFO.size:
+            return None
+        media_id, version, base_version, title_id, platform, executable_type, disc_number, disc_count = EXECUTION_INFO.unpack_from(data)
+        return {
+            "media_id": media_id,
+            "version": decode_version(version),
+            "base_version": decode_version(base_version),
+            "title_id": title_id.hex().upper(),
+            "title_id_name": decode_title_id(title_id[::-1]),
+            "platform": platform,
+            "executable_type": executable_type,
+            "disc_number": disc_number,
+            "disc_count": disc_count,
+        }
+
+    @cached_property
+    def game_ratings(self):
+        # Boards without a rating are 0xFF
+        data = self.optional_header(GAME_RATINGS_ID)
+        if data is None:
+            return None
+        return {board: rating for board, rating in zip(RATING_BOARDS, data) if rating != 0xFF}
+
+
+def new_record():
+    return {
+        "timestamp": None,
+        "title_id": None,
+        "title_id_name": None,
+        "version": None,
+        "base_version": None,
+        "disc_number": None,
+        "disc_count": None,
+        "media_id": None,
+        "region": None,
+        "region_name": None,
+        "allowed_media": None,
+        "game_ratings": None,
+        "error": None,
+    }
+
+
+def read_record(f, file_size):
+    record = new_record()
+    if file_size < 0x19c:
+        record["error"] = "File is too small to be a valid XEX file"
+        return record
+
+    header = XexHeader(f, file_size)
+    if header.magic != b"XEX2":
+        record["error"] = "Not a valid XEX file"
+        return record
+
+    record["timestamp"] = header.timestamp
+    execution_info = header.execution_info
+    if execution_info is not None:
+        for key in ("title_id", "title_id_name", "version", "base_version", "disc_number", "disc_count"):
+            record[key] = execution_info[key]
+    record["media_id"] = f"{header.media_id[:12].hex().upper()}-{header.media_id[12:].hex().upper()}"
+    record["region"] = header.region.hex().upper()
+    record["region_name"] = decode_region(int.from_bytes(header.region, byteorder='big'))
+    record["allowed_media"] = header.allowed_media
+    record["game_ratings"] = header.game_ratings
+    return record
+
+
+def print_record(record):
+    if record["error"] is not None:
+        print(f"Error: {record['error']}")
+        return
+
+    if record["timestamp"] is not None:
+        print(f"XEX Timestamp: {record['timestamp']}")
+    if record["title_id"] is not None:
+        print(f"Title ID: {record['title_id']} ({record['title_id_name']})")
+        print(f"Version: {record['version']}")
+        print(f"Disc Number: {record['disc_number']} of {record['disc_count']}")
+    print(f"Media ID: {record['media_id']}")
+    print(f"Region: {record['region']} ({record['region_name']})")
+    print(f"Allowed Media: 0x{record['allowed_media']:08X}")
+    if record["game_ratings"] is not None:
+        ratings = ", ".join(f"{board} {rating}" for board, rating in record["game_ratings"].items())
+        print(f"Game Ratings: {ratings if ratings else 'None'}")
+
+
+def parse_xex(f, file_size, file_path):
+    record = read_record(f, file_size)
+    print_record(record)
+    if record["error"] is not None:
+        return False
+
+
+def parse_path(file_path):
+    try:
+        with open(file_path, 'rb') as f:
+            return read_record(f, os.fstat(f.fileno()).st_size)
+    except Exception as e:
+        record = new_record()
+        record["error"] = f"{e}"
+        return record
+
+
+def parse_file(file_path):
     try:
         file_size = os.path.getsize(file_path)
-        if file_size < 0x19c:
-            print(f"Error: File is too small to be a valid XEX file")
-            sys.exit(1)
     except Exception as e:
         print(f"Error opening file: {e}")
-        sys.exit(1)
+        return False
     
     try:
         with open(file_path, 'rb') as f:
-            # Check XEX file header
-            magic = f.read(4)
-            if len(magic) != 4:
-                raise ValueError("Unexpected read error at 0x0")
-            if magic != b"XEX2":
-                print(f"Error: Not a valid XEX file")
-                sys.exit(1)
-            
-            # Read certificate address
-            f.seek(0x10)
-            cert_offset = f.read(4)
-            if len(cert_offset) != 4:
-                raise ValueError("Unexpected read error at 0x10")
-            cert_offset = int.from_bytes(cert_offset, byteorder='big')
-            
-            # Read optional header count
-            optional_header_count = f.read(4)
-            if len(optional_header_count) != 4:
-                raise ValueError("Unexpected read error at 0x14")
-            optional_header_count = int.from_bytes(optional_header_count, byteorder='big')
-            
-            # Read optional headers
-            optional_header_id = [0] * optional_header_count
-            optional_header_data = [0] * optional_header_count
-            for i in range(optional_header_count):
-                header_id = f.read(4)
-                if len(header_id) != 4:
-                    raise ValueError(f"Unexpected read error for optional header ID {i}")
-                optional_header_id[i] = int.from_bytes(header_id, byteorder='big')
-                header_data = f.read(4)
-                if len(header_data) != 4:
-                    raise ValueError(f"Unexpected read error for optional header data {i}")
-                optional_header_data[i] = int.from_bytes(header_data, byteorder='big')
-            
-            # Parse Certificate
-            f.seek(cert_offset + 320)
-            media_id = f.read(16)
-            if len(media_id) != 16:
-                raise ValueError("Unexpected read error at Media ID")
-            print(f"Media ID: {media_id[:12].hex().upper()}-{media_id[12:].hex().upper()}")
-
-            REGIONS = {
-                "NTSC/U": 0x00_00_00_FF,
-                "Japan": 0x00_00_01_00,
-                "China": 0x00_00_02_00,
-                "Other Asia": 0x00_00_F8_00,
-                "NTSC/J (Unknown 0xF9)": 0x00_00_F9_00,
-                "NTSC/J (Excludes China)": 0x00_00_FD_00,
-                "Oceania": 0x00_01_00_00,
-                "Europe": 0x00_FE_00_00,
-                "PAL": 0x00_FF_00_00,
-                "Region Free": 0xFF_FF_FF_FF,
-            }
-            
-            f.seek(cert_offset + 376)
-            region = f.read(4)
-            if len(region) != 4:
-                raise ValueError("Unexpected read error at Region")
-            parsed_region = "Unknown Region"
-            val = int.from_bytes(region, byteorder='big')
-            if val == 0xFFFFFFFF:
-               parsed_region = "Region Free"
-            else:
-                matches = []
-                if (val & 0x000000FF) == 0x000000FF:
-                    matches.append("NTSC/U")
-
-                if (val & 0x00FF0000) == 0x00FF0000:
-                    matches.append("PAL")
-                else:
-                    if (val & 0x00FE0000) == 0x00FE0000: matches.append("Europe")
-                    if (val & 0x00010000) == 0x00010000: matches.append("Oceania")
-                
-                if (val & 0x0000FF00) == 0x0000FF00:
-                    matches.append("NTSC/J")
-                elif (val & 0x0000FD00) == 0x0000FD00:
-                    matches.append("NTSC/J, Excluding China")
-                elif (val & 0x0000F900) == 0x0000F900:
-                    matches.append("NTSC/J, Unknown 0xF9")
-                else:
-                    if (val & 0x0000F800) == 0x0000F800: matches.append("Other Asia")
-                    if (val & 0x00000200) == 0x00000200: matches.append("China")
-                    if (val & 0x00000100) == 0x00000100: matches.append("Japan")
-                
-                parsed_region = ", ".join(matches)
-            print(f"Region: {region.hex().upper()} ({parsed_region})")
-
-
-
+            return parse_xex(f, file_size, file_path)
     except FileNotFoundError:
         print(f"Error: File '{file_path}' not found.")
     except Exception as e:
         print(f"Error: {e}")
 
+
+def main(): 
+    if len(sys.argv) < 2:
+        print("Usage: python ParseXEX.py <filename.xex> [--format text|jsonl|csv] [--store DIR]")
+        sys.exit(1)
+    
+    file_path = None
+    output_format = "text"
+    store_path = None
+    args = iter(sys.argv[1:])
+    for arg in args:
+        if arg == "--format":
+            output_format = next(args, "").lower()
+            if output_format not in RecordWriter.FORMATS:
+                print("Error: --format must be text, jsonl or csv")
+                sys.exit(1)
+        elif arg == "--store":
+            store_path = next(args, None)
+            if not store_path:
+                print("Error: --store requires a directory path")
+                sys.exit(1)
+        else:
+            file_path = arg
+
+    if not file_path:
+        print("Error: No valid filename provided")
+        sys.exit(1)
+
+    if store_path is not None and output_format != "text":
+        print("Error: --store cannot be combined with --format")
+        sys.exit(1)
+
+    if output_format != "text" or store_path is not None:
+        if store_path is not None:
+            import ColumnStore
+            writer = ColumnStore.ColumnWriter(store_path, "XEX")
+        else:
+            writer = RecordWriter.RecordWriter(output_format, FIELDS)
+        with writer:
+            record = parse_path(file_path)
+            writer.write(file_path, record)
+        if record["error"] is not None:
+            sys.exit(1)
+    elif parse_file(file_path) is False:
+        sys.exit(1)
+
+
 if __name__ == "__main__":
     main()
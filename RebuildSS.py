@@ -1,53 +1,26 @@
 import sys
 import os
-try:
-    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-except ImportError:
-    print("The 'cryptography' module is needed to decrypt the Challenge Response Table.")
-    print("Please install 'cryptography' using pip:")
-    print("python -m pip install cryptography")
-    raise
+import mmap
+import CCRT
+import AngleProfiles
+import Layouts
+import RecordWriter
 
 
+RAW_SECTOR_SIZE = 2064
+# 4096 raw sectors are exactly 129 * 65536 bytes, so every window starts on a sector and on an mmap page boundary
+WINDOW_SECTORS = 4096
+LAYERBREAKS = (bytes([0x20, 0x33, 0xAF]), bytes([0x20, 0x33, 0x9F]), bytes([0x23, 0x8E, 0x0F]))
+
 def clean_ss(ss, xgd):
     print(f"[INFO] Setting fixed angles")
     if xgd == 1:
         return True
     elif xgd == 2:
-        ss[552] = 0x01
-        ss[553] = 0x00
-        ss[555] = 0x01 if ssv2 else 0x00
-        ss[556] = 0x00
-        ss[561] = 0x5B
-        ss[562] = 0x00
-        ss[564] = 0x5B if ssv2 else 0x00
-        ss[565] = 0x00
-        ss[570] = 0xB5
-        ss[571] = 0x00
-        ss[573] = 0xB5 if ssv2 else 0x00
-        ss[574] = 0x00
-        ss[579] = 0x0F
-        ss[580] = 0x01
-        ss[582] = 0x0F if ssv2 else 0x00
-        ss[583] = 0x01 if ssv2 else 0x00
+        AngleProfiles.apply(ss, AngleProfiles.XGD2_CLEAN_KREON)
         return True
     elif xgd == 3:
-        ss[72] = 0x01
-        ss[73] = 0x00
-        ss[75] = 0x01
-        ss[76] = 0x00
-        ss[81] = 0x5B
-        ss[82] = 0x00
-        ss[84] = 0x5B
-        ss[85] = 0x00
-        ss[90] = 0xB5
-        ss[91] = 0x00
-        ss[93] = 0xB5
-        ss[94] = 0x00
-        ss[99] = 0x0F
-        ss[100] = 0x01
-        ss[102] = 0x0F
-        ss[103] = 0x01
+        AngleProfiles.apply(ss, AngleProfiles.XGD3_CLEAN)
         return True
     return False
 
@@ -61,25 +34,7 @@ def repair_ccrt2(data, xgd, cpr_mai):
     else:
         offset = 0x200
     
-    if data[555] == 0x00 and data[556] == 0x00 and data[564] == 0x00 and data[565] == 0x00 and data[573] == 0x00 and data[574] == 0x00 and data[582] == 0x00 and data[583] == 0x00:
-        is_kreon_ss = True
-    else:
-        is_kreon_ss = False
-    
-    key = bytes([0xD1, 0xE3, 0xB3, 0x3A, 0x6C, 0x1E, 0xF7, 0x70, 0x5F, 0x6D, 0xE9, 0x3B, 0xB6, 0xC0, 0xDC, 0x71])
-    iv = bytearray(16)
-    dcrt = bytearray(252)
-    cipher = Cipher(algorithms.AES(key), modes.ECB()).decryptor()
-    for i in range(16):
-        ct = bytes(data[0x304+i*16:0x304+(i+1)*16])
-        if i == 15:
-            dcrt[i*16:252] = ct[:12]
-        else:
-            pt = bytearray(cipher.update(ct))
-            for j in range(16):
-                pt[j] ^= iv[j]
-            iv[:] = ct
-            dcrt[i*16:(i+1)*16] = pt
+    dcrt = CCRT.decrypt_ccrt2(data)
     
     enc_response_count = 0
     for i in range(0x304, 0x400, 12):
@@ -229,32 +184,27 @@ def rebuild_ss(data, xgd):
     if xgd < 2:
         return data
 
-    if data[0x300] != 2:
-        print(f"[ERROR] Cannot safely repair with unexpected CCRT Version: 0x{data[0x300]:02X}")
+    # RebuildSS numbers XGD3 with an SS table as 3, ParseSS as 4
+    fields = Layouts.View(data, Layouts.SS_LAYOUTS[4 if xgd == 3 else xgd])
+    if fields.ccrt_version != 2:
+        print(f"[ERROR] Cannot safely repair with unexpected CCRT Version: 0x{fields.ccrt_version:02X}")
         return None
-    if data[0x301] != 21:
-        print(f"[ERROR] Cannot safely repair with unexpected CCRT Count: 0x{data[0x301]:02X}")
+    if fields.ccrt_count != 21:
+        print(f"[ERROR] Cannot safely repair with unexpected CCRT Count: 0x{fields.ccrt_count:02X}")
         return None
-    if data[0x65F] != 0x02:
-        print(f"[ERROR] Cannot safely repair with unexpected value at 0x66B: {data[0x65F]:02X}")
+    if fields.ss_version != 0x02:
+        print(f"[ERROR] Cannot safely repair with unexpected value at 0x66B: {fields.ss_version:02X}")
         return None
-    if data[0x49E] != 0x04:
-        print(f"[ERROR] Cannot safely repair with unexpected value at 0x4AA: 0x{data[0x49E]:02X}")
+    if fields.media_id_flag != 0x04:
+        print(f"[ERROR] Cannot safely repair with unexpected value at 0x4AA: 0x{fields.media_id_flag:02X}")
         return None
-    if data[0x661:0x730] != data[0x730:0x7FF]:
+    if fields.ranges != fields.ranges_copy:
         print("[ERROR] Cannot safely repair when duplicated SS range does not match")
         return None
     return repair_ccrt2(data, xgd, cpr_mai)
 
 
-def rebuild_file(file_path):
-    with open(file_path, 'rb') as f:
-        data = f.read(2064)
-    
-    if len(data) < 2064:
-        print("[ERROR] Not a valid raw SS: <2064 bytes")
-        return
-    
+def check_raw_ss(data):
     xgd = 0
     layer0_end = data[0x19:0x1C]
     if layer0_end == bytes([0x20, 0x33, 0xAF]):
@@ -265,47 +215,130 @@ def rebuild_file(file_path):
         xgd = 3
     else:
         print(f"[ERROR] Not a valid SS: Bad layerbreak")
+        return None
+    
+    if xgd > 1 and not Layouts.is_zeroed(data, Layouts.RAW_ZEROED[xgd]):
+        print(f"[ERROR] Cannot safely rebuild unexpected XGD{xgd}")
+        return None
+    
+    return xgd
+
+
+def rebuild_file(file_path):
+    with open(file_path, 'rb') as f:
+        data = f.read(2064)
+    
+    if len(data) < 2064:
+        print("[ERROR] Not a valid raw SS: <2064 bytes")
         return
     
-    if xgd == 2:
-        empty_ranges = [(0x01D, 0x10C), (0x128, 0x20C), (0x2DB, 0x2DC), (0x2E0, 0x30C), (0x30E, 0x310), (0x40C, 0x46C), (0x47C, 0x4AA), (0x4B3, 0x4C6), (0x5F7, 0x606)]
-        all_zero = all(data[start:end] == b'\x00' * (end - start) for start, end in empty_ranges)
-        if not all_zero:
-            print("[ERROR] Cannot safely rebuild unexpected XGD2")
-            return
-    elif xgd == 3:
-        empty_ranges = [(0x01D, 0x027), (0x028, 0x02C), (0x101, 0x10B), (0x30E, 0x310), (0x40C, 0x46C), (0x47C, 0x4AA), (0x4B3, 0x4C6), (0x5F7, 0x606)]
-        all_zero = all(data[start:end] == b'\x00' * (end - start) for start, end in empty_ranges)
-        if not all_zero:
-            print("[ERROR] Cannot safely rebuild unexpected XGD3")
-            return
+    xgd = check_raw_ss(data)
+    if xgd is None:
+        return
     
     good_ss = rebuild_ss(data, xgd)
     if good_ss is not None:
         with open(file_path, 'wb') as f:
             f.write(good_ss)
-            return
+            return True
+
+
+def find_sectors(file_path):
+    # Yields (sector number, raw sector) for every sector with an SS layerbreak, mapping the capture one window at a time
+    window_size = WINDOW_SECTORS * RAW_SECTOR_SIZE
+    with open(file_path, 'rb') as f:
+        file_size = os.fstat(f.fileno()).st_size
+        for window_start in range(0, file_size - RAW_SECTOR_SIZE + 1, window_size):
+            length = min(window_size, file_size - window_start)
+            with mmap.mmap(f.fileno(), length, offset=window_start, access=mmap.ACCESS_READ) as window:
+                for offset in range(0, length - RAW_SECTOR_SIZE + 1, RAW_SECTOR_SIZE):
+                    if window[offset + 0x19:offset + 0x1C] in LAYERBREAKS:
+                        yield (window_start + offset) // RAW_SECTOR_SIZE, window[offset:offset + RAW_SECTOR_SIZE]
+
+
+def extract_file(file_path, output_dir=None):
+    # Rebuilds every SS sector found in a capture of many raw sectors, writing each different SS once
+    base = os.path.splitext(os.path.basename(file_path))[0]
+    if output_dir is None:
+        output_dir = os.path.dirname(os.path.abspath(file_path))
+    written = {}
+    candidates = 0
+    for sector, data in find_sectors(file_path):
+        candidates += 1
+        print(f"[INFO] SS candidate at sector {sector} (offset 0x{sector * RAW_SECTOR_SIZE:X})")
+        try:
+            xgd = check_raw_ss(data)
+            good_ss = rebuild_ss(data, xgd) if xgd is not None else None
+        except Exception as e:
+            print(f"[ERROR] {e}")
+            continue
+        if good_ss is None:
+            continue
+        good_ss = bytes(good_ss)
+        if good_ss in written:
+            print(f"[INFO] Same SS as sector {written[good_ss]}")
+            continue
+        written[good_ss] = sector
+        output_path = os.path.join(output_dir, f"{base}_SS_{sector}.bin")
+        with open(output_path, 'wb') as f:
+            f.write(good_ss)
+        print(f"[INFO] Wrote {output_path}")
+    if candidates == 0:
+        print(f"[ERROR] No SS sector found in {file_path}")
+    return len(written) > 0
+
+
+def find_files(input_path, recursive, ss_only):
+    if recursive:
+        for root, _, files in os.walk(input_path):
+            for file in files:
+                if not ss_only or (file.startswith("SS") and file.endswith(".bin")):
+                    yield os.path.join(root, file)
+    else:
+        for entry in os.listdir(input_path):
+            file_path = os.path.join(input_path, entry)
+            if os.path.isfile(file_path) and (not ss_only or (os.path.basename(file_path).startswith("SS") and file_path.endswith(".bin"))):
+                yield file_path
 
 
 if __name__ == "__main__":
     try:
-        if len(sys.argv) < 2 or len(sys.argv) > 4:
-            print("Usage: python RebuildSS.py <filename|directory> [-r|--recursive] [-s|--ss-only]")
+        if len(sys.argv) < 2 or len(sys.argv) > 9:
+            print("Usage: python RebuildSS.py <filename|directory> [-r|--recursive] [-s|--ss-only] [--format text|jsonl|csv] [-x|--extract] [-o|--output DIR]")
             print()
             print("Options:")
             print("input: SS file path to rebuild, or directory of SS files to rebuild")
             print("-r, --recursive\t Rebuilds all files in dir recursively")
             print("-s, --ss-only\t Only rebuilds .bin files in dir that start with SS")
+            print("--format\t Writes a change report per file as JSON Lines or CSV")
+            print("-x, --extract\t Finds the SS sectors in captures of many raw sectors and writes each rebuilt SS to a new file")
+            print("-o, --output\t Directory for the files written by --extract (default: next to the capture)")
             sys.exit(0)
         
         input_path = None
         recursive = False
         ss_only = False
-        for arg in sys.argv[1:]:
+        output_format = "text"
+        extract = False
+        output_dir = None
+        args = iter(sys.argv[1:])
+        for arg in args:
             if arg in ("-r", "--recursive"):
                 recursive = True
             elif arg in ("-s", "--ss-only"):
                 ss_only = True
+            elif arg == "--format":
+                output_format = next(args, "").lower()
+                if output_format not in RecordWriter.FORMATS:
+                    print("[ERROR] --format must be text, jsonl or csv")
+                    sys.exit(0)
+            elif arg in ("-x", "--extract"):
+                extract = True
+            elif arg in ("-o", "--output"):
+                output_dir = next(args, None)
+                if not output_dir or not os.path.isdir(output_dir):
+                    print("[ERROR] --output requires an existing directory")
+                    sys.exit(0)
             else:
                 input_path = arg
         
@@ -313,20 +346,33 @@ if __name__ == "__main__":
             print("[ERROR] No valid filename provided")
             sys.exit(0)
         
-        if os.path.isdir(input_path):
-            if recursive:
-                for root, _, files in os.walk(input_path):
-                    for file in files:
-                        if not ss_only or (file.startswith("SS") and file.endswith(".bin")):
-                            file_path = os.path.join(root, file)
-                            print(file_path)
-                            rebuild_file(file_path)
+        if extract:
+            if output_format != "text":
+                print("[ERROR] --extract cannot be combined with --format")
+                sys.exit(0)
+            if os.path.isdir(input_path):
+                for file_path in find_files(input_path, recursive, ss_only):
+                    print(file_path)
+                    extract_file(file_path, output_dir)
+            elif os.path.isfile(input_path):
+                extract_file(input_path, output_dir)
+            else:
+                print(f"[ERROR] Invalid path: {input_path}")
+        elif output_format != "text":
+            if os.path.isdir(input_path):
+                file_paths = find_files(input_path, recursive, ss_only)
+            elif os.path.isfile(input_path):
+                file_paths = [input_path]
             else:
-                for entry in os.listdir(input_path):
-                    file_path = os.path.join(input_path, entry)
-                    if os.path.isfile(file_path) and (not ss_only or (os.path.basename(file_path).startswith("SS") and file_path.endswith(".bin"))):
-                        print(file_path)
-                        rebuild_file(file_path)
+                print(f"[ERROR] Invalid path: {input_path}")
+                sys.exit(0)
+            with RecordWriter.RecordWriter(output_format, RecordWriter.REPORT_FIELDS) as writer:
+                for file_path in file_paths:
+                    writer.write(file_path, RecordWriter.change_report(file_path, rebuild_file))
+        elif os.path.isdir(input_path):
+            for file_path in find_files(input_path, recursive, ss_only):
+                print(file_path)
+                rebuild_file(file_path)
         elif os.path.isfile(input_path):
             rebuild_file(input_path)
         else:
@@ -0,0 +1,109 @@
+import sys
+import io
+import csv
+import json
+import zlib
+from contextlib import redirect_stdout
+
+
+FORMATS = ("text", "jsonl", "csv")
+# Records are collected in memory and written out in blocks of about this many characters
+BUFFER_SIZE = 1 << 16
+# Schema of the change reports written by CleanSS, RepairSS and RebuildSS
+REPORT_FIELDS = ("path", "status", "size_before", "size_after", "crc_before", "crc_after", "changed_bytes", "messages")
+
+
+def json_value(value):
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex().upper()
+    raise TypeError(f"Cannot write {type(value).__name__} to a record")
+
+
+def csv_value(value):
+    # CSV cells are flat, nested values are kept as JSON text
+    if value is None:
+        return ""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=json_value, ensure_ascii=False)
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex().upper()
+    return value
+
+
+class RecordWriter:
+    # Writes one line per record with a fixed set of fields, missing fields are written as null
+    def __init__(self, output_format, fields, stream=None):
+        if output_format not in FORMATS[1:]:
+            raise ValueError(f"Unknown output format: {output_format}")
+        self.output_format = output_format
+        self.fields = fields
+        self.stream = sys.stdout if stream is None else stream
+        self.buffer = io.StringIO()
+        self.csv = None
+        if output_format == "csv":
+            self.csv = csv.writer(self.buffer, lineterminator="\n")
+            self.csv.writerow(fields)
+
+    def write(self, file_path, record):
+        row = dict(record, path=file_path)
+        if self.csv is not None:
+            self.csv.writerow([csv_value(row.get(field)) for field in self.fields])
+        else:
+            self.buffer.write(json.dumps({field: row.get(field) for field in self.fields}, default=json_value, ensure_ascii=False))
+            self.buffer.write("\n")
+        if self.buffer.tell() >= BUFFER_SIZE:
+            self.flush()
+
+    def flush(self):
+        self.stream.write(self.buffer.getvalue())
+        self.stream.flush()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_bytes(file_path):
+    try:
+        with open(file_path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def change_report(file_path, process, *args):
+    # Runs a tool that rewrites file_path in place and reports what changed instead of its printed lines
+    before = read_bytes(file_path)
+    output = io.StringIO()
+    try:
+        with redirect_stdout(output):
+            ok = process(file_path, *args)
+    except Exception as e:
+        ok = False
+        output.write(f"[ERROR] {e}\n")
+    after = read_bytes(file_path)
+
+    report = {
+        "size_before": None if before is None else len(before),
+        "size_after": None if after is None else len(after),
+        "crc_before": None if before is None else zlib.crc32(before),
+        "crc_after": None if after is None else zlib.crc32(after),
+        "changed_bytes": None,
+        "messages": output.getvalue().splitlines(),
+    }
+    if before is not None and after is not None and len(before) == len(after):
+        report["changed_bytes"] = sum(a != b for a, b in zip(before, after))
+    if before != after:
+        report["status"] = "changed"
+    elif ok:
+        report["status"] = "unchanged"
+    else:
+        report["status"] = "failed"
+    return report
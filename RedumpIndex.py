@@ -0,0 +1,184 @@
+import sys
+import os
+import mmap
+import struct
+import xml.etree.ElementTree as ET
+
+
+MAGIC = b"XRDI"
+VERSION = 1
+HEADER = struct.Struct("<4sII")
+# crc, kind, status, name length, name offset
+SLOT = struct.Struct("<IBBHI")
+
+KINDS = {"ss": 1, "dmi": 2}
+KIND_EXTENSIONS = {".ss": "ss", ".dmi": "dmi"}
+GOOD = 1
+BAD = 2
+
+
+def slot_of(kind, crc, mask):
+    return (crc + kind * 0x9E3779B9) & mask
+
+
+def read_dat(dat_path, default_kind):
+    # Streams <rom> entries so a large DAT is never held in memory as a tree
+    game_name = None
+    for event, elem in ET.iterparse(dat_path, events=("start", "end")):
+        if elem.tag in ("game", "machine"):
+            if event == "start":
+                game_name = elem.get("name")
+            else:
+                elem.clear()
+        elif elem.tag == "rom" and event == "end":
+            crc = elem.get("crc")
+            if crc:
+                rom_name = elem.get("name") or ""
+                kind = KIND_EXTENSIONS.get(os.path.splitext(rom_name)[1].lower(), default_kind)
+                yield kind, int(crc, 16), game_name or rom_name
+
+
+def build_index(index_path, dat_paths, bad_dat_paths=(), default_kind="ss"):
+    entries = []
+    names = {}
+    for status, paths in ((GOOD, dat_paths), (BAD, bad_dat_paths)):
+        for dat_path in paths:
+            for kind, crc, name in read_dat(dat_path, default_kind):
+                entries.append((KINDS[kind], crc, status, names.setdefault(name, len(names))))
+
+    slot_count = 1
+    while slot_count < len(entries) * 2:
+        slot_count *= 2
+    mask = slot_count - 1
+    slots = [None] * slot_count
+    for entry in entries:
+        i = slot_of(entry[0], entry[1], mask)
+        while slots[i] is not None:
+            i = (i + 1) & mask
+        slots[i] = entry
+
+    name_table = bytearray()
+    name_offsets = []
+    for name in names:
+        encoded = name.encode("utf-8")[:0xFFFF]
+        name_offsets.append((len(name_table), len(encoded)))
+        name_table += encoded
+
+    with open(index_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, slot_count))
+        for entry in slots:
+            if entry is None:
+                f.write(SLOT.pack(0, 0, 0, 0, 0))
+            else:
+                offset, length = name_offsets[entry[3]]
+                f.write(SLOT.pack(entry[1], entry[0], entry[2], length, offset))
+        f.write(name_table)
+    return len(entries)
+
+
+class RedumpIndex:
+    def __init__(self, index_path):
+        with open(index_path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.slot_count = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a Redump index: {index_path}")
+        self.mask = self.slot_count - 1
+        self.names_offset = HEADER.size + self.slot_count * SLOT.size
+
+    def lookup(self, kind, crc):
+        # Returns (status, name) for every entry with this hash, usually zero or one
+        kind = KINDS[kind]
+        found = []
+        i = slot_of(kind, crc, self.mask)
+        while True:
+            slot_crc, slot_kind, status, length, offset = SLOT.unpack_from(self.map, HEADER.size + i * SLOT.size)
+            if status == 0:
+                return found
+            if slot_crc == crc and slot_kind == kind:
+                start = self.names_offset + offset
+                found.append((status, self.map[start:start + length].decode("utf-8")))
+            i = (i + 1) & self.mask
+
+    def close(self):
+        self.map.close()
+
+
+def annotate(record, index, kind):
+    if record["error"] is not None:
+        return record
+    if kind == "ss":
+        crc = record["redump_crc"] if record["redump_crc"] is not None else record["ss_crc"]
+        entries = index.lookup(kind, crc)
+        if record["ss_crc"] != crc:
+            entries += [entry for entry in index.lookup(kind, record["ss_crc"]) if entry[0] == BAD]
+        abgx_bad = any(message["code"] == "ABGX_BAD_ANGLES" for message in record["messages"])
+    else:
+        entries = index.lookup(kind, record["dmi_crc"])
+        abgx_bad = False
+
+    if abgx_bad or any(status == BAD for status, _ in entries):
+        record["redump_status"] = "known_bad"
+        record["redump_names"] = [name for status, name in entries if status == BAD]
+    elif entries:
+        record["redump_status"] = "match"
+        record["redump_names"] = [name for _, name in entries]
+    else:
+        record["redump_status"] = "no_match"
+        record["redump_names"] = []
+    return record
+
+
+def print_annotation(record):
+    status = record.get("redump_status")
+    names = ", ".join(record.get("redump_names", []))
+    if status == "match":
+        print(f"Redump: Match ({names})")
+    elif status == "no_match":
+        print("Redump: No match")
+    elif status == "known_bad":
+        print(f"[WARNING] Redump: Known bad dump{f' ({names})' if names else ''}")
+
+
+if __name__ == "__main__":
+    try:
+        if len(sys.argv) < 3:
+            print("Usage: python RedumpIndex.py <index> <dat> [<dat> ...] [-b|--bad DAT] [-k|--kind ss|dmi]")
+            print()
+            print("Options:")
+            print("index: index file to create, used with --redump in ParseSS and ParseDMI")
+            print("dat: Redump DAT (XML) files to import")
+            print("-b, --bad DAT\t Imports a DAT of known bad dumps")
+            print("-k, --kind\t Type of ROMs without a .ss or .dmi name (default: ss)")
+            sys.exit(0)
+
+        index_path = None
+        dat_paths = []
+        bad_dat_paths = []
+        default_kind = "ss"
+        args = iter(sys.argv[1:])
+        for arg in args:
+            if arg in ("-b", "--bad"):
+                bad_dat_path = next(args, None)
+                if not bad_dat_path:
+                    print("[ERROR] --bad requires a DAT file path")
+                    sys.exit(0)
+                bad_dat_paths.append(bad_dat_path)
+            elif arg in ("-k", "--kind"):
+                default_kind = next(args, "").lower()
+                if default_kind not in KINDS:
+                    print("[ERROR] --kind must be ss or dmi")
+                    sys.exit(0)
+            elif index_path is None:
+                index_path = arg
+            else:
+                dat_paths.append(arg)
+
+        if not dat_paths and not bad_dat_paths:
+            print("[ERROR] No DAT files provided")
+            sys.exit(0)
+
+        count = build_index(index_path, dat_paths, bad_dat_paths, default_kind)
+        print(f"Indexed {count} hashes into {index_path}")
+    except Exception as e:
+        print(f"[ERROR] {e}")
@@ -1,12 +1,8 @@
 import sys
 import os
-try:
-    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-except ImportError:
-    print("The 'cryptography' module is needed to decrypt the Challenge Response Table.")
-    print("Please install 'cryptography' using pip:")
-    print("python -m pip install cryptography")
-    raise
+import CCRT
+import Layouts
+import RecordWriter
 
 
 def repair_ccrt2(data, xgd, cpr_mai):
@@ -19,25 +15,7 @@ def repair_ccrt2(data, xgd, cpr_mai):
     else:
         offset = 0x200
     
-    if data[555] == 0x00 and data[556] == 0x00 and data[564] == 0x00 and data[565] == 0x00 and data[573] == 0x00 and data[574] == 0x00 and data[582] == 0x00 and data[583] == 0x00:
-        is_kreon_ss = True
-    else:
-        is_kreon_ss = False
-    
-    key = bytes([0xD1, 0xE3, 0xB3, 0x3A, 0x6C, 0x1E, 0xF7, 0x70, 0x5F, 0x6D, 0xE9, 0x3B, 0xB6, 0xC0, 0xDC, 0x71])
-    iv = bytearray(16)
-    dcrt = bytearray(252)
-    cipher = Cipher(algorithms.AES(key), modes.ECB()).decryptor()
-    for i in range(16):
-        ct = bytes(data[0x304+i*16:0x304+(i+1)*16])
-        if i == 15:
-            dcrt[i*16:252] = ct[:12]
-        else:
-            pt = bytearray(cipher.update(ct))
-            for j in range(16):
-                pt[j] ^= iv[j]
-            iv[:] = ct
-            dcrt[i*16:(i+1)*16] = pt
+    dcrt = CCRT.decrypt_ccrt2(data)
     
     enc_response_count = 0
     for i in range(0x304, 0x400, 12):
@@ -160,92 +138,111 @@ def repair_ccrt2(data, xgd, cpr_mai):
 
 
 def repair_ss(data, xgd):
-    if data[0x300] != 2:
-        print(f"[ERROR] Cannot safely repair with unexpected CCRT Version: 0x{data[0x300]:02X}")
+    # RepairSS numbers XGD3 with an SS table as 3, ParseSS as 4
+    fields = Layouts.View(data, Layouts.SS_LAYOUTS[4 if xgd == 3 else xgd])
+    if fields.ccrt_version != 2:
+        print(f"[ERROR] Cannot safely repair with unexpected CCRT Version: 0x{fields.ccrt_version:02X}")
         return None
-    if data[0x301] != 21:
-        print(f"[ERROR] Cannot safely repair with unexpected CCRT Count: 0x{data[0x301]:02X}")
+    if fields.ccrt_count != 21:
+        print(f"[ERROR] Cannot safely repair with unexpected CCRT Count: 0x{fields.ccrt_count:02X}")
         return None
-    if data[0x65F] != 0x02:
-        print(f"[ERROR] Cannot safely repair with unexpected value at 0x65F: {data[0x65F]:02X}")
+    if fields.ss_version != 0x02:
+        print(f"[ERROR] Cannot safely repair with unexpected value at 0x65F: {fields.ss_version:02X}")
         return None
-    if data[0x49E] != 0x04:
-        print(f"[ERROR] Cannot safely repair with unexpected value at 0x49E: 0x{data[0x49E]:02X}")
+    if fields.media_id_flag != 0x04:
+        print(f"[ERROR] Cannot safely repair with unexpected value at 0x49E: 0x{fields.media_id_flag:02X}")
         return None
-    if data[0x661:0x730] != data[0x730:0x7FF]:
+    if fields.ranges != fields.ranges_copy:
         print("[ERROR] Cannot safely repair when duplicated SS range does not match")
         return None
-    if xgd == 3:
-        cpr_mai = data[0x0F0:0x0F4]
-    else:
-        cpr_mai = data[0x2D0:0x2D4]
+    cpr_mai = fields.cpr_mai
     return repair_ccrt2(data, xgd, cpr_mai)
 
 
-def repair_file(file_path):
-    with open(file_path, 'rb') as f:
-        data = f.read(2048)
-    
-    if len(data) < 2048:
-        print("[ERROR] Not a valid SS: <2048 bytes")
-        return
-    
+def check_ss(data):
     xgd = 0
     layer0_end = data[13:16]
     if layer0_end == bytes([0x20, 0x33, 0xAF]):
         print("[ERROR] Cannot repair XGD1 SS")
-        return
+        return None
     elif layer0_end == bytes([0x20, 0x33, 0x9F]):
         xgd = 2
     elif layer0_end == bytes([0x23, 0x8E, 0x0F]):
         xgd = 3
     else:
         print(f"[ERROR] Not a valid SS: Bad layerbreak")
-        return
+        return None
     
     if xgd == 3 and data[32:104] == b'\x00' * 72:
         print("[ERROR] Cannot repair bad XGD3 SS")
+        return None
+    
+    if not Layouts.is_zeroed(data, Layouts.SS_ZEROED[xgd]):
+        print(f"[ERROR] Cannot safely repair unexpected XGD{xgd}")
+        return None
+    
+    return xgd
+
+
+def repair_file(file_path):
+    with open(file_path, 'rb') as f:
+        data = f.read(2048)
+    
+    if len(data) < 2048:
+        print("[ERROR] Not a valid SS: <2048 bytes")
         return
     
-    if xgd == 2:
-        empty_ranges = [(0x011, 0x100), (0x11C, 0x200), (0x2CF, 0x2D0), (0x2D4, 0x300), (0x302, 0x304), (0x400, 0x460), (0x470, 0x49E), (0x4A7, 0x4BA), (0x5EB, 0x5FA), (0x7FF, 0x800)]
-        all_zero = all(data[start:end] == b'\x00' * (end - start) for start, end in empty_ranges)
-        if not all_zero:
-            print("[ERROR] Cannot safely repair unexpected XGD2")
-            return
-    elif xgd == 3:
-        empty_ranges = [(0x011, 0x01B), (0x01C, 0x020), (0x0F5, 0x0FF), (0x302, 0x304), (0x400, 0x460), (0x470, 0x49E), (0x4A7, 0x4BA), (0x5EB, 0x5FA), (0x7FF, 0x800)]
-        all_zero = all(data[start:end] == b'\x00' * (end - start) for start, end in empty_ranges)
-        if not all_zero:
-            print("[ERROR] Cannot safely repair unexpected XGD3")
-            return
+    xgd = check_ss(data)
+    if xgd is None:
+        return
     
     good_ss = repair_ss(data, xgd)
     if good_ss is not None:
         with open(file_path, 'wb') as f:
             f.write(good_ss)
-            return
+            return True
+
+
+def find_files(input_path, recursive, ss_only):
+    if recursive:
+        for root, _, files in os.walk(input_path):
+            for file in files:
+                if not ss_only or (file.startswith("SS") and file.endswith(".bin")):
+                    yield os.path.join(root, file)
+    else:
+        for entry in os.listdir(input_path):
+            file_path = os.path.join(input_path, entry)
+            if os.path.isfile(file_path) and (not ss_only or (os.path.basename(file_path).startswith("SS") and file_path.endswith(".bin"))):
+                yield file_path
 
 
 if __name__ == "__main__":
     try:
-        if len(sys.argv) < 2 or len(sys.argv) > 4:
-            print("Usage: python RepairSS.py <filename|directory> [-r|--recursive] [-s|--ss-only]")
+        if len(sys.argv) < 2 or len(sys.argv) > 6:
+            print("Usage: python RepairSS.py <filename|directory> [-r|--recursive] [-s|--ss-only] [--format text|jsonl|csv]")
             print()
             print("Options:")
             print("input: SS file path to repair, or directory of SS files to repair")
             print("-r, --recursive\t Repairs all files in dir recursively")
             print("-s, --ss-only\t Only repairs .bin files in dir that start with SS")
+            print("--format\t Writes a change report per file as JSON Lines or CSV")
             sys.exit(0)
         
         input_path = None
         recursive = False
         ss_only = False
-        for arg in sys.argv[1:]:
+        output_format = "text"
+        args = iter(sys.argv[1:])
+        for arg in args:
             if arg in ("-r", "--recursive"):
                 recursive = True
             elif arg in ("-s", "--ss-only"):
                 ss_only = True
+            elif arg == "--format":
+                output_format = next(args, "").lower()
+                if output_format not in RecordWriter.FORMATS:
+                    print("[ERROR] --format must be text, jsonl or csv")
+                    sys.exit(0)
             else:
                 input_path = arg
         
@@ -253,20 +250,21 @@ if __name__ == "__main__":
             print("[ERROR] No valid filename provided")
             sys.exit(0)
         
-        if os.path.isdir(input_path):
-            if recursive:
-                for root, _, files in os.walk(input_path):
-                    for file in files:
-                        if not ss_only or (file.startswith("SS") and file.endswith(".bin")):
-                            file_path = os.path.join(root, file)
-                            print(file_path)
-                            repair_file(file_path)
+        if output_format != "text":
+            if os.path.isdir(input_path):
+                file_paths = find_files(input_path, recursive, ss_only)
+            elif os.path.isfile(input_path):
+                file_paths = [input_path]
             else:
-                for entry in os.listdir(input_path):
-                    file_path = os.path.join(input_path, entry)
-                    if os.path.isfile(file_path) and (not ss_only or (os.path.basename(file_path).startswith("SS") and file_path.endswith(".bin"))):
-                        print(file_path)
-                        repair_file(file_path)
+                print(f"[ERROR] Invalid path: {input_path}")
+                sys.exit(0)
+            with RecordWriter.RecordWriter(output_format, RecordWriter.REPORT_FIELDS) as writer:
+                for file_path in file_paths:
+                    writer.write(file_path, RecordWriter.change_report(file_path, repair_file))
+        elif os.path.isdir(input_path):
+            for file_path in find_files(input_path, recursive, ss_only):
+                print(file_path)
+                repair_file(file_path)
         elif os.path.isfile(input_path):
             repair_file(input_path)
         else:
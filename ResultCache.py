@@ -0,0 +1,131 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+
+
+DEFAULT_MAX_ENTRIES = 1000000
+CHUNK_SIZE = 1024
+
+
+def source_version(source_paths):
+    # Any edit to the parser or a module it parses with invalidates its cached records
+    crc = 0
+    for source_path in source_paths:
+        with open(source_path, 'rb') as f:
+            crc = zlib.crc32(f.read(), crc)
+    return f"{crc:08X}"
+
+
+class ResultCache:
+    def __init__(self, cache_path, kind, parse_bytes, source_paths, max_entries=DEFAULT_MAX_ENTRIES):
+        self.kind = kind
+        self.parse_bytes = parse_bytes
+        self.max_entries = max_entries
+        self.inserts = 0
+        self.db = sqlite3.connect(cache_path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (kind TEXT PRIMARY KEY, version TEXT)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS entries ("
+                        "kind TEXT, path TEXT, size INTEGER, mtime_ns INTEGER, inode INTEGER, "
+                        "crc INTEGER, record TEXT, last_used REAL, PRIMARY KEY (kind, path))")
+        self.db.execute("CREATE INDEX IF NOT EXISTS entries_crc ON entries (kind, crc, size)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+
+        version = source_version(source_paths)
+        row = self.db.execute("SELECT version FROM meta WHERE kind = ?", (kind,)).fetchone()
+        if row is None or row[0] != version:
+            self.db.execute("DELETE FROM entries WHERE kind = ?", (kind,))
+            self.db.execute("INSERT OR REPLACE INTO meta (kind, version) VALUES (?, ?)", (kind, version))
+        self.db.commit()
+        self.now = time.time()
+
+    def stat_key(self, file_path):
+        st = os.stat(file_path)
+        return (st.st_size, st.st_mtime_ns, st.st_ino)
+
+    def lookup(self, file_path, key):
+        row = self.db.execute("SELECT size, mtime_ns, inode, record FROM entries WHERE kind = ? AND path = ?",
+                              (self.kind, file_path)).fetchone()
+        if row is None or tuple(row[:3]) != key:
+            return None
+        self.db.execute("UPDATE entries SET last_used = ? WHERE kind = ? AND path = ?", (self.now, self.kind, file_path))
+        return json.loads(row[3])
+
+    def lookup_content(self, key, crc):
+        # Fallback for touched, copied or moved files with the same content
+        row = self.db.execute("SELECT record FROM entries WHERE kind = ? AND crc = ? AND size = ? LIMIT 1",
+                              (self.kind, crc, key[0])).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def store(self, file_path, key, crc, record):
+        self.db.execute("INSERT OR REPLACE INTO entries (kind, path, size, mtime_ns, inode, crc, record, last_used) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (self.kind, file_path, key[0], key[1], key[2], crc, json.dumps(record), self.now))
+        self.inserts += 1
+        if self.inserts % CHUNK_SIZE == 0:
+            self.evict()
+
+    def evict(self):
+        count = self.db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        if count > self.max_entries:
+            self.db.execute("DELETE FROM entries WHERE rowid IN "
+                            "(SELECT rowid FROM entries ORDER BY last_used LIMIT ?)", (count - self.max_entries,))
+
+    def get(self, file_path):
+        return next(self.get_many([file_path]))
+
+    def get_many(self, file_paths, executor=None, error_record=None):
+        # Yields one record per path, in order. Misses are parsed by executor if given.
+        file_paths = list(file_paths)
+        for chunk_start in range(0, len(file_paths), CHUNK_SIZE):
+            chunk = file_paths[chunk_start:chunk_start + CHUNK_SIZE]
+            records = [None] * len(chunk)
+            misses = []
+            for i, file_path in enumerate(chunk):
+                file_path = os.path.abspath(file_path)
+                try:
+                    key = self.stat_key(file_path)
+                    record = self.lookup(file_path, key)
+                    if record is None:
+                        with open(file_path, 'rb') as f:
+                            data = f.read(2048)
+                        crc = zlib.crc32(data)
+                        record = self.lookup_content(key, crc)
+                        if record is None:
+                            misses.append((i, file_path, key, crc, data))
+                            continue
+                        self.store(file_path, key, crc, record)
+                    records[i] = record
+                except Exception as e:
+                    if error_record is None:
+                        raise
+                    records[i] = error_record(e)
+
+            if executor is not None:
+                pending = [executor.submit(self.parse_bytes, miss[4]) for miss in misses]
+            else:
+                pending = [None] * len(misses)
+            for (i, file_path, key, crc, data), future in zip(misses, pending):
+                try:
+                    record = future.result() if future is not None else self.parse_bytes(data)
+                except Exception as e:
+                    if error_record is None:
+                        raise
+                    records[i] = error_record(e)
+                    continue
+                self.store(file_path, key, crc, record)
+                records[i] = record
+
+            self.db.commit()
+            yield from records
+        self.evict()
+        self.db.commit()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
@@ -0,0 +1,159 @@
+import sys
+import os
+import time
+import ParseSS
+import ParseDMI
+import ParseXBE
+import ParseXEX
+
+
+SS_LAYERBREAKS = (bytes([0x20, 0x33, 0xAF]), bytes([0x20, 0x33, 0x9F]), bytes([0x23, 0x8E, 0x0F]))
+# Seconds between two listings of a watched folder
+POLL_INTERVAL = 0.25
+
+
+def sniff(head):
+    if head[:4] == b"XBEH":
+        return "XBE"
+    if head[:4] == b"XEX2":
+        return "XEX"
+    # SS and DMI are always a single 2048-byte sector
+    if len(head) != 2048:
+        return None
+    if head[13:16] in SS_LAYERBREAKS:
+        return "SS"
+    if head[0] in (0x01, 0x02) and head[0x7E8:0x7EC] == b"XBOX":
+        return "DMI"
+    if head[0] == 0x01 and head[0x001:0x008] == b'\x00' * 7 and head[0x634:0x800] == b'\x00' * 460:
+        # Early XGD1 DMI have no trailer
+        return "DMI"
+    return None
+
+
+def scan_file(file_path, verbose):
+    try:
+        with open(file_path, 'rb') as f:
+            # Read one byte past a sector so a 2048-byte file is known without a stat()
+            head = f.read(2049)
+            file_type = sniff(head)
+            if file_type is None:
+                return None
+            print(file_path)
+            if file_type == "SS":
+                ParseSS.print_record(ParseSS.parse_ss_bytes(head), verbose)
+            elif file_type == "DMI":
+                ParseDMI.print_record(ParseDMI.parse_dmi_bytes(head), verbose)
+            elif file_type == "XBE":
+                ParseXBE.parse_xbe(f, os.fstat(f.fileno()).st_size, file_path)
+            elif file_type == "XEX":
+                ParseXEX.parse_xex(f, os.fstat(f.fileno()).st_size, file_path)
+            return file_type
+    except Exception as e:
+        print(f"[ERROR] {e}")
+        return False
+
+
+def scan_directory(directory, recursive, verbose):
+    subdirs = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if recursive:
+                    subdirs.append(entry.path)
+            elif entry.is_file():
+                scan_file(entry.path, verbose)
+    for subdir in subdirs:
+        scan_directory(subdir, recursive, verbose)
+
+
+def list_files(directory, recursive):
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if recursive:
+                    yield from list_files(entry.path, recursive)
+            elif entry.is_file():
+                stat = entry.stat()
+                yield entry.path, (stat.st_size, stat.st_mtime_ns)
+
+
+def watch_directory(directory, recursive, verbose, settle):
+    # Files already in the folder are only parsed again once they change
+    seen = dict(list_files(directory, recursive))
+    pending = {}
+    print(f"Watching {directory} for new or changed dumps, press Ctrl+C to stop", flush=True)
+    try:
+        while True:
+            time.sleep(POLL_INTERVAL)
+            now = time.monotonic()
+            current = dict(list_files(directory, recursive))
+            for file_path, state in current.items():
+                if seen.get(file_path) == state:
+                    continue
+                # A dump is still being written until its size and time stop changing for settle seconds
+                if file_path not in pending or pending[file_path][0] != state:
+                    pending[file_path] = (state, now)
+                elif now - pending[file_path][1] >= settle:
+                    del pending[file_path]
+                    seen[file_path] = state
+                    scan_file(file_path, verbose)
+                    sys.stdout.flush()
+            # Forget deleted files, so a dump written again under the same name is parsed again
+            seen = {file_path: state for file_path, state in seen.items() if file_path in current}
+            pending = {file_path: value for file_path, value in pending.items() if file_path in current}
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    try:
+        if len(sys.argv) < 2 or len(sys.argv) > 7:
+            print("Usage: python ScanDumps.py <filename|directory> [-v|--verbose] [-r|--recursive] [-w|--watch] [--settle SECONDS]")
+            print()
+            print("Options:")
+            print("input: file path to parse, or directory of files to parse")
+            print("-v, --verbose\t Prints extra information about SS and DMI")
+            print("-r, --recursive\t Parses all files in dir recursively")
+            print("-w, --watch\t Keeps running and parses files as they are added to or changed in dir")
+            print("--settle\t Seconds a watched file must stay unchanged before it is parsed (default: 0.5)")
+            sys.exit(0)
+
+        input_path = None
+        verbose = False
+        recursive = False
+        watch = False
+        settle = 0.5
+        args = iter(sys.argv[1:])
+        for arg in args:
+            if arg in ("-v", "--verbose"):
+                verbose = True
+            elif arg in ("-r", "--recursive"):
+                recursive = True
+            elif arg in ("-w", "--watch"):
+                watch = True
+            elif arg == "--settle":
+                settle = float(next(args, "-1"))
+                if settle < 0:
+                    print("[ERROR] --settle requires a number of seconds")
+                    sys.exit(0)
+            else:
+                input_path = arg
+
+        if not input_path:
+            print("[ERROR] No valid filename provided")
+            sys.exit(0)
+
+        if watch:
+            if not os.path.isdir(input_path):
+                print(f"[ERROR] --watch requires a directory: {input_path}")
+                sys.exit(0)
+            watch_directory(input_path, recursive, verbose, settle)
+        elif os.path.isdir(input_path):
+            scan_directory(input_path, recursive, verbose)
+        elif os.path.isfile(input_path):
+            if scan_file(input_path, verbose) is None:
+                print(f"[ERROR] Unrecognised file: {input_path}")
+        else:
+            print(f"[ERROR] Invalid path: {input_path}")
+    except Exception as e:
+        print(f"[ERROR] {e}")
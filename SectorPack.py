@@ -0,0 +1,354 @@
+import sys
+import os
+import mmap
+import zlib
+import struct
+
+
+# A pack is a header block, the sectors back to back from DATA_OFFSET, then an index of one entry per sector
+# The header points at the index, which can be preceded by unused space left by an earlier update
+MAGIC = b"XSPK"
+INDEX_MAGIC = b"XSPI"
+VERSION = 1
+RECORD_SIZE = 2048
+DATA_OFFSET = 4096
+# magic, version, (reserved), record size, sector count, index offset
+HEADER = struct.Struct("<4sH2xIQQ")
+# magic, entry count, CRC32 of the entries
+INDEX_HEADER = struct.Struct("<4sII")
+# mtime in ns, file size, CRC32 of the sector, path length, followed by the UTF-8 path
+ENTRY = struct.Struct("<qQIH")
+PACK_STATUSES = ("added", "replaced", "unchanged", "skipped")
+
+
+def is_pack(file_path):
+    with open(file_path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def pack_index(entries):
+    body = bytearray()
+    for entry in entries:
+        path = entry["path"].encode('utf-8')
+        body += ENTRY.pack(entry["mtime_ns"], entry["size"], entry["crc"], len(path))
+        body += path
+    return INDEX_HEADER.pack(INDEX_MAGIC, len(entries), zlib.crc32(body)) + body
+
+
+def unpack_index(data):
+    # Returns the entries and the size of the index, bytes after it are not part of the index
+    try:
+        magic, count, crc = INDEX_HEADER.unpack_from(data)
+        fields = []
+        offset = INDEX_HEADER.size
+        for _ in range(count if magic == INDEX_MAGIC else 0):
+            fields.append(ENTRY.unpack_from(data, offset) + (offset + ENTRY.size,))
+            offset += ENTRY.size + fields[-1][3]
+    except struct.error:
+        magic = None
+    if magic != INDEX_MAGIC or offset > len(data) or zlib.crc32(data[INDEX_HEADER.size:offset]) != crc:
+        raise ValueError("Damaged pack: the index is missing or corrupt")
+    entries = [{"path": bytes(data[start:start + length]).decode('utf-8'), "size": size, "mtime_ns": mtime_ns, "crc": sector_crc}
+               for mtime_ns, size, sector_crc, length, start in fields]
+    return entries, offset
+
+
+def read_header(f):
+    f.seek(0)
+    magic, version, record_size, count, index_offset = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError("Not a sector pack")
+    if version != VERSION:
+        raise ValueError(f"Unsupported sector pack version: {version}")
+    return record_size, count, index_offset
+
+
+def read_index(f):
+    # Returns the record size, the entries, and the offset and size of the index
+    record_size, count, index_offset = read_header(f)
+    f.seek(index_offset)
+    entries, index_size = unpack_index(f.read())
+    if len(entries) != count:
+        raise ValueError("Damaged pack: the index does not match the header")
+    return record_size, entries, index_offset, index_size
+
+
+def write_synced(f, offset, data):
+    f.seek(offset)
+    f.write(data)
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def write_header(f, record_size, count, index_offset):
+    write_synced(f, 0, HEADER.pack(MAGIC, VERSION, record_size, count, index_offset))
+
+
+def write_index(f, record_size, entries, index_offset, index_size):
+    # The live index at index_offset is never overwritten: the new index is synced where it overlaps neither
+    # the sectors nor the live index before the header points at it, so an interrupted write leaves the
+    # pack with its old index. The new index goes right after the sectors if it fits in front of the live one
+    index = pack_index(entries)
+    data_end = DATA_OFFSET + len(entries) * record_size
+    offset = data_end if data_end + len(index) <= index_offset else max(data_end, index_offset + index_size)
+    write_synced(f, offset, index)
+    write_header(f, record_size, len(entries), offset)
+    f.truncate(offset + len(index))
+
+
+def create_pack(pack_path, record_size=RECORD_SIZE):
+    with open(pack_path, 'wb') as f:
+        f.write(bytes(DATA_OFFSET))
+        index = pack_index([])
+        write_synced(f, DATA_OFFSET, index)
+        write_header(f, record_size, 0, DATA_OFFSET)
+
+
+def add_files(pack_path, files):
+    # files are (name in the pack, file path) pairs, a name already in the pack is replaced in its slot
+    # if the file's size or mtime changed, so the sectors stay contiguous; returns the status of every file
+    if not os.path.exists(pack_path):
+        create_pack(pack_path)
+    statuses = []
+    with open(pack_path, 'r+b') as f:
+        record_size, entries, index_offset, index_size = read_index(f)
+        slots = {entry["path"]: i for i, entry in enumerate(entries)}
+        # Files are sorted out by stat first, so the space the new sectors take is known before any is written
+        pending = []
+        new_names = set()
+        for name, file_path in files:
+            stat = os.stat(file_path)
+            i = slots.get(name)
+            if stat.st_size != record_size:
+                statuses.append((name, "skipped"))
+            elif i is not None and entries[i]["size"] == stat.st_size and entries[i]["mtime_ns"] == stat.st_mtime_ns:
+                statuses.append((name, "unchanged"))
+            else:
+                pending.append((len(statuses), name, file_path, stat.st_mtime_ns))
+                statuses.append((name, None))
+                if i is None:
+                    new_names.add(name)
+        if not pending:
+            return statuses
+
+        data_end = DATA_OFFSET + (len(entries) + len(new_names)) * record_size
+        if index_offset < data_end:
+            # The new sectors would overwrite the live index, so the header is first pointed at a synced copy past them
+            f.seek(index_offset)
+            index = f.read(index_size)
+            index_offset = max(data_end, index_offset + index_size)
+            write_synced(f, index_offset, index)
+            write_header(f, record_size, len(entries), index_offset)
+
+        for position, name, file_path, mtime_ns in pending:
+            with open(file_path, 'rb') as source:
+                data = source.read(record_size + 1)
+            if len(data) != record_size:
+                statuses[position] = (name, "skipped")
+                continue
+            entry = {"path": name, "size": len(data), "mtime_ns": mtime_ns, "crc": zlib.crc32(data)}
+            i = slots.get(name)
+            if i is None:
+                i = slots[name] = len(entries)
+                entries.append(entry)
+                statuses[position] = (name, "added")
+            else:
+                # Replaced in place, until the new index is written the old CRC flags the sector in --verify
+                entries[i] = entry
+                statuses[position] = (name, "replaced")
+            f.seek(DATA_OFFSET + i * record_size)
+            f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+        write_index(f, record_size, entries, index_offset, index_size)
+    return statuses
+
+
+class SectorPack:
+    # Sectors are read straight from the memory-mapped pack, sector(i) and matrix() do not copy them
+    def __init__(self, pack_path, writable=False):
+        self.file = open(pack_path, 'r+b' if writable else 'rb')
+        try:
+            self.record_size, self.entries, self.index_offset, self.index_size = read_index(self.file)
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        except BaseException:
+            self.file.close()
+            raise
+        self.view = memoryview(self.map)
+        self.slots = None
+        self.dirty = False
+
+    def __len__(self):
+        return len(self.entries)
+
+    def sector(self, i):
+        offset = DATA_OFFSET + i * self.record_size
+        return self.view[offset:offset + self.record_size]
+
+    def find(self, name):
+        if self.slots is None:
+            self.slots = {entry["path"]: i for i, entry in enumerate(self.entries)}
+        return self.slots.get(name)
+
+    def matrix(self):
+        # An (N, record size) view of all sectors, np.asarray(pack.matrix()) wraps it without a copy
+        if not self.entries:
+            raise ValueError("The pack is empty")
+        return self.view[DATA_OFFSET:DATA_OFFSET + len(self.entries) * self.record_size].cast('B', (len(self.entries), self.record_size))
+
+    def __iter__(self):
+        # Tells the kernel to read ahead, so a scan runs at the disk's sequential speed
+        if hasattr(self.map, "madvise"):
+            self.map.madvise(mmap.MADV_SEQUENTIAL)
+        for i, entry in enumerate(self.entries):
+            yield entry, self.sector(i)
+
+    def replace(self, i, data):
+        if len(data) != self.record_size:
+            raise ValueError(f"A sector must be {self.record_size} bytes")
+        offset = DATA_OFFSET + i * self.record_size
+        self.map[offset:offset + self.record_size] = data
+        self.entries[i] = dict(self.entries[i], crc=zlib.crc32(data))
+        self.dirty = True
+
+    def close(self):
+        if self.dirty:
+            self.map.flush()
+        self.view.release()
+        try:
+            self.map.close()
+        except BufferError:
+            # A sector is still referenced, the map is closed once it is released
+            pass
+        if self.dirty:
+            write_index(self.file, self.record_size, self.entries, self.index_offset, self.index_size)
+            self.dirty = False
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def find_files(input_path, recursive):
+    # Names in the pack are relative to the directory given, or the file name for a single file
+    if os.path.isfile(input_path):
+        yield os.path.basename(input_path), input_path
+        return
+    for root, dirs, files in os.walk(input_path):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            yield os.path.relpath(file_path, input_path).replace(os.sep, "/"), file_path
+        if not recursive:
+            break
+
+
+def extract(pack_path, output_dir, names=None):
+    extracted = 0
+    with SectorPack(pack_path) as pack:
+        for entry, data in pack:
+            if names and entry["path"] not in names:
+                continue
+            output_path = os.path.normpath(os.path.join(output_dir, entry["path"]))
+            if os.path.commonpath([os.path.abspath(output_path), os.path.abspath(output_dir)]) != os.path.abspath(output_dir):
+                print(f"[ERROR] Not extracting {entry['path']}: path is outside the output directory")
+                continue
+            if zlib.crc32(data) != entry["crc"]:
+                print(f"[WARNING] {entry['path']}: CRC32 does not match the index")
+            os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+            with open(output_path, 'wb') as f:
+                f.write(data)
+            os.utime(output_path, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+            extracted += 1
+    print(f"Extracted: {extracted} of {len(pack)} sectors")
+
+
+def verify(pack_path):
+    mismatched = 0
+    with SectorPack(pack_path) as pack:
+        for entry, data in pack:
+            if zlib.crc32(data) != entry["crc"]:
+                print(f"[WARNING] {entry['path']}: CRC32 does not match the index")
+                mismatched += 1
+    print(f"Verified: {len(pack)} sectors, {mismatched} mismatched")
+
+
+def list_pack(pack_path):
+    with SectorPack(pack_path) as pack:
+        for entry in pack.entries:
+            print(f"{entry['crc']:08X} {entry['size']:>6} {entry['path']}")
+        print(f"Sectors: {len(pack)}")
+
+
+if __name__ == "__main__":
+    try:
+        if len(sys.argv) < 2 or len(sys.argv) > 12:
+            print("Usage: python SectorPack.py <pack> [-a|--add PATH] [-r|--recursive] [-l|--list] [-x|--extract DIR] [--only NAME] [--verify]")
+            print()
+            print("Options:")
+            print("pack: sector pack file, created by the first --add")
+            print("-a, --add PATH\t Adds the 2048-byte files in PATH, or PATH itself, replacing changed files already packed")
+            print("-r, --recursive\t Adds the files below PATH recursively")
+            print("-l, --list\t Lists the CRC32, size and name of every packed sector")
+            print("-x, --extract DIR Writes the packed sectors back to files below DIR")
+            print("--only NAME\t Extracts only the sector packed under NAME, can be repeated")
+            print("--verify\t Checks every packed sector against the CRC32 in the index")
+            sys.exit(0)
+
+        pack_path = None
+        add_path = None
+        recursive = False
+        list_sectors = False
+        extract_dir = None
+        names = set()
+        check = False
+        args = iter(sys.argv[1:])
+        for arg in args:
+            if arg in ("-a", "--add"):
+                add_path = next(args, None)
+                if not add_path or not os.path.exists(add_path):
+                    print("[ERROR] --add requires a file or directory")
+                    sys.exit(0)
+            elif arg in ("-r", "--recursive"):
+                recursive = True
+            elif arg in ("-l", "--list"):
+                list_sectors = True
+            elif arg in ("-x", "--extract"):
+                extract_dir = next(args, None)
+                if not extract_dir:
+                    print("[ERROR] --extract requires an output directory")
+                    sys.exit(0)
+            elif arg == "--only":
+                name = next(args, None)
+                if not name:
+                    print("[ERROR] --only requires a packed name")
+                    sys.exit(0)
+                names.add(name)
+            elif arg == "--verify":
+                check = True
+            else:
+                pack_path = arg
+
+        if not pack_path:
+            print("[ERROR] No pack file provided")
+            sys.exit(0)
+        if add_path is None and not os.path.isfile(pack_path):
+            print(f"[ERROR] Invalid path: {pack_path}")
+            sys.exit(0)
+
+        if add_path is not None:
+            counts = dict.fromkeys(PACK_STATUSES, 0)
+            for name, status in add_files(pack_path, find_files(add_path, recursive)):
+                counts[status] += 1
+            print(", ".join(f"{status.capitalize()}: {counts[status]}" for status in PACK_STATUSES))
+        if list_sectors:
+            list_pack(pack_path)
+        if check:
+            verify(pack_path)
+        if extract_dir is not None:
+            extract(pack_path, extract_dir, names)
+    except Exception as e:
+        print(f"[ERROR] {e}")
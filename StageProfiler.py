@@ -0,0 +1,72 @@
+import sys
+import time
+import tracemalloc
+from functools import wraps
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class StageProfiler:
+    # Times the functions it wraps and counts the bytes they allocate, per stage and per file
+    def __init__(self):
+        self.stages = {}
+        self.files = []
+        self.current = None
+        self.stack = []
+
+    def start(self):
+        tracemalloc.start()
+
+    def stop(self):
+        tracemalloc.stop()
+
+    def wrap(self, stage, func):
+        @wraps(func)
+        def timed(*args, **kwargs):
+            current, peak = tracemalloc.get_traced_memory()
+            # Nested stages reset the peak, the outer stage keeps the highest peak seen by its inner stages
+            frame = [current, peak]
+            self.stack.append(frame)
+            tracemalloc.reset_peak()
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                spent = time.perf_counter_ns() - start
+                peak = max(frame[1], tracemalloc.get_traced_memory()[1])
+                self.stack.pop()
+                if self.stack:
+                    self.stack[-1][1] = max(self.stack[-1][1], peak)
+                elif self.current is not None:
+                    self.current[1] += spent
+                self.stages.setdefault(stage, []).append((spent, max(0, peak - frame[0])))
+        return timed
+
+    def instrument(self, module, name, stage):
+        setattr(module, name, self.wrap(stage, getattr(module, name)))
+
+    def start_file(self, file_path):
+        self.current = [file_path, 0]
+
+    def end_file(self):
+        if self.current is not None:
+            self.files.append(tuple(self.current))
+            self.current = None
+
+    def report(self, slowest=10, stream=None):
+        stream = sys.stderr if stream is None else stream
+        print("Profile:", file=stream)
+        print(f"{'Stage':<14}{'Calls':>8}{'p50 us':>10}{'p95 us':>10}{'Max us':>10}{'Total ms':>10}{'p50 KiB':>10}{'Max KiB':>10}", file=stream)
+        for stage, samples in self.stages.items():
+            times = [spent for spent, _ in samples]
+            allocated = [size for _, size in samples]
+            print(f"{stage:<14}{len(samples):>8}{percentile(times, 0.50) / 1000:>10.1f}{percentile(times, 0.95) / 1000:>10.1f}"
+                  f"{max(times) / 1000:>10.1f}{sum(times) / 1e6:>10.1f}{percentile(allocated, 0.50) / 1024:>10.1f}"
+                  f"{max(allocated) / 1024:>10.1f}", file=stream)
+        if self.files:
+            print("Slowest files:", file=stream)
+            for file_path, spent in sorted(self.files, key=lambda item: item[1], reverse=True)[:slowest]:
+                print(f"{spent / 1000:>10.1f} us  {file_path}", file=stream)
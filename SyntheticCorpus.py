@@ -0,0 +1,302 @@
+import sys
+import os
+import random
+import struct
+import datetime
+import CCRT
+
+
+LAYERBREAKS = {1: 0x2033AF, 2: 0x20339F, 3: 0x238E0F}
+# Fixed angles written by CleanSS, the Redump hash keeps the first of each pair
+FIXED_ANGLES = (1, 91, 181, 271)
+# Challenge types of the 21 XGD2/3 CCRT entries, entries 4 to 7 are the angle measurements
+CHALLENGE_TYPES = (0x15, 0x14, 0x15, 0x14, 0x25, 0x24, 0x25, 0x24, 0x15, 0x14, 0x15, 0x14, 0x15, 0x14, 0x01, 0xE0, 0x15, 0x14, 0x01, 0xF0, 0xF1)
+RESPONSE_TYPES = {0x15: 0x01, 0x14: 0x03, 0x25: 0x05, 0x24: 0x07, 0x01: 0x01, 0xE0: 0x01, 0xF0: 0xF0, 0xF1: 0xF1}
+SS_STYLES = {
+    1: ("raw",),
+    2: ("raw_kreon", "raw_0800", "clean_kreon", "clean_0800"),
+    3: ("raw_kreon", "clean_kreon", "raw_0800", "clean"),
+}
+TITLE_PREFIXES = ("MS", "EA", "TC", "AC", "KO", "SE")
+
+
+def random_bytes(rng, size):
+    return bytes(rng.randrange(256) for _ in range(size))
+
+
+def filetime(rng, year):
+    time = datetime.datetime(year, rng.randrange(1, 13), rng.randrange(1, 29), rng.randrange(24), rng.randrange(60), rng.randrange(60), tzinfo=datetime.timezone.utc)
+    return (int(time.timestamp()) * 10000000 + 0x19DB1DED53E8000).to_bytes(8, 'little')
+
+
+def title_id(rng):
+    prefix = rng.choice(TITLE_PREFIXES)
+    return rng.randrange(1, 4096).to_bytes(2, 'little') + prefix[::-1].encode()
+
+
+def write_pfi(ss, xgd):
+    ss[0] = 0xD1 if xgd == 1 else 0xE1
+    ss[1] = 0x0F
+    ss[2] = 0x31
+    ss[3] = 0x10
+    ss[4:8] = (0x030000).to_bytes(4, 'big')
+    ss[8:12] = (0xFCFFFF - (LAYERBREAKS[xgd] - 0x2033AF)).to_bytes(4, 'big')
+    ss[12:16] = LAYERBREAKS[xgd].to_bytes(4, 'big')
+
+
+def write_ranges(ss, rng, xgd, types):
+    # 23 entries of type, challenge ID, modifier and a PSN range, layer 1 PSNs count up from the inverted layerbreak
+    layerbreak = LAYERBREAKS[xgd]
+    for i in range(23):
+        entry = 0x661 + i * 9
+        ss[entry] = types[i]
+        ss[entry + 1] = (i + 1) if xgd == 1 else 0x10 + i
+        sector = rng.randrange(0x1000, (layerbreak - 0x40000) >> 4) << 4
+        if (xgd == 1 and 8 <= i < 16) or (xgd > 1 and i % 2 == 1):
+            start = ~(layerbreak - sector) & 0xFFFFFF
+        else:
+            start = 0x030000 + sector
+        ss[entry + 3:entry + 6] = start.to_bytes(3, 'big')
+        ss[entry + 6:entry + 9] = (start + 0xFFF).to_bytes(3, 'big')
+    ss[0x730:0x7FF] = ss[0x661:0x730]
+
+
+def make_xgd1_ss(rng):
+    ss = bytearray(2048)
+    write_pfi(ss, 1)
+    cpr_mai = random_bytes(rng, 4)
+    ss[0x2D0:0x2D4] = cpr_mai
+    ss[0x300] = 1
+    ss[0x301] = 23
+    ss[0x41F:0x427] = filetime(rng, 2003)
+    ss[0x427:0x437] = random_bytes(rng, 16)
+    ss[0x43B:0x44B] = random_bytes(rng, 16)
+    ss[0x49F:0x4A7] = filetime(rng, 2003)
+    ss[0x4A7:0x4AB] = rng.randrange(1040000000, 1100000000).to_bytes(4, 'little')
+    ss[0x4BA] = 0x01
+    ss[0x4BB:0x4CB] = random_bytes(rng, 16)
+    ss[0x4CB:0x5DF] = random_bytes(rng, 0x5DF - 0x4CB)
+    ss[0x5DF:0x5E7] = filetime(rng, 2003)
+    ss[0x5FA] = 0xFF
+    ss[0x5FB:0x65F] = random_bytes(rng, 0x65F - 0x5FB)
+    ss[0x65F] = 0x01
+    types = [(0x01, 0x02, 0x03)[i % 3] if i < 16 else 0xF0 | (i - 16) for i in range(23)]
+    write_ranges(ss, rng, 1, [t if t < 0xF0 else 0x00 for t in types])
+
+    table = bytearray(253)
+    for i, challenge_type in enumerate(types):
+        entry = i * 11
+        table[entry] = challenge_type
+        table[entry + 1] = i + 1
+        table[entry + 2:entry + 6] = cpr_mai if challenge_type == 0x01 else random_bytes(rng, 4)
+        table[entry + 6:entry + 11] = random_bytes(rng, 5)
+    # RC4 is symmetric, so the decryptor also encrypts
+    ss[770:770 + 253] = CCRT.decrypt_ccrt1_table(bytes(ss[1183:1183 + 44]), bytes(table))
+    return ss
+
+
+def write_angles(ss, offset, angles, angles2):
+    for i, (angle, angle2) in enumerate(zip(angles, angles2)):
+        entry = offset + (4 + i) * 9
+        ss[entry + 4:entry + 6] = angle.to_bytes(2, 'little')
+        ss[entry + 7:entry + 9] = angle2.to_bytes(2, 'little')
+
+
+def make_xgd23_ss(rng, xgd, style):
+    # A good XGD3 SS keeps its response table at 0x20, Kreon drives write XGD3 like XGD2 at 0x200
+    good_xgd3 = xgd == 3 and style in ("raw_0800", "clean")
+    offset = 0x20 if good_xgd3 else 0x200
+    ss = bytearray(2048)
+    write_pfi(ss, xgd)
+    cpr_mai = random_bytes(rng, 4)
+    if xgd == 2:
+        ss[0x100:0x104] = bytes([0x00, 0x00, 0x00, 0x30])
+        ss[0x104:0x108] = bytes([0x00, 0x00, 0x06, 0xE0])
+    else:
+        ss[0x100:0x104] = bytes([0x00, 0x3B, 0xEB, 0xB0])
+        ss[0x104:0x108] = bytes([0x00, 0x00, 0x18, 0x80])
+    ss[0x108:0x11B] = random_bytes(rng, 0x11B - 0x108)
+    if good_xgd3:
+        ss[0x0F0:0x0F4] = cpr_mai
+    else:
+        ss[0x2D0:0x2D4] = cpr_mai
+    ss[0x300] = 2
+    ss[0x301] = 21
+    ss[0x460:0x470] = random_bytes(rng, 16)
+    ss[0x49E] = 0x04
+    ss[0x49F:0x4A7] = filetime(rng, 2005 + xgd * 2)
+    ss[0x4BA] = 0x02
+    ss[0x4BB:0x4CB] = random_bytes(rng, 16)
+    ss[0x4CB:0x5DF] = random_bytes(rng, 0x5DF - 0x4CB)
+    ss[0x5DF:0x5E7] = filetime(rng, 2005 + xgd * 2)
+    ss[0x5FA] = 0x02
+    ss[0x5FB:0x65F] = random_bytes(rng, 0x65F - 0x5FB)
+    ss[0x65F] = 0x02
+    write_ranges(ss, rng, xgd, [RESPONSE_TYPES[t] for t in CHALLENGE_TYPES] + [0xF2, 0xF3])
+
+    table = bytearray(252)
+    measured = []
+    for i, challenge_type in enumerate(CHALLENGE_TYPES):
+        entry = i * 12
+        table[entry:entry + 4] = bytes([challenge_type, 0x10 + i, 0x02, 0x03])
+        table[entry + 4:entry + 8] = cpr_mai if challenge_type == 0x01 else random_bytes(rng, 4)
+        if challenge_type in (0x24, 0x25):
+            angle = (FIXED_ANGLES[len(measured)] + rng.randrange(-3, 4)) % 360
+            measured.append(angle)
+            table[entry + 8:entry + 12] = angle.to_bytes(4, 'big')
+        else:
+            table[entry + 8:entry + 12] = random_bytes(rng, 4)
+        if challenge_type in (0x14, 0x15, 0x24, 0x25):
+            ss[offset + i * 9:offset + i * 9 + 4] = table[entry + 4:entry + 8]
+        if challenge_type in (0x14, 0x15):
+            ss[offset + i * 9 + 4:offset + i * 9 + 8] = table[entry + 8:entry + 12]
+    ss[0x304:0x304 + 252] = CCRT.encrypt_ccrt2_table(bytes(table))
+
+    if style == "raw_kreon":
+        write_angles(ss, offset, measured, (0, 0, 0, 0))
+    elif style == "raw_0800":
+        write_angles(ss, offset, measured, [(angle + rng.randrange(-1, 2)) % 360 for angle in measured])
+    elif style == "clean_kreon":
+        write_angles(ss, offset, FIXED_ANGLES, (0, 0, 0, 0))
+    else:
+        write_angles(ss, offset, FIXED_ANGLES, FIXED_ANGLES)
+    return ss
+
+
+def make_ss(rng, xgd, style):
+    if xgd == 1:
+        return make_xgd1_ss(rng)
+    return make_xgd23_ss(rng, xgd, style)
+
+
+def make_raw_ss(rng, xgd):
+    # The 2064-byte lead-out sector: CPR_MAI in the header, the range table shuffled by the scramble indices
+    ss = make_ss(rng, xgd, "raw_0800" if xgd > 1 else "raw")
+    cpr_mai = bytes(ss[0x0F0:0x0F4] if xgd == 3 else ss[0x2D0:0x2D4])
+    ss[0x0F0:0x0F4] = bytes(4)
+    ss[0x2D0:0x2D4] = bytes(4)
+    ranges = bytes(ss[0x661:0x730])
+    order = list(range(len(ranges)))
+    rng.shuffle(order)
+    for i, position in enumerate(order):
+        ss[0x661 + position] = ranges[i]
+    indices = bytes(order) + cpr_mai[3:]
+    ss[0x730:0x800] = bytes(a ^ b for a, b in zip(indices, cpr_mai * (len(indices) // 4)))
+    raw = bytearray(2064)
+    raw[0x007:0x00B] = cpr_mai
+    raw[0x00C:0x80C] = ss
+    return raw
+
+
+def make_dmi(rng, xgd):
+    dmi = bytearray(2048)
+    if xgd == 1:
+        dmi[0] = 0x01
+        dmi[0x08:0x10] = f"{rng.choice(TITLE_PREFIXES)}{rng.randrange(100000):05d}W".encode()[:8]
+        dmi[0x10:0x18] = filetime(rng, 2003)
+    else:
+        dmi[0] = 0x02
+        dmi[0x10:0x18] = filetime(rng, 2009)
+        dmi[0x018] = 0x02
+        dmi[0x20:0x30] = random_bytes(rng, 16)
+        dmi[0x40:0x4E] = f"{rng.choice(TITLE_PREFIXES)}{rng.randrange(1000000):06d}W0AF11".encode()
+        dmi[0x7DC:0x7E4] = bytes.fromhex('26FB858A0FC5ED02')
+        dmi[0x7E4:0x7F0] = bytes.fromhex('0002000058424F5800000000')
+        dmi[0x7F0:0x800] = random_bytes(rng, 16)
+    return dmi
+
+
+def make_xbe(rng):
+    base_address = 0x10000
+    xbe = bytearray(0x1000)
+    xbe[0:4] = b"XBEH"
+    xbe[4:260] = random_bytes(rng, 256)
+    struct.pack_into("<IIIIII", xbe, 0x104, base_address, 0x1000, 0x100000, 0x178, rng.randrange(1000000000, 1100000000), base_address + 0x178)
+    name = f"Synthetic Game {rng.randrange(10000)}".encode('utf-16le')
+    struct.pack_into("<II4s80s", xbe, 0x178, 492, rng.randrange(1000000000, 1100000000), title_id(rng), name)
+    struct.pack_into("<IIIII", xbe, 0x178 + 0x9C, 0x80000003, rng.choice((1, 2, 4, 7, 0x80000000)), rng.randrange(8), 1, rng.randrange(4))
+    return xbe
+
+
+def make_xex(rng):
+    xex = bytearray(0x1000)
+    struct.pack_into(">4sII4xII", xex, 0, b"XEX2", 0x1, 0x1000, 0x200, 3)
+    # Optional headers: checksum and timestamp (2 dwords), execution info (6 dwords), game ratings (16 dwords)
+    struct.pack_into(">IIIIII", xex, 0x18, 0x00018002, 0x100, 0x00040006, 0x108, 0x00040310, 0x120)
+    struct.pack_into(">II", xex, 0x100, rng.randrange(1 << 32), rng.randrange(1120000000, 1400000000))
+    disc_count = rng.choice((1, 1, 1, 2))
+    struct.pack_into(">III4sBBBB", xex, 0x108, rng.randrange(1 << 32), 0x20000000, 0x20000000, title_id(rng)[::-1], 0, 0, rng.randrange(1, disc_count + 1), disc_count)
+    ratings = bytearray(b'\xFF' * 64)
+    for i in rng.sample(range(12), 3):
+        ratings[i] = rng.randrange(16)
+    xex[0x120:0x160] = ratings
+    xex[0x200 + 0x140:0x200 + 0x150] = random_bytes(rng, 16)
+    struct.pack_into(">II", xex, 0x200 + 0x178, rng.choice((0xFFFFFFFF, 0x000000FF, 0x00FF0000, 0x0000FD00)), 0x00000004)
+    return xex
+
+
+def variants():
+    # Name, file name suffix and generator of each kind of input
+    kinds = []
+    for xgd, styles in SS_STYLES.items():
+        for style in styles:
+            kinds.append((f"ss_xgd{xgd}_{style}", ".bin", lambda rng, xgd=xgd, style=style: make_ss(rng, xgd, style)))
+    for xgd in (1, 2, 3):
+        kinds.append((f"rawss_xgd{xgd}", ".bin", lambda rng, xgd=xgd: make_raw_ss(rng, xgd)))
+    kinds.append(("dmi_xgd1", ".bin", lambda rng: make_dmi(rng, 1)))
+    kinds.append(("dmi_xgd23", ".bin", lambda rng: make_dmi(rng, 2)))
+    kinds.append(("xbe", ".xbe", make_xbe))
+    kinds.append(("xex", ".xex", make_xex))
+    return kinds
+
+
+def generate(directory, count, seed=0):
+    # Writes count files of every kind into directory/<kind>/ and returns {kind: [paths]}
+    rng = random.Random(seed)
+    corpus = {}
+    for name, suffix, make in variants():
+        os.makedirs(os.path.join(directory, name), exist_ok=True)
+        corpus[name] = []
+        for i in range(count):
+            file_path = os.path.join(directory, name, f"{name}_{i:05d}{suffix}")
+            with open(file_path, 'wb') as f:
+                f.write(make(rng))
+            corpus[name].append(file_path)
+    return corpus
+
+
+if __name__ == "__main__":
+    try:
+        if len(sys.argv) < 2 or len(sys.argv) > 6:
+            print("Usage: python SyntheticCorpus.py <directory> [-n|--count N] [--seed N]")
+            print()
+            print("Options:")
+            print("directory: folder to write the synthetic files to, one subfolder per kind")
+            print("-n, --count N\t Number of files of each kind (default: 100)")
+            print("--seed N\t Random seed, the same seed always writes the same files (default: 0)")
+            sys.exit(0)
+
+        directory = None
+        count = 100
+        seed = 0
+        args = iter(sys.argv[1:])
+        for arg in args:
+            if arg in ("-n", "--count"):
+                count = int(next(args, "0"))
+                if count < 1:
+                    print("[ERROR] --count requires a positive number of files")
+                    sys.exit(0)
+            elif arg == "--seed":
+                seed = int(next(args, "0"))
+            else:
+                directory = arg
+
+        if not directory:
+            print("[ERROR] No output directory provided")
+            sys.exit(0)
+
+        corpus = generate(directory, count, seed)
+        for name, paths in corpus.items():
+            print(f"{name}: {len(paths)}")
+    except Exception as e:
+        print(f"[ERROR] {e}")
@@ -0,0 +1,173 @@
+import sys
+import os
+import ParseSS
+import ParseDMI
+import ParseXBE
+import ParseXEX
+import ScanDumps
+import RecordWriter
+
+
+FILE_TYPES = ("SS", "DMI", "XBE", "XEX")
+# Columns written by --format jsonl|csv, one row per dump directory
+FIELDS = ("path", "status", "media_id", "ss", "dmi", "xbe", "xex", "messages")
+
+
+def read_record(file_path):
+    # Returns the file type and parsed record of a dump file, or (None, None) for any other file
+    with open(file_path, 'rb') as f:
+        head = f.read(2049)
+        file_type = ScanDumps.sniff(head)
+        if file_type == "SS":
+            return file_type, ParseSS.parse_ss_bytes(head)
+        elif file_type == "DMI":
+            return file_type, ParseDMI.parse_dmi_bytes(head)
+        elif file_type == "XBE":
+            file_size = os.fstat(f.fileno()).st_size
+            return file_type, ParseXBE.parse_xbe_bytes(ParseXBE.read_headers(f, file_size), file_size, file_path)
+        elif file_type == "XEX":
+            return file_type, ParseXEX.read_record(f, os.fstat(f.fileno()).st_size)
+    return None, None
+
+
+def scan_dumps(input_path, recursive):
+    # Groups the dump files of every directory, {directory: {file type: [(path, record)]}}
+    dumps = {}
+    for root, dirs, files in os.walk(input_path):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            try:
+                file_type, record = read_record(file_path)
+            except Exception as e:
+                print(f"[ERROR] {file_path}: {e}")
+                continue
+            if file_type is not None:
+                dumps.setdefault(root, {}).setdefault(file_type, []).append((file_path, record))
+        if not recursive:
+            break
+    return dumps
+
+
+def media_ids(files):
+    # Every Media ID in one dump as (file type, path, Media ID), XGD1 discs have none
+    found = []
+    for file_type in ("SS", "DMI", "XEX"):
+        for file_path, record in files.get(file_type, []):
+            if record.get("error") is None and record.get("media_id"):
+                found.append((file_type, file_path, record["media_id"]))
+    return found
+
+
+def xmid_title_id(xmid):
+    # XMID is publisher (2 letters), game number (3 digits), SKU (2 digits) and region, e.g. MS13302W is MS-133
+    if len(xmid) < 5 or not xmid[2:5].isdigit():
+        return None
+    return f"{xmid[:2]}-{int(xmid[2:5]):03}"
+
+
+def check_xgd1(files, messages):
+    for ss_path, ss in files.get("SS", []):
+        if ss["xgd"] != 1 or ss["certificate_time"] is None:
+            continue
+        for xbe_path, xbe in files.get("XBE", []):
+            if xbe["certificate_timestamp"] is None:
+                continue
+            # SS times are printed with microseconds and XBE times with UTC, both start with the time to the second
+            if ss["certificate_time"][:19] != xbe["certificate_timestamp"][:19]:
+                messages.append(f"[WARNING] Certificate timestamp mismatch: SS {ss['certificate_time'][:19]} ({os.path.basename(ss_path)}), "
+                                f"XBE {xbe['certificate_timestamp'][:19]} ({os.path.basename(xbe_path)})")
+    for dmi_path, dmi in files.get("DMI", []):
+        if dmi["xgd"] != 1 or not dmi["xmid"]:
+            continue
+        title_id = xmid_title_id(dmi["xmid"])
+        for xbe_path, xbe in files.get("XBE", []):
+            if title_id is not None and xbe["title_id"] is not None and xbe["title_id"] != title_id:
+                messages.append(f"[WARNING] Title ID mismatch: DMI XMID {dmi['xmid']} ({os.path.basename(dmi_path)}), "
+                                f"XBE {xbe['title_id']} ({os.path.basename(xbe_path)})")
+
+
+def verify_dumps(dumps):
+    # Joins the files of each dump on their Media ID, and every Media ID across dumps
+    by_media_id = {}
+    for directory, files in dumps.items():
+        for _, _, media_id in media_ids(files):
+            by_media_id.setdefault(media_id, set()).add(directory)
+
+    results = {}
+    for directory, files in dumps.items():
+        messages = []
+        found = media_ids(files)
+        distinct = sorted({media_id for _, _, media_id in found})
+        if len(distinct) > 1:
+            messages.append("[WARNING] Media ID mismatch: " + ", ".join(f"{file_type} {media_id} ({os.path.basename(file_path)})" for file_type, file_path, media_id in found))
+        for media_id in distinct:
+            others = sorted(by_media_id[media_id] - {directory})
+            if others:
+                messages.append(f"[INFO] Media ID {media_id} is also in: {', '.join(others)}")
+        check_xgd1(files, messages)
+        results[directory] = {
+            "status": "mismatch" if any(message.startswith("[WARNING]") for message in messages) else "ok",
+            "media_id": distinct[0] if len(distinct) == 1 else None,
+            "ss": [file_path for file_path, _ in files.get("SS", [])],
+            "dmi": [file_path for file_path, _ in files.get("DMI", [])],
+            "xbe": [file_path for file_path, _ in files.get("XBE", [])],
+            "xex": [file_path for file_path, _ in files.get("XEX", [])],
+            "messages": messages,
+        }
+    return results
+
+
+def print_results(results):
+    mismatches = 0
+    for directory, result in results.items():
+        print(directory)
+        counts = ", ".join(f"{len(result[file_type.lower()])} {file_type}" for file_type in FILE_TYPES if result[file_type.lower()])
+        if result["status"] == "ok":
+            print(f"Consistent: {counts}" + (f", Media ID {result['media_id']}" if result["media_id"] else ""))
+        else:
+            mismatches += 1
+        for message in result["messages"]:
+            print(message)
+    print(f"Dumps: {len(results)}, consistent: {len(results) - mismatches}, mismatched: {mismatches}")
+
+
+if __name__ == "__main__":
+    try:
+        if len(sys.argv) < 2 or len(sys.argv) > 5:
+            print("Usage: python VerifyDumps.py <directory> [-r|--recursive] [--format text|jsonl|csv]")
+            print()
+            print("Options:")
+            print("input: dump directory, or directory of dump directories with --recursive")
+            print("-r, --recursive\t Checks every directory below input as a separate dump")
+            print("--format\t Writes one record per dump directory as JSON Lines or CSV instead of text")
+            sys.exit(0)
+
+        input_path = None
+        recursive = False
+        output_format = "text"
+        args = iter(sys.argv[1:])
+        for arg in args:
+            if arg in ("-r", "--recursive"):
+                recursive = True
+            elif arg == "--format":
+                output_format = next(args, "").lower()
+                if output_format not in RecordWriter.FORMATS:
+                    print("[ERROR] --format must be text, jsonl or csv")
+                    sys.exit(0)
+            else:
+                input_path = arg
+
+        if not input_path or not os.path.isdir(input_path):
+            print("[ERROR] No valid directory provided")
+            sys.exit(0)
+
+        results = verify_dumps(scan_dumps(input_path, recursive))
+        if output_format != "text":
+            with RecordWriter.RecordWriter(output_format, FIELDS) as writer:
+                for directory, result in results.items():
+                    writer.write(directory, result)
+        else:
+            print_results(results)
+    except Exception as e:
+        print(f"[ERROR] {e}")